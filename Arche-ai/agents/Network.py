@@ -1,104 +1,516 @@
+import re
 import json
-from typing import List, Dict, Optional, Tuple, Any
-from llms import Gemini  # Your LLM class
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import concurrent.futures
+from collections import deque
+from typing import List, Dict, Deque, Optional, Tuple, Any
+from llms import Gemini, fork_llm  # Your LLM class
+from memory import BM25Index, EmbeddingIndex, CheckpointStore, estimate_tokens
 from agents import Agent  # Your Agent class (remains unchanged)
+from agents.distributed import WorkerPool
 from colorama import Fore, Style
 
 class TaskForce:
-    def __init__(self, agents: List[Agent], llm: Gemini, name: str, description: str, verbose: bool = False):
+    def __init__(self, agents: List[Agent], llm: Gemini, name: str, description: str, verbose: bool = False, max_parallel_agents: int = 4,
+                 workspace_token_budget: int = 1500, fetch_token_budget: int = 3000,
+                 planner_top_k: int = 8, route_margin: Optional[float] = None, agent_embed_fn=None,
+                 workers: Optional[WorkerPool] = None, checkpoints: Optional[CheckpointStore] = None):
+        """
+        Args:
+            planner_top_k (int): Max candidate agents shown to the planner, chosen by capability match.
+            route_margin (float, optional): Opt-in routing: when one agent's capability score beats the
+                                            runner-up's by this factor (e.g. 3.0), the first step goes
+                                            to it without a planner call; the planner then takes over
+                                            from the next iteration. None (default) always asks the planner.
+            agent_embed_fn (Callable, optional): Embeds texts for candidate ranking instead of BM25.
+            workers (WorkerPool, optional): Runs the agents it hosts in worker processes instead of
+                                            in this one. The local agents are still used for planning.
+            checkpoints (CheckpointStore, optional): Store for rollout(resume_id=...); a default one
+                                                     under checkpoints/ is created on first use.
+        """
         self.agents = agents
+        self.agent_index = AgentIndex(agents, embed_fn=agent_embed_fn)  # Capability index + O(1) name lookup
+        self.planner_top_k = max(1, planner_top_k)
+        self.route_margin = route_margin
+        self.workers = workers
+        self.checkpoints = checkpoints
+        self._run_id: Optional[str] = None  # Checkpointed run in progress, if any
+        self._run_state: Dict[str, Any] = {}
         self.llm = llm
         self.name = name
         self.description = description
         self.verbose = verbose
+        self.max_parallel_agents = max(1, max_parallel_agents)  # Agents run concurrently within one iteration
+        self._results_lock = threading.Lock()  # Guards task_history/shared_workspace across agent threads
+        self.planner_calls = 0  # Planner/synthesizer LLM calls made by the last rollout
         self.task_history: List[Tuple[str, str, str]] = []  # Track agent, task, and response
-        self.shared_workspace: Dict[str, Any] = {}  # Shared workspace for general data
+        # Shared workspace for general data. Prompts get compact digests (within workspace_token_budget);
+        # full entries are only inlined where referenced, within fetch_token_budget.
+        self.shared_workspace = SharedWorkspace()
+        self.workspace_token_budget = workspace_token_budget
+        self.fetch_token_budget = fetch_token_budget
         self.message_broker = MessageBroker()  # Initialize the message broker
+        for agent in self.agents:
+            self.message_broker.subscribe(agent.name)
 
     def add_agent(self, agent: Agent):
         """Adds an agent to the task force."""
         self.agents.append(agent)
+        self.agent_index.add(agent)
+        self.message_broker.subscribe(agent.name)
 
     def remove_agent(self, agent_name: str):
         """Removes an agent from the task force by name."""
         self.agents = [agent for agent in self.agents if agent.name != agent_name]
+        self.agent_index.remove(agent_name)
+        self.message_broker.unsubscribe(agent_name)
 
-    def rollout(self, initial_task: str, max_iterations: int = 5) -> str:
-        """Orchestrates task execution and agent collaboration."""
+    def rollout(self, initial_task: str, max_iterations: int = 5, mode: str = "iterative", resume_id: Optional[str] = None) -> str:
+        """Orchestrates task execution and agent collaboration.
 
-        current_task = initial_task
+        Args:
+            initial_task (str): The task for the team.
+            max_iterations (int): Planning rounds in "iterative" mode; max re-plans in "dag" mode.
+            mode (str): "iterative" plans one step per round; "dag" plans the whole task graph
+                        upfront and re-plans only when a step fails.
+            resume_id (str, optional): Checkpoints progress under this id after every plan and every
+                        finished assignment. Rerunning with the same id after a crash resumes from
+                        the last checkpoint; a completed run returns its saved answer.
+        """
+        if mode not in ("iterative", "dag"):
+            raise ValueError(f"Unknown TaskForce mode '{mode}'. Use 'iterative' or 'dag'.")
         self.task_history.clear()
         self.shared_workspace.clear()
+        self.message_broker.clear()  # Messages left over from an earlier or aborted rollout
+        self.planner_calls = 0
+
+        resume = None
+        if resume_id is not None:
+            run = self._checkpoint_store().begin(resume_id, owner=self.name)
+            if run["status"] == "complete":
+                print(f"{Fore.CYAN}TaskForce run '{resume_id}' already completed; returning its answer.{Style.RESET_ALL}")
+                return run["result"]
+            resume = run["steps"].get("state")
+            if resume and (resume["initial_task"] != initial_task or resume["mode"] != mode):
+                # Checkpoint of a different task; start over under this id
+                self.checkpoints.delete(resume_id)
+                self.checkpoints.begin(resume_id, owner=self.name)
+                resume = None
+            self._run_id = resume_id
+            self._run_state = {"initial_task": initial_task, "mode": mode}
+            if resume:
+                self.planner_calls = resume.pop("planner_calls")
+                self._run_state.update(resume)
+                self._restore_steps(resume, [value for key, value in run["steps"].items() if key.startswith("step:")])
+                print(f"{Fore.CYAN}Resuming TaskForce run '{resume_id}' from its last checkpoint.{Style.RESET_ALL}")
 
         print(f"{Fore.CYAN}TaskForce activated. Initial task: {initial_task}{Style.RESET_ALL}")
 
-        for iteration in range(max_iterations):
-            print(f"\n{Fore.CYAN}Iteration: {iteration + 1}/{max_iterations}{Style.RESET_ALL}")
+        try:
+            if mode == "iterative":
+                self._run_iterations(initial_task, max_iterations, resume)
+            else:
+                self._run_task_graph(initial_task, max_replans=max_iterations, resume=resume)
 
-            selected_agent, next_task, communication_plan = self._plan_iteration(current_task)
+            final_response = self._generate_final_response(initial_task)
+            if self._run_id is not None:
+                self.checkpoints.finish(self._run_id, final_response)
+        finally:
+            self._run_id, self._run_state = None, {}
 
-            if not selected_agent:
-                print(f"{Fore.YELLOW}Task planning complete or no suitable agent found.{Style.RESET_ALL}")
-                break
+        print(f"{Fore.CYAN}\nFinal Consolidated Response:{Style.RESET_ALL}\n{final_response}")
+        print(f"{Fore.CYAN}Planner calls: {self.planner_calls}{Style.RESET_ALL}")
+        return final_response
 
-            print(f"{Fore.YELLOW}Selected Agent: {selected_agent.name}{Style.RESET_ALL}")
-            print(f"{Fore.YELLOW}Task: {current_task}{Style.RESET_ALL}")
-            print(f"{Fore.BLUE}Communication Plan: {communication_plan}{Style.RESET_ALL}\n")
+    def _checkpoint_store(self) -> CheckpointStore:
+        if self.checkpoints is None:
+            self.checkpoints = CheckpointStore()
+        return self.checkpoints
 
-            # Inject messages into the next task description
-            if communication_plan:
-                next_task = self._inject_messages_into_task(next_task, communication_plan)
+    def _checkpoint(self, entry_id: Optional[str] = None, finished: Optional[int] = None, node_id: Optional[str] = None,
+                    **state) -> None:
+        """Saves the run's progress.
 
-            # Process and log communication via the message broker
-            self.message_broker.process_communications(communication_plan)
+        A finished step is saved as its own `step:<entry id>` row, so a checkpoint costs the size of
+        that step rather than of the whole run. The `state` row holds only the plan position and is
+        rewritten when planning changes it.
 
-            print(f"{Fore.GREEN}Executing Agent: {selected_agent.name}...{Style.RESET_ALL}")
+        Args:
+            entry_id (str, optional): Workspace entry of an assignment or graph step that just finished.
+            finished (int, optional): Its index within the current iteration's assignments.
+            node_id (str, optional): Its graph step id, if it succeeded.
+        """
+        if self._run_id is None:
+            return
+        with self._results_lock:
+            if entry_id is not None:
+                self.checkpoints.save(self._run_id, f"step:{entry_id}", {
+                    "entry": self.shared_workspace.get(entry_id),
+                    "iteration": self._run_state.get("iteration"),
+                    "finished": finished,
+                    "node": node_id,
+                })
+            if state:
+                self._run_state.update(state)
+                self.checkpoints.save(self._run_id, "state", dict(self._run_state, planner_calls=self.planner_calls))
 
-            # Delegate the task (now potentially containing messages) to the agent
-            selected_agent.task = next_task
-            agent_response = selected_agent.rollout()
+    def _restore_steps(self, resume: Dict[str, Any], steps: List[Dict[str, Any]]) -> None:
+        """Reloads the workspace and history from saved step rows and derives the finished work."""
+        steps.sort(key=lambda step: int(step["entry"]["id"][1:]))
+        entries = [step["entry"] for step in steps]
+        self.shared_workspace.load(entries)
+        self.task_history.extend((entry["agent"], entry["task"], entry["content"]) for entry in entries)
+        resume["done"] = [
+            step["finished"] for step in steps if step["finished"] is not None and step["iteration"] == resume.get("iteration")
+        ]
+        resume["results"] = {step["node"]: step["entry"]["id"] for step in steps if step["node"] is not None}
+
+    def _run_iterations(self, initial_task: str, max_iterations: int, resume: Optional[Dict[str, Any]] = None) -> None:
+        """Plans and executes one step per iteration until the planner reports completion."""
+        current_task, start = initial_task, 0
+        if resume:
+            current_task, start = resume["current_task"], resume["iteration"]
+        iteration = start
+        for iteration in range(start, max_iterations):
+            print(f"\n{Fore.CYAN}Iteration: {iteration + 1}/{max_iterations}{Style.RESET_ALL}")
+
+            if resume and resume.get("plan") is not None:
+                # The run stopped mid-iteration: finish the planned assignments that hadn't completed
+                assignments = [(self._get_agent_by_name(name), task) for name, task in resume["plan"]]
+                assignments = [(agent, task) for agent, task in assignments if agent]
+                done = set(resume.get("done", []))
+                resume = None
+            else:
+                # Fast path: a task squarely in one agent's domain needs no planner call
+                routed_agent = self.agent_index.route(current_task, self.route_margin) if iteration == 0 and self.route_margin else None
+                if routed_agent is not None:
+                    print(f"{Fore.YELLOW}Routed directly to {routed_agent.name} (clear capability match).{Style.RESET_ALL}")
+                    assignments = [(routed_agent, current_task)]
+                else:
+                    assignments, communication_plan = self._plan_iteration(current_task)
+
+                    if not assignments:
+                        print(f"{Fore.YELLOW}Task planning complete or no suitable agent found.{Style.RESET_ALL}")
+                        break
+
+                    print(f"{Fore.YELLOW}Selected Agents: {', '.join(agent.name for agent, _ in assignments)}{Style.RESET_ALL}")
+                    print(f"{Fore.YELLOW}Task: {current_task}{Style.RESET_ALL}")
+                    print(f"{Fore.BLUE}Communication Plan: {communication_plan}{Style.RESET_ALL}\n")
+
+                    # Queue messages via the message broker; each agent reads its own when its task starts
+                    self.message_broker.process_communications(communication_plan)
 
-            print(f"{Fore.GREEN}Agent {selected_agent.name} Response: {agent_response}{Style.RESET_ALL}")
+                done = set()
+                self._checkpoint(iteration=iteration, current_task=current_task,
+                                 plan=[[agent.name, task] for agent, task in assignments])
 
-            self.shared_workspace[selected_agent.name] = agent_response
-            self.task_history.append((selected_agent.name, next_task, agent_response))
+            # A routed first step is followed by normal planning, which sees its result in the history
+            self._execute_assignments(assignments, step_prefix=f"i{iteration}", skip=done)
 
-            if next_task.upper() == "TASK COMPLETE":
+            next_tasks = [task for _, task in assignments]
+            if all(task.upper() == "TASK COMPLETE" for task in next_tasks):
                 print(f"{Fore.GREEN}Task successfully completed!{Style.RESET_ALL}")
                 break
 
-            current_task = next_task
-
-        final_response = self._generate_final_response(initial_task)
+            current_task = "\n".join(next_tasks)
+            self._checkpoint(iteration=iteration + 1, current_task=current_task, plan=None)
 
         if iteration + 1 == max_iterations:
             print(f"{Fore.YELLOW}Maximum iterations reached. Task might not be fully complete.{Style.RESET_ALL}")
 
-        print(f"{Fore.CYAN}\nFinal Consolidated Response:{Style.RESET_ALL}\n{final_response}")
-        return final_response
+    def _run_task_graph(self, initial_task: str, max_replans: int, resume: Optional[Dict[str, Any]] = None) -> None:
+        """Executes a planned task graph with maximal parallelism, re-planning on failed steps."""
+        if resume and resume.get("nodes") is not None:
+            nodes = self._load_nodes(resume["nodes"])
+            results: Dict[str, str] = dict(resume["results"])  # step id -> workspace entry id
+            replans = resume["replans"]
+        else:
+            nodes = self._plan_graph(initial_task)
+            results = {}
+            replans = 0
+            self._checkpoint(nodes=self._dump_nodes(nodes), replans=0)
+        failed: List[str] = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_parallel_agents) as pool:
+            running: Dict[concurrent.futures.Future, Dict[str, Any]] = {}
+            while True:
+                # Start every step whose dependencies are done, one step per agent at a time
+                busy = {node["agent"].name for node in running.values()}
+                started = {node["id"] for node in running.values()}
+                for node in nodes:
+                    if node["id"] in results or node["id"] in started or node["agent"].name in busy:
+                        continue
+                    if all(dep in results for dep in node["depends_on"]):
+                        task = self._with_dependency_results(node, results)
+                        # Planner calls may run while steps are in flight, so steps never share its LLM
+                        running[pool.submit(self._run_assignment, node["agent"], task, True, node["id"])] = node
+                        busy.add(node["agent"].name)
+                        started.add(node["id"])
+
+                if not running:
+                    break
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    entry_id = future.result()
+                    response = self.shared_workspace.get(entry_id)["content"]
+                    if self._signals_failure(response) and replans < max_replans:
+                        replans += 1
+                        print(f"{Fore.YELLOW}Step '{node['id']}' failed; re-planning ({replans}/{max_replans}).{Style.RESET_ALL}")
+                        # Running steps are kept as they are; only the steps that haven't started are replaced
+                        in_flight = list(running.values())
+                        replacement = self._replan_graph(
+                            initial_task, nodes, results, in_flight, node, response, prefix=f"r{replans}-"
+                        )
+                        if not replacement:
+                            # Keep the rest of the plan; steps that needed the failed one can't run
+                            print(f"{Fore.RED}Re-planning after step '{node['id']}' failed returned no steps; continuing without it.{Style.RESET_ALL}")
+                            failed.append(node["id"])
+                            started_ids = {n["id"] for n in in_flight}
+                            replacement = [
+                                n for n in nodes
+                                if n["id"] not in results and n["id"] not in started_ids and n["id"] != node["id"]
+                            ]
+                        nodes = [n for n in nodes if n["id"] in results] + in_flight + replacement
+                        self._checkpoint(entry_id, nodes=self._dump_nodes(nodes), replans=replans)
+                    else:
+                        results[node["id"]] = entry_id
+                        self._checkpoint(entry_id, node_id=node["id"])
+
+        if failed:
+            print(f"{Fore.RED}Failed steps: {', '.join(failed)}{Style.RESET_ALL}")
+        skipped = [node["id"] for node in nodes if node["id"] not in results]
+        if skipped:
+            print(f"{Fore.YELLOW}Steps not run (unmet dependencies): {', '.join(skipped)}{Style.RESET_ALL}")
+
+    @staticmethod
+    def _dump_nodes(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [dict(node, agent=node["agent"].name) for node in nodes]
+
+    def _load_nodes(self, nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rebinds checkpointed steps to this TaskForce's agents, dropping steps of removed agents."""
+        loaded = [dict(node, agent=self._get_agent_by_name(node["agent"])) for node in nodes]
+        return [node for node in loaded if node["agent"] is not None]
+
+    def _plan_graph(self, initial_task: str) -> List[Dict[str, Any]]:
+        """Asks the planner once for the whole task graph."""
+        llm_prompt = f"""
+        You are managing a team of agents for task execution.
+        Break the task into subtasks, assign each to the most suitable agent and state which
+        subtasks must finish before another can start. Subtasks without dependencies run in parallel.
+
+        Task: {initial_task}
+        Available Agents:
+        {self._get_agents_info(initial_task)}
+
+        Return a JSON object:
+        {{
+            "subtasks": [
+                {{"id": "t1", "agent": "<Agent Name>", "task": "<Task Description>", "depends_on": []}},
+                {{"id": "t2", "agent": "<Agent Name>", "task": "<Task Description>", "depends_on": ["t1"]}}
+            ]
+        }}
+        """
+        return self._request_graph(llm_prompt)
+
+    def _replan_graph(self, initial_task: str, nodes: List[Dict[str, Any]], results: Dict[str, str],
+                      in_flight: List[Dict[str, Any]], failed: Dict[str, Any], response: str,
+                      prefix: str) -> List[Dict[str, Any]]:
+        """Asks the planner to replace the failed step and the steps that haven't started yet.
 
-    def _plan_iteration(self, current_task: str) -> Tuple[Optional[Agent], str, dict]:
+        The new steps may only depend on finished or still-running steps; references to the
+        failed step or to the replaced ones are dropped.
+        """
+        running_ids = {node["id"] for node in in_flight}
+        finished = "\n".join(
+            f"- {node_id}: {self.shared_workspace.digest(entry_id)}" for node_id, entry_id in results.items()
+        ) or "None"
+        running = "\n".join(f"- {node['id']} ({node['agent'].name}): {node['task']}" for node in in_flight) or "None"
+        pending = "\n".join(
+            f"- {node['id']} ({node['agent'].name}): {node['task']}" for node in nodes
+            if node["id"] not in results and node["id"] not in running_ids and node["id"] != failed["id"]
+        ) or "None"
+        llm_prompt = f"""
+        You are managing a team of agents for task execution. A step of the plan failed.
+
+        Task: {initial_task}
+        Finished steps:
+        {finished}
+        Running steps (they keep running; do not repeat them):
+        {running}
+        Steps not started yet:
+        {pending}
+        Failed step: {failed['id']} ({failed['agent'].name}): {failed['task']}
+        Failure: {response[:500]}
+        Available Agents:
+        {self._get_agents_info(f"{failed['task']} {initial_task}")}
+
+        Return the subtasks that replace the failed step and the steps not started yet, as a JSON object.
+        Subtask ids must start with "{prefix}". They may depend on finished or running steps.
+        {{
+            "subtasks": [
+                {{"id": "{prefix}1", "agent": "<Agent Name>", "task": "<Task Description>", "depends_on": []}}
+            ]
+        }}
+        """
+        return self._request_graph(llm_prompt, known_ids=set(results) | running_ids)
+
+    def _request_graph(self, llm_prompt: str, known_ids: Optional[set] = None) -> List[Dict[str, Any]]:
+        """Runs a graph-planning prompt and resolves agents and dependencies."""
+        self.planner_calls += 1
+        planner = fork_llm(self.llm)  # Agents may be running on the shared instance's state
+        response = planner.run(llm_prompt)
+        planner.reset()
+
+        if self.verbose:
+            print(f"LLM Graph Planning Response: {response}")
+
+        plan = self._parse_json_object(response)
+        if not plan or not isinstance(plan.get("subtasks"), list):
+            print(f"{Fore.RED}Error: Invalid task graph from LLM.{Style.RESET_ALL}")
+            return []
+
+        nodes = []
+        for item in plan["subtasks"]:
+            agent = self._get_agent_by_name(item.get("agent"))
+            if not agent or not item.get("id"):
+                print(f"{Fore.RED}Error: Skipping subtask with unknown agent: {item}{Style.RESET_ALL}")
+                continue
+            nodes.append({
+                "id": str(item["id"]),
+                "agent": agent,
+                "task": item.get("task", ""),
+                "depends_on": [str(dep) for dep in item.get("depends_on", []) or []],
+            })
+        ids = {node["id"] for node in nodes} | (known_ids or set())
+        for node in nodes:
+            node["depends_on"] = [dep for dep in node["depends_on"] if dep in ids]  # Drop dangling references
+        return nodes
+
+    def _with_dependency_results(self, node: Dict[str, Any], results: Dict[str, str]) -> str:
+        """Appends the outputs of a step's dependencies (and any workspace ids it references) to its task."""
+        entry_ids = [results[dep] for dep in node["depends_on"]]
+        return self._resolve_workspace_refs(node["task"], extra_ids=entry_ids)
+
+    @staticmethod
+    def _signals_failure(response: str) -> bool:
+        """Heuristic check for an agent response that reports an error instead of a result."""
+        head = (response or "").strip().lower()[:200]
+        return not head or head.startswith(("error", "failed", "unable to", "i cannot", "i can't", "no task provided"))
+
+    def _execute_assignments(self, assignments: List[Tuple[Agent, str]], step_prefix: Optional[str] = None, skip=()) -> None:
+        """Runs the iteration's assignments concurrently on a bounded pool.
+
+        Assignments for the same agent run one after another in a single job, since an agent
+        holds one task and one memory at a time.
+
+        Args:
+            step_prefix (str, optional): Prefix of the assignments' checkpoint step ids.
+            skip (Iterable[int]): Indices of assignments that already finished (when resuming).
+        """
+        per_agent: Dict[str, List[Tuple[int, Agent, str]]] = {}
+        for index, (agent, task) in enumerate(assignments):
+            if index not in skip:
+                per_agent.setdefault(agent.name, []).append((index, agent, task))
+        jobs = list(per_agent.values())
+        if not jobs:
+            return
+        parallel = len(jobs) > 1
+
+        def run(job: List[Tuple[int, Agent, str]]) -> None:
+            for index, agent, task in job:
+                step_id = f"{step_prefix}.{index}" if step_prefix else None
+                entry_id = self._run_assignment(agent, task, isolate_llm=parallel, step_id=step_id)
+                self._checkpoint(entry_id, finished=index)
+
+        if not parallel:
+            run(jobs[0])
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_parallel_agents, len(jobs))) as pool:
+            for future in [pool.submit(run, job) for job in jobs]:
+                future.result()
+
+    def _run_assignment(self, agent: Agent, task: str, isolate_llm: bool = False, step_id: Optional[str] = None) -> str:
+        """Delegates a task to an agent and records the response in the shared workspace.
+
+        With `step_id` during a checkpointed run, an `Agent` also checkpoints its own tool calls.
+
+        Returns:
+            str: The workspace entry id of the response.
+        """
+        print(f"{Fore.GREEN}Executing Agent: {agent.name}...{Style.RESET_ALL}")
+        task = self._inject_messages_into_task(self._resolve_workspace_refs(task), agent.name)
+
+        # The LLM wrappers keep per-call state on the instance and agents usually share one,
+        # so concurrent agents each run on a private fork of it.
+        shared_llm = agent.llm
+        if isolate_llm:
+            agent.llm = fork_llm(shared_llm)
+        try:
+            # Delegate the task (now potentially containing messages) to the agent
+            agent.task = task
+            try:
+                if self.workers is not None and self.workers.hosts(agent.name):
+                    agent_response = self.workers.run(agent.name, task)
+                elif step_id is not None and self._run_id is not None and isinstance(agent, Agent):
+                    agent_response = agent.rollout(resume_id=f"{self._run_id}/{step_id}")
+                else:
+                    agent_response = agent.rollout()
+            except Exception as e:
+                agent_response = f"Error: {e}"
+        finally:
+            agent.llm = shared_llm
+
+        print(f"{Fore.GREEN}Agent {agent.name} Response: {agent_response}{Style.RESET_ALL}")
+
+        with self._results_lock:
+            entry_id = self.shared_workspace.add(agent.name, task, agent_response)
+            self.task_history.append((agent.name, task, agent_response))
+        return entry_id
+
+    def _resolve_workspace_refs(self, task: str, extra_ids: Optional[List[str]] = None) -> str:
+        """Appends the full content of workspace entries referenced as `[w<n>]` in the task."""
+        if "**Results from earlier steps:**" in task:
+            return task  # Already resolved (DAG steps attach their dependencies up front)
+        entry_ids = list(extra_ids or []) + [ref for ref in SharedWorkspace.REF.findall(task) if ref not in (extra_ids or [])]
+        context = self.shared_workspace.fetch(entry_ids, self.fetch_token_budget)
+        if not context:
+            return task
+        return f"{task}\n\n**Results from earlier steps:**\n{context}"
+
+    def _plan_iteration(self, current_task: str) -> Tuple[List[Tuple[Agent, str]], dict]:
         """Plans the next iteration, handling task delegation and communication."""
 
-        agent_info = self._get_agents_info()
+        agent_info = self._get_agents_info(current_task)
 
         llm_prompt = f"""
         You are managing a team of agents for task execution. 
         Your role is to assign tasks to agents, break down tasks if needed, and ensure effective communication.
 
         Current Task: {current_task}
-        Shared Workspace: {json.dumps(self.shared_workspace, indent=4)}
+        Shared Workspace (digests of agent outputs, newest first):
+        {self.shared_workspace.digests(self.workspace_token_budget)}
         Available Agents: 
         {agent_info}
 
         Instructions:
-        1. Choose the most suitable agent for the next task. If none, suggest "None".
+        1. Choose the most suitable agent for the next task. If none, return an empty "assignments" list.
         2. If the task can be broken into smaller sub-tasks, suggest the next task.
-        3. Plan communication between agents if necessary.
-        4. Return a JSON object:
+        3. Agents don't see the workspace. To hand an agent an earlier output, put its id (e.g. [w2])
+           in that agent's task; the full content is attached for it.
+        4. Sub-tasks that do not depend on each other can be assigned to different agents in the same
+           step (up to {self.max_parallel_agents}); they run in parallel.
+        5. Plan communication between agents if necessary.
+        6. Return a JSON object:
         {{
-            "selected_agent": "<Agent Name>" or "None",
-            "next_task": "<Task Description>" or "TASK COMPLETE",
+            "assignments": [
+                {{"agent": "<Agent Name>", "task": "<Task Description>" or "TASK COMPLETE"}}
+            ],
             "communication_plan": {{
                 "<Recipient Agent Name>": {{
                     "message": "<Information to send>",
@@ -109,6 +521,7 @@ class TaskForce:
         }}
         """
 
+        self.planner_calls += 1
         response = self.llm.run(llm_prompt)
         self.llm.reset()
 
@@ -118,34 +531,45 @@ class TaskForce:
         plan = self._extract_json_plan(response)
         if not plan:
             print(f"{Fore.RED}Error: Invalid plan format from LLM.{Style.RESET_ALL}")
-            return None, "TASK COMPLETE", {}
+            return [], {}
 
-        selected_agent_name = plan.get("selected_agent")
-        next_task = plan.get("next_task", "TASK COMPLETE")
         communication_plan = plan.get("communication_plan", {})
+        if "assignments" in plan:
+            requested = [(item.get("agent"), item.get("task", "TASK COMPLETE")) for item in plan["assignments"] or []]
+        else:  # Single-agent schema
+            requested = [(plan.get("selected_agent"), plan.get("next_task", "TASK COMPLETE"))]
 
-        selected_agent = self._get_agent_by_name(selected_agent_name) if selected_agent_name != "None" else None
-        return selected_agent, next_task, communication_plan
+        assignments = []
+        for agent_name, task in requested:
+            agent = self._get_agent_by_name(agent_name) if agent_name and agent_name != "None" else None
+            if agent:
+                assignments.append((agent, task))
+            elif agent_name and agent_name != "None":
+                print(f"{Fore.RED}Error: Planner assigned unknown agent '{agent_name}'.{Style.RESET_ALL}")
+        return assignments, communication_plan
 
-    def _inject_messages_into_task(self, task: str, communication_plan: Dict[str, dict]) -> str:
-        """Injects messages from the communication plan into the task description."""
-        for recipient_name, comm_details in communication_plan.items():
-            recipient_agent = self._get_agent_by_name(recipient_name)  # Get the agent
-            if recipient_agent and recipient_name == recipient_agent.name:  # Check if agent exists
-                message = comm_details["message"]
-                source_agent = comm_details["source_agent"]
-                task += f"\n\n**Message from {source_agent}:** {message}"
+    def _inject_messages_into_task(self, task: str, recipient: str) -> str:
+        """Appends the recipient's queued messages (most urgent first) to its task description."""
+        for message in self.message_broker.consume(recipient):
+            task += f"\n\n**Message from {message['source']}:** {message['message']}"
         return task
 
     def _generate_final_response(self, initial_task: str) -> str:
         """Combines agent responses into a final answer."""
+        # The newest results are the most complete, so they get the full-text budget; older
+        # entries that don't fit are shown as digests
+        workspace, digested, omitted = self.shared_workspace.recent(self.fetch_token_budget, self.workspace_token_budget)
+        if digested or omitted:
+            print(f"{Fore.YELLOW}Final response: {digested} older workspace entries shortened to digests, "
+                  f"{omitted} omitted to fit the token budget.{Style.RESET_ALL}")
 
         final_response_prompt = f"""
         You are {self.name}, {self.description}.
         Combine the agents' responses to provide a comprehensive answer to the initial task.
 
         Initial Task: {initial_task}
-        Shared Workspace: {json.dumps(self.shared_workspace, indent=4)}
+        Shared Workspace:
+        {workspace or "Empty"}
         Task History: 
         {self._format_task_history()}
 
@@ -154,6 +578,7 @@ class TaskForce:
         - Provide a concise, unified answer to the initial task.
         """
 
+        self.planner_calls += 1
         final_response = self.llm.run(final_response_prompt)
         self.llm.reset()
 
@@ -163,10 +588,16 @@ class TaskForce:
 
         return final_response
 
-    def _get_agents_info(self) -> str:
-        """Provides a formatted string of agent information for the LLM."""
+    def _get_agents_info(self, task: Optional[str] = None) -> str:
+        """Provides a formatted string of agent information for the LLM.
+
+        With `task`, only the `planner_top_k` agents best matching it are listed.
+        """
+        agents = self.agents
+        if task is not None and len(agents) > self.planner_top_k:
+            agents = self.agent_index.candidates(task, self.planner_top_k)
         agent_info = []
-        for agent in self.agents:
+        for agent in agents:
             tool_names = [tool.func.__name__ for tool in agent.tools] if agent.tools else []
             tool_info = f"Tools: {', '.join(tool_names)}" if tool_names else "Tools: None"
             current_task = agent.task if agent.task else "No current task"
@@ -177,6 +608,8 @@ class TaskForce:
                 f"{tool_info}\n"
                 f"Current Task: {current_task}"
             )
+        if len(agents) < len(self.agents):
+            agent_info.append(f"({len(self.agents) - len(agents)} less relevant agents not listed)")
         return "\n\n".join(agent_info)
 
     def _format_task_history(self) -> str:
@@ -184,52 +617,456 @@ class TaskForce:
         if not self.task_history:
             return "Task History: None"
         history_str = ["Task History:"]
-        for i, (agent_name, task, response) in enumerate(self.task_history):
-            history_str.append(
-                f"- Turn {i + 1}: Agent '{agent_name}' was given the task '{task}' and responded with '{response}'"
-            )
+        # Responses live in the workspace; the history only points at them
+        entry_ids = self.shared_workspace.ids()
+        for i, (agent_name, task, _) in enumerate(self.task_history):
+            task = task.split("\n\n**", 1)[0]  # Drop attached messages/results
+            reference = f" -> [{entry_ids[i]}]" if i < len(entry_ids) else ""
+            history_str.append(f"- Turn {i + 1}: Agent '{agent_name}' was given the task '{task[:300]}'{reference}")
         return "\n".join(history_str)
 
     def _extract_json_plan(self, llm_response: str) -> Optional[Dict]:
         """Extracts and validates the JSON plan from the LLM's response."""
+        plan = self._parse_json_object(llm_response)
+        if plan is None:
+            return None
+        if "assignments" in plan or ("selected_agent" in plan and "next_task" in plan):
+            return plan
+        print(f"{Fore.RED}Error: Plan is missing required keys: {plan}{Style.RESET_ALL}")
+        return None
+
+    def _parse_json_object(self, llm_response: str) -> Optional[Dict]:
+        """Extracts the outermost JSON object from an LLM response."""
         try:
             llm_response = llm_response.strip()
             start = llm_response.index('{')
             end = llm_response.rindex('}') + 1
-            llm_response = llm_response[start:end]
-            plan = json.loads(llm_response)
-            assert "selected_agent" in plan and "next_task" in plan
-            return plan
-        except (json.JSONDecodeError, AssertionError, ValueError) as e:
+            return json.loads(llm_response[start:end])
+        except (json.JSONDecodeError, ValueError) as e:
             print(f"{Fore.RED}Error parsing JSON: {e}{Style.RESET_ALL}")
             return None
 
     def _get_agent_by_name(self, agent_name: str) -> Optional[Agent]:
         """Helper function to retrieve an agent by name."""
-        return next((agent for agent in self.agents if agent.name == agent_name), None)
+        return self.agent_index.get(agent_name)
+
+
+class AgentIndex:
+    """Capability index over agents: name lookup plus lexical (or embedding) ranking for a task.
+
+    Each agent is profiled by its name, description, skills and tools (names and descriptions).
+    """
+
+    def __init__(self, agents: List[Agent], embed_fn=None):
+        """
+        Args:
+            embed_fn (Callable, optional): Maps a list of texts to an `(n, dim)` array. When given,
+                                           candidates are ranked by cosine similarity instead of BM25.
+        """
+        self.embed_fn = embed_fn
+        self._by_name: Dict[str, Agent] = {}
+        self._rebuild(agents)
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def get(self, agent_name: Optional[str]) -> Optional[Agent]:
+        return self._by_name.get(agent_name) if agent_name else None
+
+    def add(self, agent: Agent) -> None:
+        if agent.name in self._by_name:
+            self.remove(agent.name)
+        self._by_name[agent.name] = agent
+        self._agents.append(agent)
+        profile = self.profile(agent)
+        self._lexical.add(profile)
+        if self._dense is not None:
+            self._dense.add(profile)
+
+    def remove(self, agent_name: str) -> None:
+        if self._by_name.pop(agent_name, None) is not None:
+            # Both indexes are append-only; rosters are small enough to rebuild
+            self._rebuild([agent for agent in self._agents if agent.name != agent_name])
+
+    @staticmethod
+    def profile(agent: Agent) -> str:
+        tools = agent.tools or []
+        parts = [agent.name, agent.description, agent.skills]
+        parts += [f"{tool.func.__name__} {getattr(tool, 'description', '')}" for tool in tools]
+        # Split identifiers like "get_stock_price" / "StockAnalyst" into words
+        text = " ".join(str(part) for part in parts if part).replace("_", " ")
+        return re.sub(r"(?<=[a-z])(?=[A-Z])", " ", text)
+
+    def rank(self, task: str, k: int) -> List[Tuple[Agent, float]]:
+        """Up to `k` `(agent, score)` pairs matching the task, best first."""
+        index = self._dense if self._dense is not None else self._lexical
+        return [(self._agents[doc_id], score) for doc_id, score in index.search(task, k)]
+
+    def candidates(self, task: str, k: int) -> List[Agent]:
+        """The `k` agents best matching the task, padded in roster order if fewer match at all."""
+        chosen = [agent for agent, _ in self.rank(task, k)]
+        for agent in self._agents:
+            if len(chosen) >= k:
+                break
+            if agent not in chosen:
+                chosen.append(agent)
+        return chosen
+
+    def route(self, task: str, margin: float) -> Optional[Agent]:
+        """Returns the agent whose lexical score beats every other agent's by `margin`, if any."""
+        ranked = self._lexical.search(task, 2)
+        if not ranked or len(self._agents) < 2:
+            return None
+        top_score = ranked[0][1]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if top_score >= margin * max(runner_up, 1.0):
+            return self._agents[ranked[0][0]]
+        return None
+
+    def _rebuild(self, agents: List[Agent]) -> None:
+        self._agents: List[Agent] = []
+        self._lexical = BM25Index()
+        self._dense = EmbeddingIndex(self.embed_fn) if self.embed_fn else None
+        self._by_name = {}
+        for agent in agents:
+            self.add(agent)
+
+
+class SharedWorkspace:
+    """Agent outputs keyed by stable ids (`w1`, `w2`, ...), with short digests for prompts.
+
+    Indexing by agent name (`workspace["Writer"]`) returns that agent's latest output, as the
+    plain dict this replaces did.
+    """
+
+    REF = re.compile(r"\[(w\d+)\]")
+
+    def __init__(self, digest_chars: int = 240):
+        self.digest_chars = digest_chars
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._latest: Dict[str, str] = {}  # agent name -> latest entry id
+        self._lock = threading.Lock()
+
+    def add(self, agent_name: str, task: str, content: Any) -> str:
+        content = content if isinstance(content, str) else json.dumps(content, default=str)
+        with self._lock:
+            entry_id = f"w{len(self._entries) + 1}"
+            self._entries[entry_id] = {
+                "id": entry_id,
+                "agent": agent_name,
+                "task": task,
+                "content": content,
+                "tokens": estimate_tokens(content),
+            }
+            self._latest[agent_name] = entry_id
+        return entry_id
+
+    def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(entry_id)
+
+    def export(self) -> List[Dict[str, Any]]:
+        """All entries, oldest first, for checkpointing."""
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+    def load(self, entries: List[Dict[str, Any]]) -> None:
+        """Replaces the contents with exported entries."""
+        with self._lock:
+            self._entries = {entry["id"]: dict(entry) for entry in entries}
+            self._latest = {entry["agent"]: entry["id"] for entry in entries}
+
+    def ids(self) -> List[str]:
+        return list(self._entries)
+
+    def digest(self, entry_id: str) -> str:
+        """One-line preview of an entry: its agent, size and the start of its content."""
+        entry = self._entries[entry_id]
+        text = " ".join(entry["content"].split())
+        if len(text) > self.digest_chars:
+            text = text[: self.digest_chars].rsplit(" ", 1)[0] + " ..."
+        return f"[{entry_id}] {entry['agent']} (~{entry['tokens']} tokens): {text}"
+
+    def digests(self, token_budget: int) -> str:
+        """Digests of the newest entries that fit `token_budget`."""
+        lines, used = [], 0
+        for entry_id in reversed(self.ids()):
+            line = self.digest(entry_id)
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                lines.append(f"... {len(self._entries) - len(lines)} older entries omitted")
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines) or "Empty"
+
+    def fetch(self, entry_ids: List[str], token_budget: int) -> str:
+        """Full content of the given entries, truncated to fit `token_budget` in total."""
+        parts, remaining = [], token_budget
+        for entry_id in entry_ids:
+            entry = self._entries.get(entry_id)
+            if not entry or remaining <= 0:
+                continue
+            content = entry["content"]
+            if entry["tokens"] > remaining:
+                content = content[: remaining * 4] + " ...[truncated]"
+            parts.append(f"- [{entry_id}] {entry['agent']}: {content}")
+            remaining -= min(entry["tokens"], remaining)
+        return "\n".join(parts)
+
+    def recent(self, token_budget: int, digest_budget: int) -> Tuple[str, int, int]:
+        """All entries, oldest first: the newest ones in full within `token_budget`, and older ones
+        that don't fit as digests within `digest_budget`.
+
+        Returns:
+            tuple: (text, number of entries shown as digests, number of entries left out).
+        """
+        full, digests = [], []
+        remaining, digest_remaining = token_budget, digest_budget
+        for entry_id in reversed(self.ids()):
+            entry = self._entries[entry_id]
+            if not digests and (entry["tokens"] <= remaining or not full):
+                content = entry["content"]
+                if entry["tokens"] > remaining:  # Even the newest entry alone is over budget
+                    content = content[: remaining * 4] + " ...[truncated]"
+                full.append(f"- [{entry_id}] {entry['agent']}: {content}")
+                remaining -= min(entry["tokens"], remaining)
+                continue
+            line = f"- {self.digest(entry_id)}"
+            cost = estimate_tokens(line)
+            if cost > digest_remaining:
+                break
+            digests.append(line)
+            digest_remaining -= cost
+        omitted = len(self._entries) - len(full) - len(digests)
+        lines = ([f"... {omitted} older entries omitted"] if omitted else []) + digests[::-1] + full[::-1]
+        return "\n".join(lines), len(digests), omitted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+
+    def items(self):
+        return [(agent_name, self._entries[entry_id]["content"]) for agent_name, entry_id in self._latest.items()]
+
+    def __getitem__(self, agent_name: str) -> str:
+        return self._entries[self._latest[agent_name]]["content"]
+
+    def __setitem__(self, agent_name: str, content: Any) -> None:
+        self.add(agent_name, "", content)
+
+    def __contains__(self, agent_name: str) -> bool:
+        return agent_name in self._latest
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class MessageBroker:
-    """Centralized message broker for managing inter-agent communication."""
+    """Centralized message broker for inter-agent communication.
+
+    Each subscribed agent has a bounded priority queue ("high" before "medium" before "low",
+    FIFO within a priority). Agents consume their queue when they start a task; messages older
+    than their TTL are dropped unread. Publishing and consuming are thread-safe, with `get` /
+    `aget` for blocking and asyncio consumers.
+    """
+
+    PRIORITIES = {"high": 0, "medium": 1, "low": 2}
+
+    def __init__(self, queue_size: int = 100, ttl: Optional[float] = 600.0, log_size: int = 1000):
+        """
+        Args:
+            queue_size (int): Max queued messages per agent. When full, the lowest-priority, oldest
+                              message gives way to a more urgent one; otherwise the new one is dropped.
+            ttl (float, optional): Default seconds a message stays deliverable. None keeps messages forever.
+            log_size (int): Max messages kept in `message_log`; older entries rotate out.
+        """
+        self.queue_size = max(1, queue_size)
+        self.ttl = ttl
+        self.message_log: Deque[Dict[str, Any]] = deque(maxlen=log_size)  # Logs recent communications
+        self._queues: Dict[str, List[Tuple[int, int, Dict[str, Any]]]] = {}
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._stats = {"published": 0, "delivered": 0, "expired": 0, "dropped": 0, "undeliverable": 0}
+
+    def subscribe(self, agent_name: str) -> None:
+        with self._cond:
+            self._queues.setdefault(agent_name, [])
+            self._waiters.setdefault(agent_name, [])
+
+    def unsubscribe(self, agent_name: str) -> None:
+        """Removes the agent's queue; its unread messages are discarded."""
+        with self._cond:
+            self._stats["dropped"] += len(self._queues.pop(agent_name, []))
+            for loop, future in self._waiters.pop(agent_name, []):
+                loop.call_soon_threadsafe(_resolve_future, future)  # Waiters see the queue is gone and return None
+
+    def clear(self) -> int:
+        """Discards every queued message, keeping the subscriptions. Returns how many were dropped."""
+        with self._cond:
+            dropped = sum(len(queue) for queue in self._queues.values())
+            for queue in self._queues.values():
+                queue.clear()
+            self._stats["dropped"] += dropped
+        return dropped
+
+    def publish(self, recipient: str, source: str, message: Any, priority: str = "medium", ttl: Optional[float] = None) -> bool:
+        """Queues a message for `recipient` ("*" for every subscriber).
+
+        Returns:
+            bool: False if no queue accepted the message.
+        """
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        priority = priority if priority in self.PRIORITIES else "medium"
+        with self._cond:
+            recipients = list(self._queues) if recipient == "*" else [recipient]
+            self._stats["published"] += 1
+            delivered = False
+            for name in recipients:
+                if name == source and recipient == "*":
+                    continue
+                queue = self._queues.get(name)
+                if queue is None:
+                    self._stats["undeliverable"] += 1
+                    continue
+                entry = {
+                    "recipient": name,
+                    "source": source,
+                    "message": message,
+                    "priority": priority,
+                    "timestamp": now,
+                    "expires": now + ttl if ttl is not None else None,
+                }
+                if self._push(queue, entry):
+                    delivered = True
+                    self._wake(name)
+            self.message_log.append({"recipient": recipient, "source": source, "message": message,
+                                     "priority": priority, "timestamp": now, "queued": delivered})
+            self._cond.notify_all()
+        return delivered
+
+    def consume(self, agent_name: str, max_messages: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Pops the agent's pending messages, most urgent first, without waiting."""
+        with self._cond:
+            return self._pop(agent_name, max_messages)
+
+    def get(self, agent_name: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Blocks until a message for the agent arrives; returns None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                messages = self._pop(agent_name, 1)
+                if messages:
+                    return messages[0]
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if agent_name not in self._queues or (remaining is not None and remaining <= 0):
+                    return None
+                self._cond.wait(remaining)
 
-    def __init__(self):
-        self.message_log: List[Dict[str, Any]] = []  # Logs all communications
+    async def aget(self, agent_name: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Asyncio variant of `get`: awaits a message without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._cond:
+                messages = self._pop(agent_name, 1)
+                if messages:
+                    return messages[0]
+                if agent_name not in self._queues:
+                    return None
+                future = loop.create_future()
+                self._waiters[agent_name].append((loop, future))
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                if remaining is not None and remaining <= 0:
+                    return None
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                return None
+            except asyncio.CancelledError:
+                # The caller was cancelled; hand a wake-up that already reached us to another waiter
+                with self._cond:
+                    if future.done() and not future.cancelled() and self._queues.get(agent_name):
+                        self._wake(agent_name)
+                raise
+            finally:
+                with self._cond:
+                    waiters = self._waiters.get(agent_name, [])
+                    if (loop, future) in waiters:
+                        waiters.remove((loop, future))
+
+    async def aconsume(self, agent_name: str, max_messages: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.consume(agent_name, max_messages)
 
     def process_communications(self, communication_plan: Dict[str, dict]):
-        """Processes communications, logging each message."""
+        """Publishes each message of a planner communication plan to its recipient's queue."""
         for recipient_name, comm_details in communication_plan.items():
             message = comm_details["message"]
             source_agent = comm_details["source_agent"]
             priority = comm_details.get("priority", "medium")
 
+            queued = self.publish(recipient_name, source_agent, message, priority=priority)
             print(
                 f"{Fore.MAGENTA}Message from {source_agent} to {recipient_name}: '{message}' "
-                f"(Priority: {priority}) - Logged by MessageBroker{Style.RESET_ALL}"
+                f"(Priority: {priority}) - {'Queued' if queued else 'Not delivered'} by MessageBroker{Style.RESET_ALL}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Broker-wide counters plus the depth of each agent's queue."""
+        with self._cond:
+            return dict(
+                self._stats,
+                queues={name: len(queue) for name, queue in self._queues.items()},
+                logged=len(self.message_log),
             )
 
-            self.message_log.append({
-                "recipient": recipient_name,
-                "source": source_agent,
-                "message": message,
-                "priority": priority
-            })
\ No newline at end of file
+    def _push(self, queue: List[Tuple[int, int, Dict[str, Any]]], entry: Dict[str, Any]) -> bool:
+        self._evict_expired(queue)
+        item = (self.PRIORITIES[entry["priority"]], next(self._seq), entry)
+        if len(queue) >= self.queue_size:
+            # Make room by dropping the least urgent, oldest message if the new one outranks it
+            worst = max(range(len(queue)), key=lambda i: (queue[i][0], -queue[i][1]))
+            if queue[worst][0] <= item[0]:
+                self._stats["dropped"] += 1
+                return False
+            queue[worst] = queue[-1]
+            queue.pop()
+            heapq.heapify(queue)
+            self._stats["dropped"] += 1
+        heapq.heappush(queue, item)
+        return True
+
+    def _pop(self, agent_name: str, max_messages: Optional[int]) -> List[Dict[str, Any]]:
+        queue = self._queues.get(agent_name)
+        if not queue:
+            return []
+        self._evict_expired(queue)
+        messages = []
+        while queue and (max_messages is None or len(messages) < max_messages):
+            messages.append(heapq.heappop(queue)[2])
+        self._stats["delivered"] += len(messages)
+        return messages
+
+    def _evict_expired(self, queue: List[Tuple[int, int, Dict[str, Any]]]) -> None:
+        now = time.time()
+        live = [item for item in queue if item[2]["expires"] is None or item[2]["expires"] > now]
+        if len(live) != len(queue):
+            self._stats["expired"] += len(queue) - len(live)
+            queue[:] = live
+            heapq.heapify(queue)
+
+    def _wake(self, agent_name: str) -> None:
+        """Wakes one asyncio waiter of the agent (thread waiters use the condition)."""
+        waiters = self._waiters.get(agent_name)
+        while waiters:
+            loop, future = waiters.pop(0)
+            if not future.done():
+                loop.call_soon_threadsafe(_resolve_future, future)
+                return
+
+
+def _resolve_future(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
@@ -1,11 +1,75 @@
-from llms import Gemini
-from typing import Type
+from llms import Gemini, fork_llm
+from typing import Type, Dict, Iterator, List, Optional, Tuple, Union
 import json
-from tools import StockMarketInfo
+import re
+import concurrent.futures
+from memory import estimate_tokens
+from tools import BarStore, StockMarketInfo
+from tools.indicators import format_indicators
+
+TICKERS_PROMPT = """
+You extract stock tickers from a request. The user may name companies instead of tickers; give
+their tickers. Respond only with a JSON object: {{"tickers": ["AAPL", "TSLA"]}}
+
+Request: {query}
+"""
+
+PORTFOLIO_PROMPT = """
+You are a Stock Analyst. Summarize each stock below from its details and technical indicators.
+
+## Instructions:
+- One section per stock, headed with its ticker in bold, around 60 words each.
+- Cover the company, price trend and momentum (from the indicators), recent news, concerns and a decision.
+- Only use information present in the details. Do not include any URLs or links.
+
+## Stocks:
+{stocks}
+"""
+
+
+def _parse_json(response: str):
+    response = response.strip()
+    if response.startswith("```"):
+        response = re.sub(r"^```(?:json)?|```$", "", response).strip()
+    return json.loads(response)
+
+
+def compact_details(details: Dict, indicators: Optional[Dict[str, float]] = None, summary_chars: int = 300, news_count: int = 3) -> str:
+    """A short text block of one ticker's details for a batched prompt."""
+    if "error" in details:
+        return f"### {details['ticker']}\nData unavailable ({details['error']})."
+    info = details.get("info") or {}
+    business = info.get("longBusinessSummary") or "N/A"
+    if len(business) > summary_chars:
+        business = business[:summary_chars].rsplit(" ", 1)[0] + "..."
+    price = details.get("price")
+    lines = [
+        f"### {details['ticker']} - {info.get('longName', 'N/A')} ({info.get('sector', 'N/A')} / {info.get('industry', 'N/A')})",
+        f"Price: {price:.2f}" if price else "Price: N/A",
+        f"Business: {business}",
+    ]
+    if indicators:
+        lines.append(f"Indicators: {format_indicators(indicators)}")
+    news = [article.get("title") for article in details.get("news", [])[:news_count] if article.get("title")]
+    if news:
+        lines.append("News: " + " | ".join(news))
+    return "\n".join(lines)
 
 class StockInfo:
-    def __init__(self, llm: Type[Gemini]):
+    def __init__(self, llm: Type[Gemini], indicators: bool = False, bar_store: Optional[BarStore] = None):
+        """
+        Args:
+            indicators (bool): Answer `run` with a compact block of the stock's details and its
+                               technical indicators (computed from daily bars) instead of the full
+                               details text; `collect` includes the indicators unless told otherwise.
+            bar_store (BarStore, optional): Where those bars are kept, so later queries only download
+                                            the new ones. Defaults to an on-disk store under cache/bars,
+                                            opened the first time indicators are needed.
+        """
         self.llm = llm
+        self.indicators = indicators
+        # One client for every query; lookups share its TTL cache
+        self.market = StockMarketInfo(bar_store=bar_store)
         # Set the system prompt when initializing the LLM
         self.llm.__init__(system_prompt="""
         You are an AI agent designed to give ticker to search on the stock market. 
@@ -49,18 +113,50 @@ class StockInfo:
                 response = response[7:-3].strip()
             action = json.loads(response)
             query = action['calling']['ticker']
-            info = StockMarketInfo()
-            result = info.get_stock_details(query)
-            return result
+            if self.indicators:
+                return self.collect([query])[query.strip().upper()]
+            return self.market.get_stock_details(query)
 
         except:
             return f"Failed to get info {Exception}."
 
+    def extract_tickers(self, user_query: str) -> List[str]:
+        """Extracts every ticker mentioned in the query with one LLM call."""
+        llm = fork_llm(self.llm)
+        try:
+            action = _parse_json(llm.run(TICKERS_PROMPT.format(query=user_query)))
+            tickers = action.get("tickers") or action.get("calling", {}).get("tickers") or []
+        except (ValueError, AttributeError):
+            return []
+        return list(dict.fromkeys(str(ticker).strip().upper() for ticker in tickers if str(ticker).strip()))
+
+    def get_indicators(self, tickers: List[str]) -> Dict[str, Dict[str, float]]:
+        """Indicators of the tickers from their daily bars, read through the bar store."""
+        if self.market.bar_store is None:
+            self.market.bar_store = BarStore()
+        return self.market.get_indicators(tickers)
+
+    def collect(self, tickers: List[str], indicators: Optional[bool] = None) -> Dict[str, str]:
+        """Fetches details (and, if `indicators`, defaulting to `self.indicators`, technical indicators)
+        of many tickers concurrently, as compact text blocks."""
+        indicators = self.indicators if indicators is None else indicators
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            details = executor.submit(self.market.get_many_details, tickers, False)
+            indicators = executor.submit(self.get_indicators, tickers) if indicators else None
+            details = details.result()
+            indicators = indicators.result() if indicators is not None else {}
+        return {ticker: compact_details(details[ticker], indicators.get(ticker)) for ticker in details}
+
 class StockAnalyst:
     def __init__(self,
-                 llm: Type[Gemini]) -> None:
+                 llm: Type[Gemini], indicators: bool = True) -> None:
+        """
+        Args:
+            indicators (bool): Summarize each stock from compact details and technical indicators
+                               rather than from its full details text.
+        """
         self.llm = llm
-        self.data_agent = StockInfo(llm=self.llm) # Initialize data agent
+        self.data_agent = StockInfo(llm=self.llm, indicators=indicators) # Initialize data agent
         self.llm.__init__(system_prompt="""
         You are a Stock Analyst, an AI agent designed to interact with the stock market. 
         Your work is to summarize the stock details provided to you.
@@ -84,6 +180,59 @@ class StockAnalyst:
         
         ***Remember: Your responses should be in text form only and not JSON or any other format.***""")
 
+    def run_portfolio(self, user_query: Union[str, List[str]], token_budget: int = 3000, max_concurrency: int = 4,
+                      stream: bool = False, indicators: bool = True) -> Union[str, Iterator[Tuple[List[str], str]]]:
+        """
+        Analyzes a watchlist in one pass: one LLM call extracts all tickers, their data is fetched
+        concurrently, and the stocks are summarized in batched prompts run in parallel.
+
+        Args:
+            user_query (str | list): The request, or the tickers themselves (skips extraction).
+            token_budget (int): Max estimated tokens of stock data per summary prompt.
+            max_concurrency (int): Summary prompts run at once.
+            stream (bool): Return an iterator of `(tickers, summary)` per batch, in completion
+                           order, instead of the full text.
+            indicators (bool): Include technical indicators; their daily bars are kept in the data
+                               agent's bar store, so repeated runs only download new bars.
+
+        Returns:
+            str | Iterator[Tuple[List[str], str]]: The summaries, in ticker order.
+        """
+        tickers = [t.strip().upper() for t in user_query] if isinstance(user_query, list) else self.data_agent.extract_tickers(user_query)
+        if not tickers:
+            return iter(()) if stream else "No stock tickers found in the request."
+        blocks = self.data_agent.collect(tickers, indicators=indicators)
+
+        batches: List[List[str]] = []
+        used = 0
+        for ticker, block in blocks.items():
+            tokens = estimate_tokens(block)
+            if batches and used + tokens <= token_budget:
+                batches[-1].append(ticker)
+                used += tokens
+            else:
+                batches.append([ticker])
+                used = tokens
+
+        def summarize(batch: List[str]) -> str:
+            llm = fork_llm(self.llm)  # Each batch gets its own history
+            return llm.run(PORTFOLIO_PROMPT.format(stocks="\n\n".join(blocks[ticker] for ticker in batch)))
+
+        def results() -> Iterator[Tuple[List[str], str]]:
+            with concurrent.futures.ThreadPoolExecutor(max(1, min(max_concurrency, len(batches)))) as executor:
+                futures = {executor.submit(summarize, batch): batch for batch in batches}
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        summary = future.result()
+                    except Exception as e:
+                        summary = f"Failed to summarize {', '.join(futures[future])}: {e}"
+                    yield futures[future], summary
+
+        if stream:
+            return results()
+        summaries = {tuple(batch): summary for batch, summary in results()}
+        return "\n\n".join(summaries[tuple(batch)].strip() for batch in batches)
+
     def run(self, user_query: str) -> str:
         stock_results = self.data_agent.run(user_query)
         
@@ -1,15 +1,51 @@
-from llms import Gemini  # Assuming you have defined this for your LLM
+from llms import Gemini, fork_llm  # Assuming you have defined this for your LLM
 from tools import HTMLContentScraper # Assuming this is your previous class
-from typing import Type
+from tools import SummaryCache, get_summary_cache, split_passages
+from memory import estimate_tokens
+from typing import List, Optional, Type
+import concurrent.futures
+
+CHUNK_PROMPT = """
+Summarize this section of a website's content in at most 80 words. Keep the facts, names and
+numbers that say what the site is about or offers; skip navigation and boilerplate. Do not
+include URLs, links or HTML tags.
+
+Section:
+{chunk}
+"""
+
+COMBINE_PROMPT = """
+Merge these summaries of consecutive sections of one website into a single summary of at most
+150 words, keeping the most important facts. Do not include URLs or links.
+
+Summaries:
+{summaries}
+"""
 
 class WEBAnalyst:
-    def __init__(self, url: str, llm: Type[Gemini]):
+    def __init__(self, url: str, llm: Type[Gemini], content_mode: str = "markdown", chunk_tokens: int = 3000,
+                 max_concurrency: int = 4, summary_cache: Optional[SummaryCache] = None):
+        """
+        Args:
+            content_mode (str): What the LLM reads: "markdown" or "text" (the page's main content
+                                only) or "html" (the full cleaned HTML; many more tokens).
+            chunk_tokens (int): Pages longer than this are split into chunks of about this size on
+                                heading/paragraph boundaries, summarized in parallel and then merged.
+            max_concurrency (int): Chunk summaries requested at once.
+            summary_cache (SummaryCache, optional): Chunk summaries keyed by content hash, so the
+                                                    unchanged sections of a re-analyzed page are reused.
+                                                    Defaults to the shared on-disk cache.
+        """
         self.url = url
         self.llm = llm
+        self.content_mode = content_mode
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.summary_cache = summary_cache
         self.scraper = HTMLContentScraper() # Create instance of HTMLContentScraper
 
         self.llm.__init__(system_prompt="""
-        You are a Website Analyst AI. Your job is to analyze website code 
+        You are a Website Analyst AI. Your job is to analyze website code or its extracted text
         and provide a concise summary of the website's purpose and content. 
 
         ## Instructions:
@@ -27,14 +63,69 @@ class WEBAnalyst:
         """)
 
     def run(self) -> str:
-        html_content = self.scraper.scrape_and_clean_html(self.url) # Scrape HTML
+        html_content = self.scraper.scrape_and_clean_html(self.url, mode=self.content_mode) # Scrape HTML
+        if html_content and estimate_tokens(html_content) > self.chunk_tokens:
+            return self._map_reduce(html_content)
         if html_content:
-            self.llm.add_message("user", f"Analyze this website HTML:\n```html\n{html_content}\n```")
-            response = self.llm.run("Provide a concise summary of the website based on the HTML code.")
+            kind = "HTML" if self.content_mode == "html" else "content"
+            source = "the HTML code" if self.content_mode == "html" else f"its extracted {self.content_mode} content"
+            self.llm.add_message("user", f"Analyze this website {kind}:\n```{self.content_mode}\n{html_content}\n```")
+            response = self.llm.run(f"Provide a concise summary of the website based on {source}.")
             return response
         else:
             return "Unable to fetch and analyze the website content." 
 
+    def _summarize_all(self, prompts: List[str], cache_keys: List[Optional[str]]) -> List[str]:
+        """Runs the prompts on forked LLMs, at most `max_concurrency` at a time, reusing cached results."""
+        cache = self.summary_cache if self.summary_cache is not None else get_summary_cache()
+        results: List[Optional[str]] = [cache.get(key) if key else None for key in cache_keys]
+
+        def summarize(index: int) -> None:
+            summary = fork_llm(self.llm).run(prompts[index]).strip()
+            results[index] = summary
+            if cache_keys[index]:
+                cache.set(cache_keys[index], summary)
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            with concurrent.futures.ThreadPoolExecutor(max(1, min(self.max_concurrency, len(missing)))) as executor:
+                list(executor.map(summarize, missing))
+        return results
+
+    def _map_reduce(self, content: str) -> str:
+        """Summarizes each chunk in parallel, merges the summaries until they fit one prompt, then
+        asks for the final summary."""
+        chunks = split_passages(content, max_tokens=self.chunk_tokens)
+        namespace = f"{getattr(self.llm, 'model', '')}|{CHUNK_PROMPT}"
+        summaries = self._summarize_all(
+            [CHUNK_PROMPT.format(chunk=chunk) for chunk in chunks],
+            [SummaryCache.key(chunk, namespace) for chunk in chunks],
+        )
+
+        # Reduce: merge neighbouring summaries in groups until they fit in one chunk
+        while len(summaries) > 1 and estimate_tokens("\n\n".join(summaries)) > self.chunk_tokens:
+            groups: List[List[str]] = [[]]
+            used = 0
+            for summary in summaries:
+                cost = estimate_tokens(summary)
+                if groups[-1] and used + cost > self.chunk_tokens:
+                    groups.append([])
+                    used = 0
+                groups[-1].append(summary)
+                used += cost
+            if len(groups) == len(summaries):
+                break  # Each summary alone fills a chunk; merging can't shrink them further
+            merged = self._summarize_all(
+                [COMBINE_PROMPT.format(summaries="\n\n".join(group)) for group in groups if len(group) > 1],
+                [None] * sum(len(group) > 1 for group in groups),
+            )
+            merged_iter = iter(merged)
+            summaries = [next(merged_iter) if len(group) > 1 else group[0] for group in groups]
+
+        section_summaries = "\n\n".join(f"- {summary}" for summary in summaries)
+        self.llm.add_message("user", f"Analyze these summaries of the website's sections, in page order:\n{section_summaries}")
+        return self.llm.run("Provide a concise summary of the website based on the section summaries.")
+
 # Example Usage (make sure you have a valid 'Gemini' class and API key setup)
 if __name__ == "__main__":
     target_url = "https://icrisstudio1.pythonanywhere.com/" 
@@ -8,7 +8,7 @@ from llms import GroqLLM, Gemini, Cohere  # Your LLM classes
 from tools import Tool
 from typing import Type, List, Optional, Dict, Any
 from colorama import Fore, Style
-from memory import Memory  # Import the Memory class
+from memory import Memory, SQLiteStorage, SnapshotStorage, SessionMemoryPool, CheckpointStore, get_summarizer, migrate_files_to_sqlite  # Import the Memory class
 import concurrent.futures
 
 def convert_function(func_name, description, **params):
@@ -65,8 +65,13 @@ class Agent:
         memory: bool = True,  # Enable/Disable memory
         memory_dir: str = "memories",  # Directory to store memories
         max_memory_tokens: int = 800,  # Max tokens for memory
+        memory_top_k: Optional[int] = None,  # Inject only the k most relevant memories (None = all of memory)
         memory_history_offset:int = 10250,
-        update_memory_files:bool = True
+        update_memory_files:bool = True,
+        memory_backend: str = "file",  # "file" (text files), "snapshot" (files compacted into a mmap'd snapshot) or "sqlite" (shared <memory_dir>/memory.db)
+        session_capacity: int = 128,  # Sessions kept in RAM when rollout() is given a session_id
+        memory_summarizer: str = "llm",  # "llm" or "extractive" (local TextRank, no LLM calls)
+        checkpoints: Optional[CheckpointStore] = None,  # Store for rollout(resume_id=...); defaults to <memory_dir>/checkpoints.db
     ) -> None:
         self.llm = llm
         self.tools = tools
@@ -83,22 +88,57 @@ class Agent:
         self.memory_dir = memory_dir
         if not os.path.exists(memory_dir):
             os.makedirs(memory_dir)
+        if memory_backend not in ("file", "snapshot", "sqlite"):
+            raise ValueError(f"Unknown memory backend '{memory_backend}'. Use 'file', 'snapshot' or 'sqlite'.")
+        self.memory_backend = memory_backend
+        self.max_memory_tokens = max_memory_tokens
+        self.memory_top_k = memory_top_k
+        self.memory_summarizer = memory_summarizer
+        self.checkpoints = checkpoints
+        self._run_id: Optional[str] = None  # Checkpointed run in progress, if any
+        self._steps: Dict[str, Any] = {}  # Steps saved by an earlier attempt of that run
+
+        self.memory = self._create_memory()
+        # Per-user memories for rollout(session_id=...): hot ones in RAM, cold ones on disk
+        self.sessions = SessionMemoryPool(self._create_memory, capacity=session_capacity)
 
-        self.memory = Memory(
+        self.all_functions = [
+            convert_function(tool.func.__name__, tool.description, **(tool.params or {})) for tool in self.tools
+        ] + [convert_function("llm_tool", "A default tool that returns AI-generated text responses using the context of previous tool calls for the given query. It cannot answer real-time queries due to a knowledge cutoff of October 2019.", **{})]
+
+
+    def _create_memory(self, session_id: Optional[str] = None) -> Memory:
+        """Builds the agent's default memory, or the memory of one session resumed from storage."""
+        suffix = "_" + re.sub(r"[^\w\-]", "_", session_id) if session_id is not None else ""
+        memory_filepath = os.path.join(self.memory_dir, f"{self.name}{suffix}_memory.txt")
+        chat_filepath = os.path.join(self.memory_dir, f"{self.name}{suffix}_chat.txt")
+        storage = None
+        if self.memory_backend == "sqlite":
+            storage = SQLiteStorage(os.path.join(self.memory_dir, "memory.db"), agent=self.name, session=session_id or "default")
+            if storage.is_empty() and (os.path.exists(memory_filepath) or os.path.exists(chat_filepath)):
+                migrate_files_to_sqlite(memory_filepath, chat_filepath, storage)  # One-off import of the old text files
+        elif self.memory_backend == "snapshot":
+            storage = SnapshotStorage(memory_filepath, chat_filepath)
+
+        return Memory(
             llm=self.llm,  # Pass the LLM instance for memory summarization
             status=self.memory_enabled,
-            max_tokens=max_memory_tokens,
-            memory_filepath=os.path.join(self.memory_dir, f"{self.name}_memory.txt"),
-            chat_filepath=os.path.join(self.memory_dir, f"{self.name}_chat.txt"),
-            system_prompt=f"You are {self.name}, {description}.",
+            max_tokens=self.max_memory_tokens,
+            memory_filepath=memory_filepath,
+            chat_filepath=chat_filepath,
+            system_prompt=f"You are {self.name}, {self.description}.",
             history_offset=self.offset,
             update_file=self.update_file,
+            storage=storage,
+            retrieval_top_k=self.memory_top_k,
+            resume_chat=session_id is not None,
+            # None keeps Memory's default LLM summarizer on its own forked instance
+            summarizer=None if self.memory_summarizer == "llm" else get_summarizer(self.memory_summarizer),
         )
 
-        self.all_functions = [
-            convert_function(tool.func.__name__, tool.description, **(tool.params or {})) for tool in self.tools
-        ] + [convert_function("llm_tool", "A default tool that returns AI-generated text responses using the context of previous tool calls for the given query. It cannot answer real-time queries due to a knowledge cutoff of October 2019.", **{})]
-
+    def session_stats(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Stats of the session pool, or of a single session."""
+        return self.sessions.stats(session_id)
 
     def add_tool(self, tool: Tool):
         """Add a tool dynamically."""
@@ -110,8 +150,8 @@ class Agent:
         self.tools = [tool for tool in self.tools if tool.func.__name__ != tool_name]
         self.all_functions = [func for func in self.all_functions if func['function']['name'] != tool_name]
 
-    def _run_no_tool(self) -> str:
-        prompt = self.memory.gen_complete_prompt(self.task) if self.memory_enabled else self.task
+    def _run_no_tool(self, memory: Memory) -> str:
+        prompt = memory.gen_complete_prompt(self.task) if self.memory_enabled else self.task
         self.llm.__init__(system_prompt=f"""
         You are {self.name}, {self.description}.
         ### OUTPUT STYLE:
@@ -123,11 +163,11 @@ class Agent:
         
         if self.memory_enabled:
             # Automatically update memory using the memory class
-            self.memory.update_chat_history(self.name, result, force=True)  # Update memory
+            memory.update_chat_history(self.name, result, force=True)  # Update memory
         
         return result   
 
-    def _run_with_tools(self) -> str:
+    def _run_with_tools(self, memory: Memory) -> str:
         self.llm.__init__(system_prompt=f"""
         You are an AI assistant that generates JSON responses based on provided tools.
 
@@ -248,9 +288,12 @@ class Agent:
         - Break a single task into sub-tasks and can call a single tool two times to accomplish the task with accuracy. 
         """, messages=[])
         
-        prompt = self.memory.gen_complete_prompt(self.task) if self.memory_enabled else self.task
-        response = self.llm.run(prompt).strip()
-        self.llm.reset()
+        response = self._steps.get("plan")
+        if response is None:
+            prompt = memory.gen_complete_prompt(self.task) if self.memory_enabled else self.task
+            response = self.llm.run(prompt).strip()
+            self.llm.reset()
+            self._save_step("plan", response)
 
         if self.verbose:
             print(f"{Fore.YELLOW}Raw LLM Response:{Style.RESET_ALL} {response}")
@@ -262,6 +305,9 @@ class Agent:
         results = {}
         for i, call in enumerate(action.get("func_calling", [])):
             tool_name = call["tool_name"]
+            if f"tool:{i}" in self._steps:  # Finished before the run was interrupted
+                results[call['call_ID']] = self._steps[f"tool:{i}"]
+                continue
             
             #Substitute the parameters
             parameters = call.get("parameter", {})
@@ -273,6 +319,7 @@ class Agent:
             try:
                 tool_response = self._call_tool(call, results) # Pass results to _call_tool
                 results[call['call_ID']] = tool_response  # Store output with call_ID
+                self._save_step(f"tool:{i}", tool_response)
                 if self.verbose:
                     print(f"{Fore.GREEN}Tool {tool_name}:{Style.RESET_ALL} {tool_response}")
             except Exception as e:
@@ -282,9 +329,9 @@ class Agent:
 
         if self.memory_enabled:
             # Update memory directly with JSON tool results
-            self.memory.update_chat_history("Tools", json.dumps(results, indent=2), force=True)
+            memory.update_chat_history("Tools", json.dumps(results, indent=2), force=True)
 
-        return self._generate_summary(results)
+        return self._generate_summary(results, memory)
 
   
     def _parse_and_fix_json(self, json_str: str) -> Dict | str:
@@ -362,10 +409,10 @@ class Agent:
         self.llm.reset()
         return response
 
-    def _generate_summary(self, results: Dict[str, str]) -> str:
+    def _generate_summary(self, results: Dict[str, str], memory: Memory) -> str:
         prompt = f"[QUERY]\n{self.task}\n\n[TOOLS]\n{results}"
         if self.memory_enabled:
-            prompt = self.memory.gen_complete_prompt(prompt)
+            prompt = memory.gen_complete_prompt(prompt)
         
         self.llm.__init__(system_prompt=f"""
             You are {self.name}, an AI agent. {self.description}.
@@ -393,13 +440,50 @@ class Agent:
         
         if self.memory_enabled:
             # Update memory with final summary output
-            self.memory.update_chat_history(self.name, summary, force=True)
+            memory.update_chat_history(self.name, summary, force=True)
         
         return summary
 
-    def rollout(self) -> str:
-        self.memory.add_message("User", self.task)
-        self.llm.reset()
-        if not self.tools:
-            return self._run_no_tool() if self.task else "No task provided."
-        return self._run_with_tools()
+    def rollout(self, session_id: Optional[str] = None, resume_id: Optional[str] = None) -> str:
+        """Runs the current task. With `session_id`, the run reads and writes that session's memory.
+
+        With `resume_id`, the tool plan and each tool result are checkpointed under that id. Calling
+        again with the same id after a crash skips the steps that already finished, and returns the
+        saved answer if the run had completed.
+        """
+        resuming = False
+        if resume_id is not None:
+            state = self._checkpoint_store().begin(resume_id, owner=self.name)
+            if state["status"] == "complete":
+                return state["result"]
+            # Steps saved for a different task don't apply to this one
+            self._steps = state["steps"] if state["steps"].get("task") == self.task else {}
+            resuming = bool(self._steps)
+            self._run_id = resume_id
+            self._save_step("task", self.task)
+
+        # The session's memory is passed down rather than swapped into self.memory, so runs of
+        # different sessions don't see each other's history
+        memory = self.sessions.get(session_id) if session_id is not None else self.memory
+        try:
+            if not resuming:  # The interrupted attempt already recorded the user's turn
+                memory.add_message("User", self.task)
+            self.llm.reset()
+            if not self.tools:
+                result = self._run_no_tool(memory) if self.task else "No task provided."
+            else:
+                result = self._run_with_tools(memory)
+            if self._run_id is not None:
+                self.checkpoints.finish(self._run_id, result)
+            return result
+        finally:
+            self._run_id, self._steps = None, {}
+
+    def _checkpoint_store(self) -> CheckpointStore:
+        if self.checkpoints is None:
+            self.checkpoints = CheckpointStore(os.path.join(self.memory_dir, "checkpoints.db"))
+        return self.checkpoints
+
+    def _save_step(self, key: str, value: Any) -> None:
+        if self._run_id is not None:
+            self.checkpoints.save(self._run_id, key, value)
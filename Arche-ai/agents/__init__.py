@@ -2,4 +2,5 @@ from agents.web_surfer import WebSurfer
 from agents.WebsiteAnalyst import WEBAnalyst
 from agents.StockAnalyst import StockAnalyst
 from agents.Your_Agent import Agent
-from agents.Network import TaskForce
\ No newline at end of file
+from agents.Network import TaskForce
+from agents.distributed import WorkerPool
\ No newline at end of file
@@ -0,0 +1,314 @@
+import time
+import queue
+import logging
+import itertools
+import threading
+import multiprocessing
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional, Set
+
+AgentFactory = Callable[[], List[Any]]
+
+
+def _worker_main(worker_id: int, agent_factory: AgentFactory, inbox, outbox, heartbeat_interval: float) -> None:
+    """Worker loop: builds its own agents, then runs the assignments sent to it until told to stop."""
+    # Heartbeats come from their own thread so slow agent setup or a long rollout doesn't look like a dead worker
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(heartbeat_interval):
+            outbox.put(("heartbeat", worker_id, None))
+
+    threading.Thread(target=beat, name=f"TaskForceWorker-{worker_id}-heartbeat", daemon=True).start()
+    try:
+        try:
+            agents = {agent.name: agent for agent in agent_factory()}
+        except Exception as e:
+            outbox.put(("failed", worker_id, f"{type(e).__name__}: {e}"))
+            return
+        outbox.put(("ready", worker_id, list(agents)))
+
+        while True:
+            item = inbox.get()
+            if item is None:
+                break
+            assignment_id, agent_name, task = item
+            outbox.put(("started", worker_id, assignment_id))
+            agent = agents.get(agent_name)
+            if agent is None:
+                response = f"Error: worker {worker_id} does not host agent '{agent_name}'."
+            else:
+                agent.task = task
+                try:
+                    response = agent.rollout()
+                except Exception as e:
+                    response = f"Error: {e}"
+            outbox.put(("result", worker_id, (assignment_id, response)))
+    finally:
+        stop.set()
+
+
+class _Worker:
+    def __init__(self, worker_id: int, handle, inbox):
+        self.id = worker_id
+        self.handle = handle  # multiprocessing.Process or threading.Thread
+        self.inbox = inbox
+        self.agents: Set[str] = set()
+        self.ready = False
+        self.alive = True
+        self.last_seen = time.monotonic()
+        self.in_flight: Set[int] = set()
+        self.started_at: Optional[float] = None  # When the running assignment started, if any
+
+
+class WorkerPool:
+    """Hosts TaskForce agents in worker processes (or threads) that pull assignments from queues.
+
+    Every worker builds its own agents from `agent_factory`, so agents (and their LLM clients)
+    never cross process boundaries; only `(agent name, task)` goes out and the response comes
+    back. Workers send heartbeats; a worker that dies or stops beating is replaced and its
+    unfinished assignments are handed to another worker.
+    """
+
+    def __init__(
+        self,
+        agent_factory: AgentFactory,
+        workers: int = 2,
+        backend: str = "process",
+        heartbeat_interval: float = 1.0,
+        heartbeat_timeout: float = 10.0,
+        max_attempts: int = 3,
+        respawn: bool = True,
+        assignment_timeout: Optional[float] = None,
+        start_method: Optional[str] = None,
+    ):
+        """
+        Args:
+            agent_factory (Callable[[], List[Agent]]): Builds a worker's agents. With the "process"
+                backend it must be picklable (a module-level function).
+            workers (int): Number of workers.
+            backend (str): "process" for one OS process per worker, or "thread" for an in-process
+                stand-in with the same queues and failure handling.
+            heartbeat_interval (float): Seconds between worker heartbeats.
+            heartbeat_timeout (float): A worker silent for this long is considered dead.
+            max_attempts (int): Times an assignment is tried before it fails.
+            respawn (bool): Start a replacement when a worker dies.
+            assignment_timeout (float, optional): A worker whose assignment has been running longer
+                than this is treated as hung (heartbeats alone can't tell), replaced, and its work
+                reassigned.
+            start_method (str, optional): multiprocessing start method, e.g. "spawn".
+        """
+        if backend not in ("process", "thread"):
+            raise ValueError(f"Unknown WorkerPool backend '{backend}'. Use 'process' or 'thread'.")
+        self.agent_factory = agent_factory
+        self.size = max(1, workers)
+        self.backend = backend
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.respawn = respawn
+        self.assignment_timeout = assignment_timeout
+        self._mp = multiprocessing.get_context(start_method) if backend == "process" else None
+        self._outbox = self._mp.Queue() if self._mp else queue.Queue()
+        self._lock = threading.Condition()
+        self._workers: Dict[int, _Worker] = {}
+        self._worker_ids = itertools.count(1)
+        self._assignment_ids = itertools.count(1)
+        # assignment id -> [agent name, task, attempts, future, worker id]
+        self._assignments: Dict[int, List[Any]] = {}
+        self._monitor: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {"submitted": 0, "completed": 0, "reassigned": 0, "failed": 0, "workers_lost": 0}
+
+    def __enter__(self) -> "WorkerPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self, timeout: float = 60.0) -> "WorkerPool":
+        """Starts the workers and waits until each has built its agents."""
+        with self._lock:
+            if self._monitor is not None:
+                return self
+            for _ in range(self.size):
+                self._spawn()
+            self._monitor = threading.Thread(target=self._monitor_loop, name="WorkerPool-monitor", daemon=True)
+            self._monitor.start()
+            if not self._lock.wait_for(lambda: all(w.ready or not w.alive for w in self._workers.values()), timeout):
+                logging.error("WorkerPool: timed out waiting for workers to start.")
+            if not any(w.ready for w in self._workers.values()):
+                raise RuntimeError("WorkerPool: no worker could start.")
+        return self
+
+    def hosts(self, agent_name: str) -> bool:
+        """True if a live worker hosts the agent."""
+        with self._lock:
+            return any(w.alive and agent_name in w.agents for w in self._workers.values())
+
+    def submit(self, agent_name: str, task: str) -> concurrent.futures.Future:
+        """Queues an assignment; the future resolves to the agent's response."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            if self._closed or self._monitor is None:
+                raise RuntimeError("WorkerPool is not running.")
+            assignment_id = next(self._assignment_ids)
+            self._assignments[assignment_id] = [agent_name, task, 0, future, None]
+            self._stats["submitted"] += 1
+            self._dispatch(assignment_id)
+        return future
+
+    def run(self, agent_name: str, task: str, timeout: Optional[float] = None) -> str:
+        """Runs an assignment on a worker and returns the response."""
+        return self.submit(agent_name, task).result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._stats,
+                workers=sum(w.alive for w in self._workers.values()),
+                in_flight={w.id: len(w.in_flight) for w in self._workers.values() if w.alive},
+                pending=len(self._assignments),
+            )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Lets workers finish their current assignment, then shuts them down."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers.values())
+            for worker in workers:
+                if worker.alive:
+                    worker.inbox.put(None)
+            for assignment in self._assignments.values():
+                if not assignment[3].done():
+                    assignment[3].set_exception(RuntimeError("WorkerPool stopped."))
+            self._assignments.clear()
+            self._lock.notify_all()
+        for worker in workers:
+            worker.handle.join(timeout)
+            if self.backend == "process" and worker.handle.is_alive():
+                worker.handle.terminate()
+        if self._monitor is not None:
+            self._monitor.join(timeout)
+
+    def _spawn(self) -> _Worker:
+        worker_id = next(self._worker_ids)
+        inbox = self._mp.Queue() if self._mp else queue.Queue()
+        args = (worker_id, self.agent_factory, inbox, self._outbox, self.heartbeat_interval)
+        if self._mp:
+            handle = self._mp.Process(target=_worker_main, args=args, name=f"TaskForceWorker-{worker_id}", daemon=True)
+        else:
+            handle = threading.Thread(target=_worker_main, args=args, name=f"TaskForceWorker-{worker_id}", daemon=True)
+        handle.start()
+        worker = self._workers[worker_id] = _Worker(worker_id, handle, inbox)
+        return worker
+
+    def _dispatch(self, assignment_id: int) -> None:
+        """Sends an assignment to the least-loaded live worker hosting its agent (lock held)."""
+        agent_name, task, attempts, future = self._assignments[assignment_id][:4]
+        candidates = [w for w in self._workers.values() if w.alive and w.ready and agent_name in w.agents]
+        if not candidates:
+            starting = [w for w in self._workers.values() if w.alive and not w.ready]
+            if starting:
+                return  # Dispatched once a worker reports ready
+            self._fail(assignment_id, f"no live worker hosts agent '{agent_name}'")
+            return
+        if attempts >= self.max_attempts:
+            self._fail(assignment_id, f"gave up after {attempts} attempts")
+            return
+        worker = min(candidates, key=lambda w: len(w.in_flight))
+        self._assignments[assignment_id][2] = attempts + 1
+        self._assignments[assignment_id][4] = worker.id
+        worker.in_flight.add(assignment_id)
+        worker.inbox.put((assignment_id, agent_name, task))
+
+    def _fail(self, assignment_id: int, reason: str) -> None:
+        agent_name, _, _, future = self._assignments.pop(assignment_id)[:4]
+        self._stats["failed"] += 1
+        if not future.done():
+            future.set_exception(RuntimeError(f"Assignment for '{agent_name}' failed: {reason}."))
+
+    def _monitor_loop(self) -> None:
+        while True:
+            try:
+                kind, worker_id, payload = self._outbox.get(timeout=self.heartbeat_interval)
+            except queue.Empty:
+                kind, worker_id, payload = None, None, None
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                if self._closed:
+                    return
+                worker = self._workers.get(worker_id)
+                if worker is not None and worker.alive:
+                    worker.last_seen = time.monotonic()
+                    if kind == "ready":
+                        worker.ready = True
+                        worker.agents = set(payload)
+                        self._redispatch_waiting()
+                    elif kind == "failed":
+                        logging.error(f"WorkerPool: worker {worker_id} could not build its agents: {payload}")
+                        self._lose(worker, respawn=False)
+                    elif kind == "started":
+                        worker.started_at = time.monotonic()
+                    elif kind == "result":
+                        worker.started_at = None
+                        self._complete(worker, *payload)
+                self._reap()
+                self._lock.notify_all()
+
+    def _complete(self, worker: _Worker, assignment_id: int, response: str) -> None:
+        worker.in_flight.discard(assignment_id)
+        assignment = self._assignments.get(assignment_id)
+        if assignment is None or assignment[4] != worker.id:
+            return  # Already reassigned and answered elsewhere
+        del self._assignments[assignment_id]
+        self._stats["completed"] += 1
+        if not assignment[3].done():
+            assignment[3].set_result(response)
+
+    def _reap(self) -> None:
+        """Replaces workers that exited, stopped sending heartbeats or hung, reassigning their work."""
+        now = time.monotonic()
+        for worker in list(self._workers.values()):
+            if not worker.alive:
+                continue
+            if not worker.handle.is_alive():
+                reason = "exited"
+            elif now - worker.last_seen > self.heartbeat_timeout:
+                reason = "stopped responding"
+            elif (self.assignment_timeout is not None and worker.started_at is not None
+                  and now - worker.started_at > self.assignment_timeout):
+                reason = f"exceeded the {self.assignment_timeout}s assignment timeout"
+            else:
+                continue
+            logging.error(f"WorkerPool: worker {worker.id} {reason}.")
+            self._lose(worker, respawn=self.respawn)
+
+    def _lose(self, worker: _Worker, respawn: bool) -> None:
+        worker.alive = False
+        self._stats["workers_lost"] += 1
+        if self.backend == "process" and worker.handle.is_alive():
+            worker.handle.terminate()
+        else:
+            worker.inbox.put(None)  # A thread can't be killed; a hung one exits once its assignment returns
+        # A worker that keeps crashing on startup must not be respawned forever
+        if respawn and not self._closed and self._stats["workers_lost"] <= self.size * self.max_attempts:
+            self._spawn()
+        orphaned, worker.in_flight = worker.in_flight, set()
+        for assignment_id in orphaned:
+            if assignment_id in self._assignments:
+                self._stats["reassigned"] += 1
+                self._dispatch(assignment_id)
+        self._redispatch_waiting()
+
+    def _redispatch_waiting(self) -> None:
+        """Dispatches assignments that were waiting for a worker to come up."""
+        for assignment_id, assignment in list(self._assignments.items()):
+            owner = self._workers.get(assignment[4]) if assignment[4] is not None else None
+            if owner is None or not owner.alive:
+                if assignment_id in self._assignments:
+                    self._dispatch(assignment_id)
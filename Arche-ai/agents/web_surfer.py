@@ -1,7 +1,7 @@
 import json
 from llms import GroqLLM
-from typing import Type
-from tools import web_search
+from typing import Any, Dict, Iterator, Type
+from tools import web_search, search_results, HTMLContentScraper, PassagePool, split_passages
 
 class DATA_:
     def __init__(self, llm: Type[GroqLLM]):
@@ -23,10 +23,8 @@ class DATA_:
 
         ***Always respond in a concise manner. Always return a JSON object as described above. ***""")
 
-    def run(self, user_query: str) -> str:
-        """
-        Executes the main loop of the WebSurfer agent.
-        """
+    def extract_query(self, user_query: str) -> str:
+        """Asks the LLM for the search query. Raises ValueError/KeyError on a malformed reply."""
         response = self.llm.run(user_query)
         
         # Ensure we strip any extraneous whitespace and newlines
@@ -34,12 +32,18 @@ class DATA_:
 
         # print("Raw response from LLM:", response)  # Debugging: print raw response
 
+        # Ensure the response is valid JSON
+        if response.startswith("```json") and response.endswith("```"):
+            response = response[7:-3].strip()
+        action = json.loads(response)
+        return action['calling']['query']
+
+    def run(self, user_query: str) -> str:
+        """
+        Executes the main loop of the WebSurfer agent.
+        """
         try:
-            # Ensure the response is valid JSON
-            if response.startswith("```json") and response.endswith("```"):
-                response = response[7:-3].strip()
-            action = json.loads(response)
-            query = action['calling']['query']
+            query = self.extract_query(user_query)
 
             # print("Query for web_search:", query)  # Debugging: print the query
 
@@ -54,8 +58,25 @@ class DATA_:
         
 class WebSurfer:
     def __init__(self,
-                 llm: Type[GroqLLM]) -> None:
+                 llm: Type[GroqLLM],
+                 read_pages: int = 0,
+                 token_budget: int = 2000,
+                 concurrency: int = 4,
+                 page_timeout: float = 15.0) -> None:
+        """
+        Args:
+            read_pages (int): Top results whose pages are fetched and read (concurrently) before
+                              summarizing; 0 summarizes only the search titles and snippets.
+            token_budget (int): Max estimated tokens of page passages given to the summarizer.
+            concurrency (int): Pages downloaded at once.
+            page_timeout (float): Seconds to wait for pages; slower ones are left out.
+        """
         self.llm = llm
+        self.read_pages = read_pages
+        self.token_budget = token_budget
+        self.concurrency = concurrency
+        self.page_timeout = page_timeout
+        self.scraper = HTMLContentScraper()
         self.data_agent = DATA_(llm=self.llm) # Initialize data agent
         self.llm.__init__(system_prompt="""
         You are a WebSurfer, an AI agent designed to interact with the web. 
@@ -73,13 +94,65 @@ class WebSurfer:
         
         ***Remember: Your responses should be in text form only and not JSON or any other format.***""")
 
+    def close(self) -> None:
+        """Releases the page-cleaning processes the scraper keeps between searches."""
+        self.scraper.close()
+
     def run(self, user_query: str) -> str:
+        if self.read_pages:
+            summary = ""
+            for event in self.stream(user_query):
+                if event["type"] == "summary":
+                    summary = event["text"]
+            return summary
+
         web_results = self.data_agent.run(user_query)
         
         self.llm.add_message("user", web_results)
         sweb_results = self.llm.run(f"***Summarize the web results***\n{web_results}")
         return sweb_results
 
+    def stream(self, user_query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Search-and-read pipeline: searches, reads the top `read_pages` results concurrently and
+        summarizes the passages most relevant to the query.
+
+        Yields:
+            dict: `{"type": "page", "url", "passages" | "error"}` as each page arrives (its passages
+                  are deduplicated and indexed right away), then `{"type": "summary", "text"}`.
+        """
+        try:
+            query = self.data_agent.extract_query(user_query)
+            results = search_results(query, max(3, self.read_pages))
+        except Exception as e:
+            yield {"type": "summary", "text": f"Your query could not be processed: {e}"}
+            return
+
+        pool = PassagePool()
+        urls = [result["url"] for result in results[:max(1, self.read_pages)]]
+        pages = self.scraper.scrape_many(urls, mode="markdown", concurrency=self.concurrency, timeout=self.page_timeout)
+        for page in pages:
+            if page["error"]:
+                yield {"type": "page", "url": page["url"], "error": page["error"]}
+                continue
+            added = sum(pool.add(passage, page["url"]) for passage in split_passages(page["content"]))
+            yield {"type": "page", "url": page["url"], "passages": added}
+
+        snippets = "\n".join(f"- {result['title']}: {result['description']}" for result in results)
+        sources = {result["url"]: result["title"] for result in results}
+        sections, current = [], None
+        for url, passage in pool.select(f"{user_query} {query}", self.token_budget):
+            if url != current:
+                sections.append(f"\n## {sources.get(url, url)}")
+                current = url
+            sections.append(passage)
+        web_results = (
+            f"The search results for {query} are as follows:\n{snippets}\n\n"
+            f"Relevant passages from the top pages:\n" + "\n\n".join(sections)
+        )
+        self.llm.add_message("user", web_results)
+        yield {"type": "summary", "text": self.llm.run(f"***Summarize the web results***\n{web_results}")}
+
 
 if __name__ == "__main__":
     # Make sure the Gemini class is correctly instantiated and accessible
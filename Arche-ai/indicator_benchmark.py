@@ -0,0 +1,65 @@
+"""Times the batched NumPy indicator engine against computing tickers one at a time.
+
+Runs offline on generated price histories (geometric random walks).
+
+    python indicator_benchmark.py                          # 2000 tickers x 10 years of daily bars
+    python indicator_benchmark.py --tickers 5000 --years 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from tools.indicators import TRADING_DAYS, compute_indicators
+
+
+def synthetic_closes(tickers: int, bars: int, seed: int = 0) -> np.ndarray:
+    """Random-walk closes; a tenth of the tickers listed partway through (NaN before listing)."""
+    rng = np.random.default_rng(seed)
+    closes = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (tickers, bars)), axis=1))
+    listed = rng.integers(0, bars // 2, tickers)
+    late = rng.random(tickers) < 0.1
+    for row in np.flatnonzero(late):
+        closes[row, :listed[row]] = np.nan
+    return closes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=2000, help="Number of tickers.")
+    parser.add_argument("--years", type=float, default=10, help="Years of daily bars per ticker.")
+    parser.add_argument("--sample", type=int, default=100, help="Tickers timed one at a time (extrapolated to all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the best time of.")
+    args = parser.parse_args()
+
+    bars = int(args.years * TRADING_DAYS)
+    closes = synthetic_closes(args.tickers, bars)
+    print(f"{args.tickers} tickers x {bars} bars ({closes.nbytes / 2 ** 20:.0f} MiB of closes)\n")
+
+    batched = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        results = compute_indicators(closes)
+        batched = min(batched, time.perf_counter() - start)
+
+    sample = closes[: min(args.sample, args.tickers)]
+    single = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        singles = [compute_indicators(row) for row in sample]
+        single = min(single, time.perf_counter() - start)
+    single *= args.tickers / len(sample)
+
+    # Same numbers either way
+    for name, values in results.items():
+        expected = np.array([result[name][0] for result in singles])
+        assert np.allclose(values[: len(sample)], expected, equal_nan=True), name
+
+    print(f"{'mode':<26}{'seconds':>10}{'tickers/s':>14}")
+    print(f"{'one ticker at a time':<26}{single:>10.2f}{args.tickers / single:>14.0f}   (extrapolated from {len(sample)})")
+    print(f"{'batched':<26}{batched:>10.2f}{args.tickers / batched:>14.0f}   ({single / batched:.1f}x)")
+    print(f"\n{len(results)} indicators per ticker: {', '.join(results)}")
+
+
+if __name__ == "__main__":
+    main()
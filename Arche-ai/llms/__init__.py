@@ -1,4 +1,5 @@
 from llms.Cohere import Cohere
 from llms.Groq import GroqLLM
 from llms.Gpt4o import Gpt4o
-from llms.Gemini import Gemini
\ No newline at end of file
+from llms.Gemini import Gemini
+from llms.utils import fork_llm
\ No newline at end of file
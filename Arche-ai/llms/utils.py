@@ -0,0 +1,14 @@
+import copy
+
+
+def fork_llm(llm):
+    """Returns a copy of `llm` with its own message history.
+
+    The LLM wrappers keep conversation state on the instance (`messages`, `system_prompt`), so two
+    threads driving the same instance overwrite each other's prompts. The copy shares the
+    underlying API client but nothing else.
+    """
+    clone = copy.copy(llm)
+    clone.messages = []
+    clone.system_prompt = None
+    return clone
@@ -1,8 +1,19 @@
 import os
+import time
 import threading
 import logging
-import time
-from llms import Cohere  # Replace with your actual LLM library
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+from memory.writer import BatchedWriter, get_writer
+from memory.storage import MemoryStorage, FileStorage, SQLiteStorage, migrate_files_to_sqlite
+from memory.retrieval import BM25Index, EmbeddingIndex, MemoryRetriever, estimate_tokens, tokenize
+from memory.scheduler import MaintenanceScheduler, get_scheduler
+from memory.sessions import SessionMemoryPool
+from memory.summarizer import LLMSummarizer, ExtractiveSummarizer, get_summarizer
+from memory.snapshot import SnapshotStorage, SnapshotReader
+from memory.checkpoints import CheckpointStore
+
+if TYPE_CHECKING:
+    from llms import Cohere  # Replace with your actual LLM library
 
 HISTORY_FOLDER = "MEMORIES"
 
@@ -11,7 +22,7 @@ class Memory:
 
     def __init__(
         self,
-        llm: Cohere,
+        llm: "Cohere",
         status: bool = True,
         max_tokens: int = 8000,
         memory_filepath: str = os.path.join(HISTORY_FOLDER, "memory.txt"),
@@ -19,9 +30,31 @@ class Memory:
         update_file: bool = True,
         history_offset: int = 10250,
         system_prompt: str = "You are a helpful AI assistant",
+        writer: Optional[BatchedWriter] = None,
+        storage: Optional[MemoryStorage] = None,
+        retrieval_top_k: Optional[int] = None,
+        embed_fn: Optional[Callable[[Sequence[str]], object]] = None,
+        summarize_threshold: int = 2000,
+        summary_chunk_tokens: Optional[int] = None,
+        fold_fanout: int = 4,
+        max_pending_chunks: int = 2,
+        summarizer_llm: Optional["Cohere"] = None,
+        idle_summarize_after: Optional[float] = 300,
+        scheduler: Optional[MaintenanceScheduler] = None,
+        resume_chat: bool = False,
+        summarizer: Optional[object] = None,
+        compact_interval: Optional[float] = 600,
     ):
+        # Imported here so the storage helpers in this package (used by tools/) don't load the LLM SDKs
+        from llms import fork_llm
+
         self.status = status
         self.llm = llm
+        # Summaries run on a background thread; give them their own LLM instance so they never
+        # clobber the messages/system prompt of the agent's in-flight call.
+        self.summarizer_llm = summarizer_llm or fork_llm(llm)
+        # Anything with `summarize(text, kind)`; ExtractiveSummarizer avoids the LLM call entirely
+        self.summarizer = summarizer or LLMSummarizer(self.summarizer_llm)
         self.max_tokens_to_sample = max_tokens
         self.chat_history = ""
         self.history_format = "\n%(role)s: %(content)s"
@@ -31,54 +64,87 @@ class Memory:
         self.memory_filepath = memory_filepath
         self.chat_filepath = chat_filepath
         self.system_prompt = system_prompt
+        # Defaults to the text-file layout; pass a SQLiteStorage to share memory across processes
+        self.storage = storage or FileStorage(memory_filepath, chat_filepath, writer=writer)
 
         # Ensure history folder exists
         os.makedirs(HISTORY_FOLDER, exist_ok=True) 
 
-        self.memory = self._load_memory(memory_filepath)
-        self._load_conversation(chat_filepath)
+        self._summaries: List[Tuple[int, str]] = []  # (level, summary); level > 0 means folded summaries
+        self.memory = self._load_memory()
+        self._load_conversation()
 
-        if self.system_prompt:
-            self._write_to_chat_file(self.system_prompt + "\n", mode="w") # Start with a fresh chat file
+        # With retrieval on, prompts get the top-k relevant summaries/turns within max_tokens
+        # instead of the whole memory string.
+        self.retrieval_top_k = retrieval_top_k
+        self.retriever = MemoryRetriever(embed_fn=embed_fn) if retrieval_top_k else None
+        self._summary_docs: Dict[str, List[int]] = {}  # summary -> its retriever ids, dropped once it is folded
+        if self.retriever is not None:
+            for _, summary in self._summaries:
+                self._index_summary(summary)
 
-        # Initialize 5-minute chat saving and summarization
-        self.chat_buffer = []
-        self.save_interval = 300  # 5 minutes in seconds
-        self.summarization_thread = threading.Thread(target=self._summarize_and_save_chat)
-        self.summarization_thread.daemon = True
-        self.summarization_thread.start()
+        # Summarization is driven by the size of the live (unsummarized) history: once it reaches
+        # `summarize_threshold` tokens the oldest `summary_chunk_tokens` are cut off and summarized
+        # in the background, and every `fold_fanout` summaries of one level fold into the next.
+        self.chat_buffer: List[Tuple[str, str]] = []  # Live (role, content) turns not yet summarized
+        self.summarize_threshold = summarize_threshold
+        self.summary_chunk_tokens = summary_chunk_tokens or max(1, summarize_threshold // 2)
+        self.fold_fanout = max(2, fold_fanout)
+        self._live_tokens = 0
+        self._last_update = time.monotonic()
+        self._lock = threading.RLock()
+        # Bounded: when summarization falls behind, update_chat_history blocks (backpressure)
+        self._chunk_slots = threading.BoundedSemaphore(max(1, max_pending_chunks))
 
-    def _write_to_chat_file(self, content: str, mode: str = "a") -> None:
-        """Writes content to the chat file."""
-        if self.chat_filepath:
-            try:
-                with open(self.chat_filepath, mode, encoding="utf-8") as fh:
-                    fh.write(content)
-            except IOError as e:
-                logging.error(f"Error writing to chat file: {e}")
-
-    def _load_conversation(self, filepath: str) -> None:
-        """Loads the conversation history from a file."""
-        if os.path.isfile(filepath):
-            logging.debug(f"Loading conversation from '{filepath}'")
-            try:
-                with open(filepath, encoding="utf-8") as fh:
-                    self.chat_history = fh.read().strip()
-            except IOError as e:
-                logging.error(f"Error loading conversation: {e}")
+        stored_turns = self.storage.load_turns() if resume_chat else []
+        if stored_turns:
+            # Carry on from the turns that were live when this memory was last closed
+            self.chat_buffer = [(role, content) for role, content in stored_turns if role]
+            self.chat_history = "".join(self.history_format % dict(role=r, content=c) for r, c in self.chat_buffer)
+            self._live_tokens = sum(estimate_tokens(self.history_format % dict(role=r, content=c)) for r, c in self.chat_buffer)
         else:
-            logging.debug(f"Creating new chat-history file - '{filepath}'")
-            open(filepath, "w", encoding="utf-8").close()
+            self.storage.reset_chat(self.system_prompt) # Start a fresh chat with the system prompt
 
-    def _load_memory(self, filepath: str) -> str:
-        """Loads the memory from a file, each summary on a new line."""
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    return f.read().strip()
-            except IOError as e:
-                logging.error(f"Error loading memory: {e}")
-        return ""
+        # Background work runs on the process-wide scheduler rather than a thread per instance.
+        # A disabled memory never registers, so it costs no scheduler work at all.
+        self.scheduler = scheduler or get_scheduler()
+        self.idle_summarize_after = idle_summarize_after
+        if self.status:
+            self.scheduler.register(self)
+            if idle_summarize_after:
+                self.scheduler.every(self, idle_summarize_after, self._summarize_idle_history)
+            if compact_interval and hasattr(self.storage, "compact"):
+                self.scheduler.every(self, compact_interval, self._compact_storage)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until all queued chat and memory writes are on disk."""
+        return self.storage.flush(timeout)
+
+    @property
+    def pending_writes(self) -> int:
+        """Depth of the write queue this memory writes through."""
+        return self.storage.pending_writes
+
+    def _load_conversation(self) -> None:
+        """Loads the conversation history from storage, as much of it as a prompt can use."""
+        self.chat_history = self.storage.recent_chat(self.history_offset)
+
+    def _load_memory(self) -> str:
+        """Loads the memory from storage, each summary on a new line."""
+        self._summaries = self.storage.load_leveled_summaries()
+        return "\n".join(summary for _, summary in self._summaries)
+
+    def stats(self) -> dict:
+        """Size of the live history and stored memory, for monitoring."""
+        with self._lock:
+            return {
+                "live_turns": len(self.chat_buffer),
+                "live_tokens": self._live_tokens,
+                "summaries": len(self._summaries),
+                "memory_tokens": estimate_tokens(self.memory),
+                "pending_summaries": self.scheduler.pending(self),
+                "pending_writes": self.pending_writes,
+            }
 
     def _trim_chat_history(self, chat_history: str, intro: str) -> str:
         """Trims the chat history to fit within the token limit."""
@@ -104,67 +170,188 @@ class Memory:
 
             # Include memory in the prompt
             complete_prompt = intro + "\n" + trimmed_history 
-            if self.memory:
-                complete_prompt += "\nMemory:\n" + self.memory 
+            memory = self._relevant_memory(prompt)
+            if memory:
+                complete_prompt += "\nMemory:\n" + memory 
             return complete_prompt 
         return prompt
 
+    def _relevant_memory(self, prompt: str) -> str:
+        """Returns the memory block for a prompt: all of it, or only the retrieved top-k items."""
+        if self.retriever is None:
+            return self.memory
+        with self._lock:
+            return "\n".join(self.retriever.select(prompt, self.retrieval_top_k, self.max_tokens_to_sample))
+
     def update_chat_history(self, role: str, content: str, force: bool = False) -> None:
         """Updates chat history, adding timestamps only for user messages."""
         if not self.status and not force:
             return
 
-        new_history = f"{role}: {content}"
+        new_history = self.history_format % dict(role=role, content=content)
+
+        with self._lock:
+            if self.update_file:
+                self.storage.append_turn(role, content)
 
-        if self.update_file:
-            self._write_to_chat_file(new_history + "\n")
+            self.chat_history += new_history
+            self.chat_buffer.append((role, content))
+            self._live_tokens += estimate_tokens(new_history)
+            self._last_update = time.monotonic()
+            chunk = self._cut_chunk() if self._live_tokens >= self.summarize_threshold else None
 
-        self.chat_history += new_history
-        self.chat_buffer.append(new_history) 
+        if chunk:
+            self._submit_chunk(chunk)
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the chat history."""
         self.update_chat_history(role, content)
 
-    def _summarize_and_save_chat(self):
-        """Periodically summarizes and saves the chat buffer to memory."""
+    def _cut_chunk(self, limit: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Removes the oldest turns, up to `limit` tokens, from the live history. Caller holds the lock."""
+        limit = limit or self.summary_chunk_tokens
+        chunk, tokens = [], 0
+        while self.chat_buffer and (not chunk or tokens < limit):
+            turn = self.chat_buffer.pop(0)
+            chunk.append(turn)
+            tokens += estimate_tokens(self.history_format % dict(role=turn[0], content=turn[1]))
+        self._live_tokens -= tokens
+        # The summary will stand in for these turns, so they leave the prompt history now
+        self.chat_history = "".join(self.history_format % dict(role=r, content=c) for r, c in self.chat_buffer)
+        return chunk
+
+    def _restore_chunk(self, chunk: List[Tuple[str, str]]) -> None:
+        """Puts back a chunk that couldn't be summarized, ahead of the live turns, to be retried."""
+        with self._lock:
+            self.chat_buffer[:0] = chunk
+            self._live_tokens += sum(estimate_tokens(self.history_format % dict(role=r, content=c)) for r, c in chunk)
+            self.chat_history = "".join(self.history_format % dict(role=r, content=c) for r, c in self.chat_buffer)
+
+    def summarize_now(self) -> None:
+        """Queues the whole live history for summarization regardless of the threshold."""
+        with self._lock:
+            chunk = self._cut_chunk(limit=float("inf")) if self.chat_buffer else None
+        if chunk:
+            self._submit_chunk(chunk)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Waits for queued summaries to finish, unregisters from the scheduler and flushes storage."""
+        self.scheduler.unregister(self, wait=True, timeout=timeout)
+        self.flush(timeout)
+
+    def _submit_chunk(self, chunk: List[Tuple[str, str]]) -> None:
+        """Queues a chunk for summarization, blocking while `max_pending_chunks` are already queued."""
+        self._chunk_slots.acquire()
+
+        def job():
+            try:
+                self._summarize_and_save_chat(chunk)
+            finally:
+                self._chunk_slots.release()
+
+        try:
+            self.scheduler.submit(self, job)
+        except Exception as e:  # e.g. the scheduler was shut down; keep the turns live instead
+            self._chunk_slots.release()
+            logging.error(f"Error queueing chat summary: {e}")
+            self._restore_chunk(chunk)
+
+    def _summarize_idle_history(self) -> None:
+        """Periodic job: summarizes whatever is live once the chat has been quiet for a while."""
+        with self._lock:
+            if not self.chat_buffer or time.monotonic() - self._last_update < self.idle_summarize_after:
+                return
+            chunk = self._cut_chunk(limit=float("inf"))
+        # Already on a scheduler worker: summarize inline rather than queueing behind ourselves
+        self._summarize_and_save_chat(chunk)
+
+    def _compact_storage(self) -> None:
+        """Periodic job: folds the storage's text-file tail into its snapshot once it grows too big."""
+        with self._lock:  # No appends may land between reading the tail and truncating it
+            if self.storage.needs_compaction():
+                self.storage.compact()
+
+    def _summarize_and_save_chat(self, chunk: List[Tuple[str, str]]) -> None:
+        """Summarizes a chunk cut from the live history and saves it to memory."""
+        try:
+            chat_summary = self._summarize_chat(chunk)
+        except Exception as e:
+            logging.error(f"Error summarizing chat: {e}")
+            self._restore_chunk(chunk)
+            return
+
+        with self._lock:
+            self._save_memory(chat_summary)
+            if self.retriever is not None:
+                # Older turns stay retrievable after they leave the chat file
+                for role, content in chunk:
+                    self.retriever.add(f"{role}: {content}")
+
+            # The summary stands in for these turns now; the live ones stay where they are
+            if self.update_file:
+                self.storage.truncate_chat(chunk)
+
+        self._fold_summaries()
+
+    def _fold_summaries(self) -> None:
+        """Folds the oldest `fold_fanout` summaries of a level into one summary of the next level."""
         while True:
-            time.sleep(self.save_interval)
-            if self.chat_buffer:  # Only summarize if there are messages in the buffer
-                chat_summary = self._summarize_chat(self.chat_buffer)
-                self._save_memory(chat_summary)
-                self.chat_buffer.clear()
-
-                # Clear the chat file after summarizing 
-                try:
-                    with open(self.chat_filepath, "w", encoding="utf-8") as chat_file:
-                        # Write the system prompt again for a fresh start
-                        if self.system_prompt:
-                            chat_file.write(self.system_prompt + "\n")
-                except IOError as e:
-                    logging.error(f"Error clearing chat file: {e}")
+            with self._lock:
+                levels = [level for level, _ in self._summaries]
+                level = next((l for l in sorted(set(levels)) if levels.count(l) >= self.fold_fanout), None)
+                if level is None:
+                    return
+                group = [summary for l, summary in self._summaries if l == level][: self.fold_fanout]
+
+            try:
+                folded = self._summarize_text("\n\n".join(group), kind="series of conversation summaries")
+            except Exception as e:
+                logging.error(f"Error folding summaries: {e}")
+                return
+
+            with self._lock:
+                remaining = list(self._summaries)
+                for summary in group:
+                    remaining.remove((level, summary))
+                # The folded summary takes the place of the oldest summary it replaces
+                position = self._summaries.index((level, group[0]))
+                remaining.insert(position, (level + 1, folded))
+                self._summaries = remaining
+                self.memory = "\n".join(summary for _, summary in self._summaries)
+                self.storage.replace_summaries(
+                    [summary for _, summary in self._summaries], levels=[l for l, _ in self._summaries]
+                )
+                if self.retriever is not None:
+                    # The folded summary supersedes the group; retrieving both would repeat the facts
+                    for summary in group:
+                        ids = self._summary_docs.get(summary)
+                        if ids:
+                            self.retriever.remove(ids.pop(0))
+                            if not ids:
+                                del self._summary_docs[summary]
+                    self._index_summary(folded)
+
+    def _index_summary(self, summary: str) -> None:
+        """Adds a summary to the retriever, remembering its id. Caller holds the lock."""
+        doc_id = self.retriever.add(summary)
+        if doc_id is not None:
+            self._summary_docs.setdefault(summary, []).append(doc_id)
 
     def _summarize_chat(self, chat_log: list) -> str:
         """Summarizes the chat log into a concise summary."""
-        full_chat = "".join(chat_log)
-        prompt = f"""
-        You are a highly advanced AI assistant tasked with summarizing a conversation.
-        Given the following conversation, create a concise summary, focusing on user requests or preferences, actions taken, and important information exchanged. 
-        Limit your summary to 250 words. 
+        full_chat = "".join(self.history_format % dict(role=role, content=content) for role, content in chat_log)
+        return self._summarize_text(full_chat)
 
-        Conversation:
-        {full_chat}
-
-        Summary:
-        """
-        summary = self.llm.run(prompt)
-        return summary.strip()
+    def _summarize_text(self, full_chat: str, kind: str = "conversation") -> str:
+        """Runs the configured summarizer (by default, the LLM on its own instance)."""
+        return self.summarizer.summarize(full_chat, kind=kind)
 
     def _save_memory(self, summary: str) -> None:
-        """Saves the memory summary to the file, each summary on a new line."""
-        try:
-            with open(self.memory_filepath, "a", encoding="utf-8") as f:  # Append to the file
-                f.write(summary + "\n") 
-            self.memory = self._load_memory(self.memory_filepath) # Reload memory to include the new summary
-        except IOError as e:
-            logging.error(f"Error saving memory: {e}")
\ No newline at end of file
+        """Saves the memory summary to storage, each summary on a new line."""
+        with self._lock:
+            self.storage.append_summary(summary)
+            if self.retriever is not None:
+                self._index_summary(summary)
+            # Keep the in-RAM copy in step instead of re-reading the whole file
+            self._summaries.append((0, summary))
+            self.memory = (self.memory + "\n" + summary).strip() if self.memory else summary.strip()
\ No newline at end of file
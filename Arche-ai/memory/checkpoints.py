@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from memory.connections import ThreadLocalConnection
+
+
+class CheckpointStore:
+    """Durable step results of agent and TaskForce rollouts, in a local SQLite database (WAL mode).
+
+    A run is identified by its `run_id`; each completed step is saved under a key, so a rerun with
+    the same id can skip the steps that already finished. Finished runs keep their final answer
+    until `gc` removes them.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        status TEXT NOT NULL,
+        result TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_runs_updated ON runs (updated_at);
+    CREATE TABLE IF NOT EXISTS steps (
+        run_id TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (run_id, key)
+    );
+    """
+
+    def __init__(self, db_path: str = os.path.join("checkpoints", "checkpoints.db"), max_age: float = 7 * 24 * 3600,
+                 max_runs: int = 500, timeout: float = 30.0):
+        """
+        Args:
+            db_path (str): Path of the SQLite database file, created if missing.
+            max_age (float): `gc` deletes runs not updated for this many seconds.
+            max_runs (int): `gc` keeps at most this many runs, dropping the least recently updated.
+            timeout (float): Seconds to wait on a lock held by another process.
+        """
+        self.db_path = db_path
+        self.max_age = max_age
+        self.max_runs = max_runs
+        self._connect = ThreadLocalConnection(self.db_path, timeout)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+        self.gc()
+
+    @staticmethod
+    def new_run_id() -> str:
+        return uuid.uuid4().hex
+
+    def begin(self, run_id: str, owner: str) -> Dict[str, Any]:
+        """Opens (or reopens) a run and returns its saved state.
+
+        Returns:
+            dict: `status` ("running" or "complete"), `result` (the final answer, if complete) and
+                  `steps` (key -> saved value).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT status, result FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO runs (run_id, owner, status, created_at, updated_at) VALUES (?, ?, 'running', ?, ?)",
+                    (run_id, owner, now, now),
+                )
+                return {"status": "running", "result": None, "steps": {}}
+            steps = conn.execute("SELECT key, value FROM steps WHERE run_id = ?", (run_id,)).fetchall()
+        return {
+            "status": row[0],
+            "result": json.loads(row[1]) if row[1] is not None else None,
+            "steps": {key: json.loads(value) for key, value in steps},
+        }
+
+    def save(self, run_id: str, key: str, value: Any) -> None:
+        """Records a completed step (overwriting an earlier value for the same key)."""
+        now = time.time()
+        payload = json.dumps(value, default=str)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO steps (run_id, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (run_id, key, payload, now),
+            )
+            conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+
+    def finish(self, run_id: str, result: Any) -> None:
+        """Marks the run complete and drops its intermediate steps, keeping only the final answer."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET status = 'complete', result = ?, updated_at = ? WHERE run_id = ?",
+                (json.dumps(result, default=str), time.time(), run_id),
+            )
+            conn.execute("DELETE FROM steps WHERE run_id = ?", (run_id,))
+
+    def delete(self, run_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM steps WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def gc(self, max_age: Optional[float] = None, max_runs: Optional[int] = None) -> int:
+        """Deletes runs older than `max_age` and all but the `max_runs` most recent ones.
+
+        Returns:
+            int: Number of runs deleted.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        max_runs = self.max_runs if max_runs is None else max_runs
+        with self._connect() as conn:
+            stale = conn.execute(
+                "SELECT run_id FROM runs WHERE updated_at < ? "
+                "UNION SELECT run_id FROM runs WHERE run_id NOT IN "
+                "(SELECT run_id FROM runs ORDER BY updated_at DESC LIMIT ?)",
+                (time.time() - max_age, max_runs),
+            ).fetchall()
+            conn.executemany("DELETE FROM steps WHERE run_id = ?", stale)
+            conn.executemany("DELETE FROM runs WHERE run_id = ?", stale)
+        return len(stale)
+
+    def close(self) -> None:
+        self._connect.close()
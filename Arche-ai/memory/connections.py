@@ -0,0 +1,40 @@
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """Opens one connection per thread to a SQLite database, in WAL mode, on first use.
+
+    sqlite3 connections can't be shared across threads, so every thread calling the instance
+    gets (and keeps reusing) its own.
+    """
+
+    def __init__(self, db_path: str, timeout: float = 30.0):
+        """
+        Args:
+            db_path (str): Path of the SQLite database file; its directory is created if missing.
+            timeout (float): Seconds to wait on a lock held by another process.
+        """
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Closes the calling thread's connection, if it opened one."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,190 @@
+import re
+import math
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for prompt budgeting."""
+    return (len(text) + 3) // 4
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cases and splits text into alphanumeric terms."""
+    return _WORD.findall(text.lower())
+
+
+class BM25Index:
+    """Incremental Okapi BM25 index over short documents (summaries, chat turns).
+
+    Removed documents are tombstoned: they keep their id (and their slot in `documents`) but no
+    longer count towards the statistics or show up in results.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: List[str] = []
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}  # term -> [(doc_id, term frequency)]
+        self._total_length = 0
+        self._removed: set = set()
+
+    def __len__(self) -> int:
+        """Number of ids handed out, removed documents included."""
+        return len(self.documents)
+
+    def add(self, text: str) -> int:
+        """Indexes `text` and returns its document id."""
+        doc_id = len(self.documents)
+        terms = Counter(tokenize(text))
+        self.documents.append(text)
+        length = sum(terms.values())
+        self._lengths.append(length)
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, []).append((doc_id, tf))
+        return doc_id
+
+    def remove(self, doc_id: int) -> None:
+        """Drops a document from future results."""
+        if doc_id in self._removed or not 0 <= doc_id < len(self.documents):
+            return
+        self._removed.add(doc_id)
+        self._total_length -= self._lengths[doc_id]
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Returns up to `k` `(doc_id, score)` pairs, best first. Documents sharing no terms are skipped."""
+        n = len(self.documents) - len(self._removed)
+        if n <= 0:
+            return []
+        avg_length = self._total_length / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings and self._removed:
+                postings = [posting for posting in postings if posting[0] not in self._removed]
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class EmbeddingIndex:
+    """Dense index storing unit-normalised embeddings in a compact float16 NumPy matrix.
+
+    `embed_fn` maps a list of strings to an `(n, dim)` array, e.g. a CPU sentence-transformers
+    model's `encode`.
+    """
+
+    def __init__(self, embed_fn: Callable[[Sequence[str]], "object"], initial_capacity: int = 256):
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError("EmbeddingIndex requires numpy (`pip install numpy`).") from e
+        self._np = np
+        self.embed_fn = embed_fn
+        self._matrix = None
+        self._capacity = initial_capacity
+        self._size = 0
+        self._removed: set = set()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _embed(self, texts: Sequence[str]):
+        np = self._np
+        vectors = np.asarray(self.embed_fn(list(texts)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add(self, text: str) -> int:
+        np = self._np
+        vector = self._embed([text])[0]
+        if self._matrix is None:
+            self._matrix = np.zeros((self._capacity, vector.shape[0]), dtype=np.float16)
+        elif self._size == self._matrix.shape[0]:
+            grown = np.zeros((self._matrix.shape[0] * 2, self._matrix.shape[1]), dtype=np.float16)
+            grown[: self._size] = self._matrix
+            self._matrix = grown
+        self._matrix[self._size] = vector
+        self._size += 1
+        return self._size - 1
+
+    def remove(self, doc_id: int) -> None:
+        """Drops a vector from future results; its id is not reused."""
+        if 0 <= doc_id < self._size:
+            self._removed.add(doc_id)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Returns up to `k` `(doc_id, cosine similarity)` pairs, best first."""
+        live = self._size - len(self._removed)
+        if live <= 0:
+            return []
+        np = self._np
+        scores = self._matrix[: self._size].astype(np.float32) @ self._embed([query])[0]
+        if self._removed:
+            scores[list(self._removed)] = -np.inf
+        k = min(k, live)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+class MemoryRetriever:
+    """Picks the past summaries/turns most relevant to a prompt, within a token budget.
+
+    Scores are BM25, optionally blended with embedding cosine similarity when `embed_fn` is given.
+    """
+
+    def __init__(self, embed_fn: Optional[Callable[[Sequence[str]], "object"]] = None):
+        self.lexical = BM25Index()
+        self.dense = EmbeddingIndex(embed_fn) if embed_fn else None
+
+    def __len__(self) -> int:
+        return len(self.lexical)
+
+    def add(self, text: str) -> Optional[int]:
+        """Indexes `text`; returns its id for `remove`, or None if it was blank."""
+        text = text.strip()
+        if not text:
+            return None
+        doc_id = self.lexical.add(text)
+        if self.dense is not None:
+            self.dense.add(text)
+        return doc_id
+
+    def remove(self, doc_id: int) -> None:
+        """Stops returning an item, e.g. summaries folded into a newer one."""
+        self.lexical.remove(doc_id)
+        if self.dense is not None:
+            self.dense.remove(doc_id)
+
+    def select(self, query: str, top_k: int = 5, token_budget: int = 800) -> List[str]:
+        """Returns at most `top_k` relevant items fitting `token_budget`, in the order they were added."""
+        candidates = top_k * 3  # over-fetch so the blend and the budget have room to choose
+        scores: Dict[int, float] = {}
+        lexical = self.lexical.search(query, candidates)
+        if lexical:
+            best = lexical[0][1] or 1.0
+            for doc_id, score in lexical:
+                scores[doc_id] = score / best
+        if self.dense is not None:
+            for doc_id, score in self.dense.search(query, candidates):
+                scores[doc_id] = scores.get(doc_id, 0.0) + max(score, 0.0)
+
+        chosen, used = [], 0
+        for doc_id, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            cost = estimate_tokens(self.lexical.documents[doc_id])
+            if used + cost > token_budget:
+                continue
+            chosen.append(doc_id)
+            used += cost
+            if len(chosen) == top_k:
+                break
+        return [self.lexical.documents[doc_id] for doc_id in sorted(chosen)]
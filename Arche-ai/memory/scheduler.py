@@ -0,0 +1,157 @@
+import time
+import heapq
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class MaintenanceScheduler:
+    """Process-wide pool that runs background jobs (summaries, idle flushes) for many owners.
+
+    Jobs of one owner run one at a time and in submission order; different owners run in
+    parallel on up to `workers` threads. Periodic jobs are kept in a timer heap that the idle
+    workers sleep on, so an idle process holds `workers` threads instead of one per `Memory`.
+    """
+
+    def __init__(self, workers: int = 2):
+        self._cond = threading.Condition()
+        self._owners: set = set()
+        self._jobs: Dict[Any, Deque[Callable[[], None]]] = {}
+        self._ready: Deque[Any] = deque()  # Owners with queued jobs and none running
+        self._running: set = set()
+        self._timers: List[Tuple[float, int, Any, float, Callable[[], None]]] = []
+        self._timer_seq = 0
+        self._closed = False
+        self._stats = {"jobs_run": 0, "job_errors": 0}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"MaintenanceScheduler-{i}", daemon=True) for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.shutdown)
+
+    def register(self, owner: Any) -> None:
+        with self._cond:
+            self._owners.add(owner)
+
+    def unregister(self, owner: Any, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """Cancels the owner's periodic jobs and optionally waits for its queued jobs to finish.
+
+        Returns False if `timeout` expired with jobs still pending.
+        """
+        with self._cond:
+            self._owners.discard(owner)
+            self._timers = [timer for timer in self._timers if timer[2] is not owner]
+            heapq.heapify(self._timers)
+            if not wait:
+                return True
+            return self._cond.wait_for(lambda: owner not in self._jobs and owner not in self._running, timeout)
+
+    def submit(self, owner: Any, job: Callable[[], None]) -> None:
+        """Queues `job` to run after the owner's previously submitted jobs."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MaintenanceScheduler has been shut down.")
+            self._enqueue(owner, job)
+            self._cond.notify()
+
+    def every(self, owner: Any, interval: float, job: Callable[[], None]) -> None:
+        """Runs `job` for `owner` every `interval` seconds until the owner is unregistered."""
+        with self._cond:
+            self._owners.add(owner)
+            self._push_timer(time.monotonic() + interval, owner, interval, job)
+            self._cond.notify()
+
+    def pending(self, owner: Any = None) -> int:
+        """Number of queued (not yet started) jobs, for one owner or in total."""
+        with self._cond:
+            if owner is not None:
+                return len(self._jobs.get(owner, ()))
+            return sum(len(jobs) for jobs in self._jobs.values())
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(
+                self._stats,
+                owners=len(self._owners),
+                pending=sum(len(jobs) for jobs in self._jobs.values()),
+                running=len(self._running),
+                timers=len(self._timers),
+                workers=len(self._threads),
+            )
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = 10.0) -> None:
+        """Stops accepting jobs; queued jobs still run before the workers exit."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._timers.clear()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout)
+
+    def _enqueue(self, owner: Any, job: Callable[[], None]) -> None:
+        jobs = self._jobs.setdefault(owner, deque())
+        jobs.append(job)
+        if len(jobs) == 1 and owner not in self._running:
+            self._ready.append(owner)
+
+    def _push_timer(self, due: float, owner: Any, interval: float, job: Callable[[], None]) -> None:
+        self._timer_seq += 1
+        heapq.heappush(self._timers, (due, self._timer_seq, owner, interval, job))
+
+    def _promote_due_timers(self) -> Optional[float]:
+        """Moves due periodic jobs onto their owners' queues; returns seconds until the next timer."""
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            _, _, owner, interval, job = heapq.heappop(self._timers)
+            if owner in self._owners:
+                self._enqueue(owner, job)
+                self._push_timer(now + interval, owner, interval, job)
+        return self._timers[0][0] - now if self._timers else None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    wait = self._promote_due_timers()
+                    if self._ready:
+                        owner = self._ready.popleft()
+                        job = self._jobs[owner].popleft()
+                        self._running.add(owner)
+                        break
+                    if self._closed:
+                        return
+                    self._cond.wait(wait)
+
+            try:
+                job()
+                self._stats["jobs_run"] += 1
+            except Exception as e:
+                logging.error(f"Error in maintenance job: {e}")
+                self._stats["job_errors"] += 1
+
+            with self._cond:
+                self._running.discard(owner)
+                if self._jobs.get(owner):
+                    self._ready.append(owner)
+                else:
+                    self._jobs.pop(owner, None)
+                self._cond.notify_all()
+
+
+_default_scheduler: Optional[MaintenanceScheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> MaintenanceScheduler:
+    """Returns the process-wide scheduler shared by `Memory` instances that don't bring their own."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None or _default_scheduler._closed:
+            _default_scheduler = MaintenanceScheduler()
+        return _default_scheduler
@@ -0,0 +1,148 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from memory import Memory
+
+
+class SessionMemoryPool:
+    """LRU of per-session `Memory` objects for an agent serving many end users.
+
+    Hot sessions stay in RAM. When more than `capacity` are loaded, the least recently used one
+    is closed (its queued summaries finish and its writes are flushed) and dropped. It is loaded
+    again from storage on its next use, live turns included, once that close has finished.
+    Sessions load outside the pool lock, so a cold load only delays callers of the same session.
+    """
+
+    def __init__(self, factory: Callable[[str], "Memory"], capacity: int = 128):
+        """
+        Args:
+            factory (Callable[[str], Memory]): Builds the memory for a session id, resuming from storage.
+            capacity (int): Max sessions kept in RAM.
+        """
+        self.factory = factory
+        self.capacity = max(1, capacity)
+        self._sessions: "OrderedDict[str, Memory]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}  # session id -> the memory being built for it
+        self._closing: Dict[str, threading.Event] = {}  # session id -> set once its evicted memory is closed
+        # Counters of the loaded sessions and the most recently evicted ones, capped so that a
+        # stream of one-off sessions doesn't grow them forever.
+        self._session_stats: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats_capacity = self.capacity * 4
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> "Memory":
+        """Returns the session's memory, loading it (and evicting the coldest session) on a miss."""
+        with self._lock:
+            session_stats = self._touch_stats(session_id)
+            memory = self._sessions.get(session_id)
+            if memory is not None:
+                self._sessions.move_to_end(session_id)
+                self._stats["hits"] += 1
+                session_stats["hits"] += 1
+                return memory
+            loading = self._loading.get(session_id)
+            if loading is not None:
+                self._stats["hits"] += 1
+                session_stats["hits"] += 1
+                owner = False
+            else:
+                self._stats["misses"] += 1
+                session_stats["loads"] += 1
+                loading = self._loading[session_id] = Future()
+                closing = self._closing.get(session_id)
+                owner = True
+        if not owner:
+            return loading.result()  # Another caller is loading this session; share its memory
+        return self._load(session_id, loading, closing)
+
+    def _load(self, session_id: str, loading: Future, closing: Optional[threading.Event]) -> "Memory":
+        """Builds a session's memory once any earlier memory of it is closed, then evicts the coldest."""
+        try:
+            if closing is not None:
+                closing.wait()  # Its summaries and writes must be in storage before it is read back
+            memory = self.factory(session_id)
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(session_id, None)
+            loading.set_exception(e)
+            raise
+
+        with self._lock:
+            self._sessions[session_id] = memory
+            self._loading.pop(session_id, None)
+            evicted = []
+            while len(self._sessions) > self.capacity:
+                evicted.append(self._pop(*self._sessions.popitem(last=False)))
+        loading.set_result(memory)
+
+        # Closing waits on the evicted session's summaries; keep that outside the lock.
+        for cold in evicted:
+            self._close(*cold)
+        return memory
+
+    def _touch_stats(self, session_id: str) -> Dict[str, Any]:
+        """Returns a session's counters, marking it used and dropping the oldest beyond the cap. Caller holds the lock."""
+        session_stats = self._session_stats.pop(session_id, None) or {"hits": 0, "loads": 0, "last_used": None}
+        session_stats["last_used"] = time.time()
+        self._session_stats[session_id] = session_stats
+        while len(self._session_stats) > self._stats_capacity:
+            stale = next((sid for sid in self._session_stats if sid not in self._sessions and sid not in self._loading), None)
+            if stale is None:
+                break
+            del self._session_stats[stale]
+        return session_stats
+
+    def _pop(self, session_id: str, memory: "Memory") -> Tuple[str, "Memory", threading.Event]:
+        """Marks a memory just removed from `_sessions` as closing. Caller holds the lock."""
+        self._stats["evictions"] += 1
+        closing = self._closing[session_id] = threading.Event()
+        return session_id, memory, closing
+
+    def _close(self, session_id: str, memory: "Memory", closing: threading.Event) -> None:
+        try:
+            memory.close()
+        finally:
+            with self._lock:
+                if self._closing.get(session_id) is closing:
+                    del self._closing[session_id]
+            closing.set()
+
+    def evict(self, session_id: str) -> bool:
+        """Writes a session back to storage and drops it from RAM. Returns False if it wasn't loaded."""
+        with self._lock:
+            memory = self._sessions.pop(session_id, None)
+            if memory is None:
+                return False
+            cold = self._pop(session_id, memory)
+        self._close(*cold)
+        return True
+
+    def close(self) -> None:
+        """Evicts every loaded session."""
+        with self._lock:
+            evicted = [self._pop(*item) for item in self._sessions.items()]
+            self._sessions.clear()
+        for cold in evicted:
+            self._close(*cold)
+
+    def stats(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Pool-wide counters, or the counters and memory sizes of one session."""
+        with self._lock:
+            if session_id is None:
+                return dict(self._stats, loaded=len(self._sessions), capacity=self.capacity)
+            memory = self._sessions.get(session_id)
+            session_stats = dict(self._session_stats.get(session_id, {}), loaded=memory is not None)
+        if memory is not None:
+            session_stats.update(memory.stats())
+        return session_stats
@@ -0,0 +1,237 @@
+import os
+import mmap
+import zlib
+import struct
+import logging
+from typing import Iterator, List, Optional, Tuple
+
+from memory.storage import FileStorage, Summary, Turn, parse_chat
+from memory.writer import BatchedWriter
+
+# Layout: MAGIC | records... | index entries | footer
+#   record: zlib("role\0content") for turns, zlib("content") for level-0 summaries and
+#           zlib("level\0content") for folded ones
+#   index entry: offset (u64), length (u32), kind (u8)
+#   footer: index offset (u64), entry count (u32), MAGIC
+MAGIC = b"ARCHSNP1"
+SUMMARY, TURN, FOLDED_SUMMARY = 0, 1, 2
+_ENTRY = struct.Struct("<QIB")
+_FOOTER = struct.Struct("<QI8s")
+
+
+def write_snapshot(path: str, records: List[Tuple[int, bytes]]) -> None:
+    """Atomically writes `(kind, compressed record)` pairs as a snapshot file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(MAGIC)
+        entries = []
+        for kind, blob in records:
+            entries.append(_ENTRY.pack(fh.tell(), len(blob), kind))
+            fh.write(blob)
+        index_offset = fh.tell()
+        fh.write(b"".join(entries))
+        fh.write(_FOOTER.pack(index_offset, len(entries), MAGIC))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+def encode_turn(role: Optional[str], content: str) -> bytes:
+    return zlib.compress(f"{role or ''}\0{content}".encode("utf-8"))
+
+
+def encode_summary(summary: str, level: int = 0) -> Tuple[int, bytes]:
+    """`(kind, compressed record)` of a summary."""
+    if level:
+        return FOLDED_SUMMARY, zlib.compress(f"{level}\0{summary}".encode("utf-8"))
+    return SUMMARY, zlib.compress(summary.encode("utf-8"))
+
+
+class SnapshotReader:
+    """Memory-maps a snapshot and decodes records only when they are asked for."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        index_offset, count, magic = _FOOTER.unpack_from(self._map, len(self._map) - _FOOTER.size)
+        if magic != MAGIC or self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a memory snapshot.")
+        entries = [_ENTRY.unpack_from(self._map, index_offset + i * _ENTRY.size) for i in range(count)]
+        # Only the small index is decoded up front
+        self._summaries = [(offset, length, kind) for offset, length, kind in entries if kind != TURN]
+        self._turns = [(offset, length, kind) for offset, length, kind in entries if kind == TURN]
+
+    @property
+    def turn_count(self) -> int:
+        return len(self._turns)
+
+    @property
+    def summary_count(self) -> int:
+        return len(self._summaries)
+
+    def raw_records(self, kind: int) -> List[Tuple[int, bytes]]:
+        """Compressed turn (`TURN`) or summary (`SUMMARY`) records, for rewriting a snapshot
+        without decoding it."""
+        spans = self._turns if kind == TURN else self._summaries
+        return [(record_kind, self._map[offset: offset + length]) for offset, length, record_kind in spans]
+
+    def summary(self, i: int) -> Summary:
+        offset, length, kind = self._summaries[i]
+        text = zlib.decompress(self._map[offset: offset + length]).decode("utf-8")
+        if kind == FOLDED_SUMMARY:
+            level, text = text.split("\0", 1)
+            return int(level), text
+        return 0, text
+
+    def turn(self, i: int) -> Turn:
+        offset, length, _ = self._turns[i]
+        role, content = zlib.decompress(self._map[offset: offset + length]).decode("utf-8").split("\0", 1)
+        return role or None, content
+
+    def summaries(self) -> List[Summary]:
+        return [self.summary(i) for i in range(self.summary_count)]
+
+    def turns_reversed(self) -> Iterator[Turn]:
+        for i in range(self.turn_count - 1, -1, -1):
+            yield self.turn(i)
+
+    def close(self) -> None:
+        self._map.close()
+        self._fh.close()
+
+
+class SnapshotStorage(FileStorage):
+    """`FileStorage` whose history is compacted into a memory-mapped binary snapshot.
+
+    The text files only hold what was written since the last `compact()`, so startup reads the
+    snapshot's index plus a short tail instead of decoding the whole history, and recent turns
+    are decompressed on demand.
+    """
+
+    def __init__(
+        self,
+        memory_filepath: str,
+        chat_filepath: str,
+        snapshot_path: Optional[str] = None,
+        writer: Optional[BatchedWriter] = None,
+        compact_bytes: int = 256 * 1024,
+    ):
+        """
+        Args:
+            snapshot_path (str, optional): Defaults to the memory file path with a `.snap` extension.
+            compact_bytes (int): `needs_compaction()` turns true once the text files exceed this size.
+        """
+        super().__init__(memory_filepath, chat_filepath, writer=writer)
+        self.snapshot_path = snapshot_path or os.path.splitext(memory_filepath)[0] + ".snap"
+        self.compact_bytes = compact_bytes
+        self._reader: Optional[SnapshotReader] = None
+        if os.path.exists(self.snapshot_path):
+            try:
+                self._reader = SnapshotReader(self.snapshot_path)
+            except (ValueError, OSError, struct.error) as e:
+                logging.error(f"Ignoring unreadable snapshot '{self.snapshot_path}': {e}")
+
+    def _tail(self) -> Tuple[Optional[str], List[Turn]]:
+        """Header line and turns written to the chat file since the last compaction."""
+        turns = parse_chat(super().load_chat())
+        if turns and turns[0][0] is None:
+            return turns[0][1], turns[1:]
+        return None, turns
+
+    def load_turns(self) -> List[Turn]:
+        header, tail = self._tail()
+        snapshot = [self._reader.turn(i) for i in range(self._reader.turn_count)] if self._reader else []
+        return ([(None, header)] if header else []) + snapshot + tail
+
+    def load_chat(self) -> str:
+        return "\n".join(f"{role}: {content}" if role else content for role, content in self.load_turns())
+
+    def recent_chat(self, max_chars: int) -> str:
+        """Renders only the newest turns fitting `max_chars`, decoding snapshot records newest first."""
+        header, tail = self._tail()
+        lines, used = [], 0
+        older = self._reader.turns_reversed() if self._reader else iter(())
+        for turn in _chain_reversed(tail, older):
+            line = f"{turn[0]}: {turn[1]}"
+            if used + len(line) > max_chars and lines:
+                break
+            lines.append(line)
+            used += len(line) + 1
+        return "\n".join(([header] if header else []) + lines[::-1])
+
+    def reset_chat(self, header: str = "") -> None:
+        if self._reader and self._reader.turn_count:
+            self._rewrite(turns=[])
+        super().reset_chat(header)
+
+    def truncate_chat(self, turns: List[Turn]) -> None:
+        """Drops summarized turns from the snapshot without decoding the rest of it, then from the tail."""
+        if not self._reader or not self._reader.turn_count:
+            super().truncate_chat(turns)
+            return
+        dropped, pending, i = set(), list(turns), 0
+        while pending and i < self._reader.turn_count:
+            if self._reader.turn(i) == pending[0]:
+                dropped.add(i)
+                pending.pop(0)
+            i += 1
+        if dropped:
+            records = self._reader.raw_records(TURN)
+            self._rewrite(turns=[record for j, record in enumerate(records) if j not in dropped])
+        if pending:
+            super().truncate_chat(pending)
+
+    def load_leveled_summaries(self) -> List[Summary]:
+        return (self._reader.summaries() if self._reader else []) + super().load_leveled_summaries()
+
+    def replace_summaries(self, summaries: List[str], levels: Optional[List[int]] = None) -> None:
+        if self._reader and self._reader.summary_count:
+            levels = levels or [0] * len(summaries)
+            self._rewrite(summaries=[encode_summary(summary, level) for summary, level in zip(summaries, levels)])
+            super().replace_summaries([])
+        else:
+            super().replace_summaries(summaries, levels)
+
+    def needs_compaction(self) -> bool:
+        size = 0
+        for path in (self.memory_filepath, self.chat_filepath):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size > self.compact_bytes
+
+    def compact(self) -> None:
+        """Folds the text-file tail into the snapshot and truncates the text files.
+
+        The caller must not write through this storage while compacting (`Memory` holds its lock).
+        """
+        self.writer.flush()
+        header, tail = self._tail()
+        summaries = super().load_leveled_summaries()
+        self._rewrite(
+            summaries=(self._reader.raw_records(SUMMARY) if self._reader else [])
+            + [encode_summary(summary, level) for level, summary in summaries],
+            turns=(self._reader.raw_records(TURN) if self._reader else [])
+            + [(TURN, encode_turn(role, content)) for role, content in tail],
+        )
+        super().replace_summaries([])
+        super().reset_chat(header or "")
+        self.writer.flush()
+
+    def _rewrite(self, summaries: Optional[List[Tuple[int, bytes]]] = None, turns: Optional[List[Tuple[int, bytes]]] = None) -> None:
+        """Writes a new snapshot, keeping the current summaries/turns for whichever is not given."""
+        if summaries is None:
+            summaries = self._reader.raw_records(SUMMARY) if self._reader else []
+        if turns is None:
+            turns = self._reader.raw_records(TURN) if self._reader else []
+        if self._reader:
+            self._reader.close()  # The records above are copies; release the map before replacing the file
+        write_snapshot(self.snapshot_path, summaries + turns)
+        self._reader = SnapshotReader(self.snapshot_path)
+
+
+def _chain_reversed(tail: List[Turn], older: Iterator[Turn]) -> Iterator[Turn]:
+    """Newest-first iteration over the tail turns, then the snapshot's."""
+    yield from reversed(tail)
+    yield from older
@@ -0,0 +1,387 @@
+import os
+import re
+import json
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from memory.writer import BatchedWriter, get_writer
+from memory.connections import ThreadLocalConnection
+
+Turn = Tuple[Optional[str], str]  # (role, content); role is None for the system-prompt header
+Summary = Tuple[int, str]  # (level, summary); level > 0 means a fold of lower-level summaries
+
+
+class MemoryStorage:
+    """Interface shared by the `Memory` storage backends."""
+
+    def load_chat(self) -> str:
+        """Returns the stored chat log rendered as `Role: content` lines."""
+        raise NotImplementedError
+
+    def load_turns(self) -> List[Turn]:
+        """Returns the stored chat as `(role, content)` turns, oldest first."""
+        return parse_chat(self.load_chat())
+
+    def recent_chat(self, max_chars: int) -> str:
+        """Returns at least the last `max_chars` of the chat log; backends may return all of it."""
+        return self.load_chat()
+
+    def reset_chat(self, header: str = "") -> None:
+        """Drops the stored chat turns and starts again with an optional header line."""
+        raise NotImplementedError
+
+    def append_turn(self, role: str, content: str) -> None:
+        raise NotImplementedError
+
+    def truncate_chat(self, turns: List[Turn]) -> None:
+        """Drops turns that were summarized, leaving the rest of the chat in place.
+
+        `turns` are the oldest live turns, in order. This fallback rewrites the whole chat;
+        backends override it to remove just those turns.
+        """
+        remaining = self.load_turns()
+        for turn in turns:
+            if turn in remaining:
+                remaining.remove(turn)
+        header = next((content for role, content in remaining if role is None), "")
+        self.reset_chat(header)
+        for role, content in remaining:
+            if role:
+                self.append_turn(role, content)
+
+    def load_summaries(self) -> List[str]:
+        return [summary for _, summary in self.load_leveled_summaries()]
+
+    def load_leveled_summaries(self) -> List[Summary]:
+        """Returns the stored summaries with their fold level, oldest first."""
+        raise NotImplementedError
+
+    def append_summary(self, summary: str, level: int = 0) -> None:
+        raise NotImplementedError
+
+    def replace_summaries(self, summaries: List[str], levels: Optional[List[int]] = None) -> None:
+        """Overwrites the stored summaries, e.g. after older ones were folded together.
+
+        Args:
+            levels (list, optional): Fold level of each summary; defaults to 0 for all of them.
+        """
+        raise NotImplementedError
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until buffered writes are durable. Backends without buffering return immediately."""
+        return True
+
+    @property
+    def pending_writes(self) -> int:
+        return 0
+
+
+class FileStorage(MemoryStorage):
+    """The original text-file layout: `<name>_chat.txt` and `<name>_memory.txt`.
+
+    Summaries are stored one JSON record per line, so a summary may itself span several lines.
+    Memory files from before that, with one plain-text summary per line, still load.
+    """
+
+    def __init__(self, memory_filepath: str, chat_filepath: str, writer: Optional[BatchedWriter] = None):
+        self.memory_filepath = memory_filepath
+        self.chat_filepath = chat_filepath
+        self.writer = writer or get_writer()  # Group-commits file writes off the caller's thread
+
+    def load_chat(self) -> str:
+        self.writer.flush()  # Make sure earlier queued writes to this file are visible
+        if os.path.isfile(self.chat_filepath):
+            logging.debug(f"Loading conversation from '{self.chat_filepath}'")
+            try:
+                with open(self.chat_filepath, encoding="utf-8") as fh:
+                    return fh.read().strip()
+            except IOError as e:
+                logging.error(f"Error loading conversation: {e}")
+        else:
+            logging.debug(f"Creating new chat-history file - '{self.chat_filepath}'")
+            open(self.chat_filepath, "w", encoding="utf-8").close()
+        return ""
+
+    def reset_chat(self, header: str = "") -> None:
+        self._write_to_chat_file(header + "\n" if header else "", mode="w")
+
+    def append_turn(self, role: str, content: str) -> None:
+        self._write_to_chat_file(f"{role}: {content}\n")
+
+    def truncate_chat(self, turns: List[Turn]) -> None:
+        """Cuts the summarized turns out of the chat file in one write, keeping any other lines."""
+        if not turns or not self.chat_filepath:
+            return
+        self.writer.flush()
+        try:
+            with open(self.chat_filepath, encoding="utf-8") as fh:
+                text = fh.read()
+        except IOError as e:
+            logging.error(f"Error loading conversation: {e}")
+            return
+        prefix = "".join(f"{role}: {content}\n" for role, content in turns)
+        start = text.find(prefix)
+        if start == -1:
+            super().truncate_chat(turns)  # The file was edited under us; match turn by turn
+            return
+        self._write_to_chat_file(text[:start] + text[start + len(prefix):], mode="w")
+
+    def load_leveled_summaries(self) -> List[Summary]:
+        self.writer.flush()
+        if os.path.exists(self.memory_filepath):
+            try:
+                with open(self.memory_filepath, "r", encoding="utf-8") as f:
+                    return parse_summary_records(f.read())
+            except IOError as e:
+                logging.error(f"Error loading memory: {e}")
+        return []
+
+    def append_summary(self, summary: str, level: int = 0) -> None:
+        self.writer.write(self.memory_filepath, encode_summary_record(summary, level))
+
+    def replace_summaries(self, summaries: List[str], levels: Optional[List[int]] = None) -> None:
+        levels = levels or [0] * len(summaries)
+        records = "".join(encode_summary_record(summary, level) for summary, level in zip(summaries, levels))
+        self.writer.write(self.memory_filepath, records, mode="w")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return self.writer.flush(timeout)
+
+    @property
+    def pending_writes(self) -> int:
+        return self.writer.queue_depth
+
+    def _write_to_chat_file(self, content: str, mode: str = "a") -> None:
+        if self.chat_filepath:
+            self.writer.write(self.chat_filepath, content, mode=mode)
+
+
+class SQLiteStorage(MemoryStorage):
+    """Stores turns and summaries as rows in a local SQLite database (WAL mode).
+
+    Rows are keyed by agent and session and indexed by time, so several worker processes
+    can share one agent's memory and read only the rows they need.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS turns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        agent TEXT NOT NULL,
+        session TEXT NOT NULL,
+        role TEXT,
+        content TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_turns_agent_session_time ON turns (agent, session, created_at);
+    CREATE TABLE IF NOT EXISTS summaries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        agent TEXT NOT NULL,
+        session TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        level INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_summaries_agent_session_time ON summaries (agent, session, created_at);
+    """
+
+    def __init__(self, db_path: str, agent: str, session: str = "default", timeout: float = 30.0):
+        """
+        Args:
+            db_path (str): Path of the SQLite database file, created if missing.
+            agent (str): Agent name the rows belong to.
+            session (str): Session/conversation id within the agent.
+            timeout (float): Seconds to wait on a lock held by another process.
+        """
+        self.db_path = db_path
+        self.agent = agent
+        self.session = session
+        self._connect = ThreadLocalConnection(self.db_path, timeout)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(summaries)")]
+            if "level" not in columns:  # Databases created before summaries kept their fold level
+                conn.execute("ALTER TABLE summaries ADD COLUMN level INTEGER NOT NULL DEFAULT 0")
+
+    def load_chat(self) -> str:
+        return "\n".join(f"{role}: {content}" if role else content for role, content in self.load_turns())
+
+    def load_turns(self) -> List[Turn]:
+        rows = self._connect().execute(
+            "SELECT role, content FROM turns WHERE agent = ? AND session = ? ORDER BY id",
+            (self.agent, self.session),
+        )
+        return list(rows)
+
+    def last_turns(self, n: int) -> List[Turn]:
+        """Returns the most recent `n` turns of this session, oldest first."""
+        rows = self._connect().execute(
+            "SELECT role, content FROM turns WHERE agent = ? AND session = ? ORDER BY id DESC LIMIT ?",
+            (self.agent, self.session, n),
+        ).fetchall()
+        return rows[::-1]
+
+    def reset_chat(self, header: str = "") -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM turns WHERE agent = ? AND session = ?", (self.agent, self.session))
+            if header:
+                conn.execute(
+                    "INSERT INTO turns (agent, session, role, content, created_at) VALUES (?, ?, NULL, ?, ?)",
+                    (self.agent, self.session, header, time.time()),
+                )
+
+    def append_turn(self, role: str, content: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO turns (agent, session, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.agent, self.session, role, content, time.time()),
+            )
+
+    def truncate_chat(self, turns: List[Turn]) -> None:
+        """Deletes the oldest stored row of each summarized turn; other rows are left alone."""
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM turns WHERE id = (SELECT id FROM turns "
+                "WHERE agent = ? AND session = ? AND role = ? AND content = ? ORDER BY id LIMIT 1)",
+                [(self.agent, self.session, role, content) for role, content in turns],
+            )
+
+    def load_leveled_summaries(self) -> List[Summary]:
+        rows = self._connect().execute(
+            "SELECT level, content FROM summaries WHERE agent = ? AND session = ? ORDER BY id",
+            (self.agent, self.session),
+        )
+        return list(rows)
+
+    def summaries_since(self, since: float, all_sessions: bool = False) -> List[Tuple[float, str]]:
+        """Returns `(created_at, summary)` rows written at or after the unix time `since`."""
+        if all_sessions:
+            query = "SELECT created_at, content FROM summaries WHERE agent = ? AND created_at >= ? ORDER BY created_at, id"
+            params: tuple = (self.agent, since)
+        else:
+            query = (
+                "SELECT created_at, content FROM summaries "
+                "WHERE agent = ? AND session = ? AND created_at >= ? ORDER BY created_at, id"
+            )
+            params = (self.agent, self.session, since)
+        return self._connect().execute(query, params).fetchall()
+
+    def append_summary(self, summary: str, level: int = 0) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO summaries (agent, session, content, created_at, level) VALUES (?, ?, ?, ?, ?)",
+                (self.agent, self.session, summary, time.time(), level),
+            )
+
+    def replace_summaries(self, summaries: List[str], levels: Optional[List[int]] = None) -> None:
+        """Summaries that are kept retain their `created_at`; new ones (folds of older summaries)
+        take the time of the oldest summary they replace, so `summaries_since` still sees them in order."""
+        levels = levels or [0] * len(summaries)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT content, created_at FROM summaries WHERE agent = ? AND session = ? ORDER BY id",
+                (self.agent, self.session),
+            ).fetchall()
+            created: Dict[str, List[float]] = {}
+            for content, created_at in rows:
+                created.setdefault(content, []).append(created_at)
+            kept = [created[summary].pop(0) if created.get(summary) else None for summary in summaries]
+            replaced = [created_at for times in created.values() for created_at in times]
+            fallback = min(replaced) if replaced else time.time()
+            conn.execute("DELETE FROM summaries WHERE agent = ? AND session = ?", (self.agent, self.session))
+            conn.executemany(
+                "INSERT INTO summaries (agent, session, content, created_at, level) VALUES (?, ?, ?, ?, ?)",
+                [(self.agent, self.session, summary, fallback if created_at is None else created_at, level)
+                 for summary, created_at, level in zip(summaries, kept, levels)],
+            )
+
+    def is_empty(self) -> bool:
+        """True when neither turns nor summaries exist for this agent/session."""
+        conn = self._connect()
+        for table in ("turns", "summaries"):
+            row = conn.execute(
+                f"SELECT 1 FROM {table} WHERE agent = ? AND session = ? LIMIT 1", (self.agent, self.session)
+            ).fetchone()
+            if row:
+                return False
+        return True
+
+    def close(self) -> None:
+        self._connect.close()
+
+
+def encode_summary_record(summary: str, level: int = 0) -> str:
+    """One line of a `FileStorage` memory file."""
+    return json.dumps({"level": level, "summary": summary}, ensure_ascii=False) + "\n"
+
+
+def parse_summary_records(text: str) -> List[Summary]:
+    """Reads the `(level, summary)` records of a `FileStorage` memory file.
+
+    Lines that aren't JSON records come from the older one-summary-per-line layout and are
+    taken as they are, at level 0.
+    """
+    summaries = []
+    for line in text.split("\n"):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict) and "summary" in record:
+            summaries.append((int(record.get("level", 0)), record["summary"]))
+        else:
+            summaries.append((0, line))
+    return summaries
+
+
+_TURN_PATTERN = re.compile(r"^([A-Za-z_][\w\- ]{0,40}): (.*)$")
+
+
+def parse_chat(text: str) -> List[Turn]:
+    """Splits a `Role: content` chat log back into turns.
+
+    Lines starting with `Role: ` open a new turn; other lines continue the previous one (tool
+    output spans several lines). A leading line without a role is kept as the header.
+    """
+    turns: List[List[Optional[str]]] = []
+    for line in text.strip().split("\n"):
+        match = _TURN_PATTERN.match(line)
+        if match:
+            turns.append([match.group(1), match.group(2)])
+        elif turns:
+            turns[-1][1] += "\n" + line
+        elif line:
+            turns.append([None, line])
+    return [(role, content) for role, content in turns]
+
+
+def migrate_files_to_sqlite(memory_filepath: str, chat_filepath: str, storage: SQLiteStorage) -> Tuple[int, int]:
+    """Copies a `FileStorage` chat/memory file pair into `storage`.
+
+    Returns:
+        tuple: Number of (turns, summaries) imported.
+    """
+    turns: List[Turn] = []
+    if os.path.isfile(chat_filepath):
+        with open(chat_filepath, encoding="utf-8") as fh:
+            turns = parse_chat(fh.read())
+
+    summaries: List[Summary] = []
+    if os.path.isfile(memory_filepath):
+        with open(memory_filepath, encoding="utf-8") as fh:
+            summaries = parse_summary_records(fh.read())
+
+    now = time.time()
+    with storage._connect() as conn:
+        conn.executemany(
+            "INSERT INTO turns (agent, session, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(storage.agent, storage.session, role, content, now) for role, content in turns],
+        )
+        conn.executemany(
+            "INSERT INTO summaries (agent, session, content, created_at, level) VALUES (?, ?, ?, ?, ?)",
+            [(storage.agent, storage.session, summary, now, level) for level, summary in summaries],
+        )
+    logging.debug(f"Migrated {len(turns)} turns and {len(summaries)} summaries into '{storage.db_path}'")
+    return len(turns), len(summaries)
@@ -0,0 +1,113 @@
+import re
+from typing import List
+
+from memory.retrieval import tokenize
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class LLMSummarizer:
+    """Summarizes by prompting an LLM (the default)."""
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def summarize(self, text: str, kind: str = "conversation") -> str:
+        prompt = f"""
+        You are a highly advanced AI assistant tasked with summarizing a {kind}.
+        Given the following {kind}, create a concise summary, focusing on user requests or preferences, actions taken, and important information exchanged.
+        Limit your summary to 250 words.
+
+        Conversation:
+        {text}
+
+        Summary:
+        """
+        summary = self.llm.run(prompt)
+        self.llm.reset()
+        return summary.strip()
+
+
+class ExtractiveSummarizer:
+    """CPU-only TextRank summarizer: keeps the most central sentences, no LLM call.
+
+    Sentences are bag-of-words vectors; their cosine-similarity matrix is ranked with PageRank
+    and the top sentences are returned in their original order, up to `max_words`.
+    """
+
+    def __init__(self, max_words: int = 250, damping: float = 0.85, iterations: int = 50, max_sentences: int = 1500):
+        """
+        Args:
+            max_words (int): Word budget of the summary, like the LLM prompt's 250-word limit.
+            damping (float): PageRank damping factor.
+            iterations (int): Max power-iteration steps.
+            max_sentences (int): Only the most recent sentences are ranked, bounding the n x n matrix.
+        """
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError("ExtractiveSummarizer requires numpy (`pip install numpy`).") from e
+        self._np = np
+        self.max_words = max_words
+        self.damping = damping
+        self.iterations = iterations
+        self.max_sentences = max_sentences
+
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence and sentence.strip()]
+
+    def rank(self, sentences: List[str]):
+        """Returns the TextRank score of each sentence."""
+        np = self._np
+        vocabulary: dict = {}
+        rows, cols = [], []
+        for i, sentence in enumerate(sentences):
+            for term in set(tokenize(sentence)):
+                rows.append(i)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+        n = len(sentences)
+        if not vocabulary:
+            return np.full(n, 1.0 / n, dtype=np.float32)
+
+        vectors = np.zeros((n, len(vocabulary)), dtype=np.float32)
+        vectors[rows, cols] = 1.0
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        similarity = vectors @ vectors.T
+        np.fill_diagonal(similarity, 0.0)
+
+        # Row-normalise into transition probabilities; isolated sentences jump uniformly.
+        totals = similarity.sum(axis=1, keepdims=True)
+        transition = np.where(totals > 0, similarity / np.maximum(totals, 1e-12), 1.0 / n)
+        scores = np.full(n, 1.0 / n, dtype=np.float32)
+        for _ in range(self.iterations):
+            updated = (1 - self.damping) / n + self.damping * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < 1e-6:
+                return updated
+            scores = updated
+        return scores
+
+    def summarize(self, text: str, kind: str = "conversation") -> str:
+        sentences = self.split_sentences(text)[-self.max_sentences:]
+        if not sentences:
+            return ""
+        scores = self.rank(sentences)
+        chosen, words = [], 0
+        for i in self._np.argsort(-scores):
+            length = len(sentences[i].split())
+            if chosen and words + length > self.max_words:
+                continue
+            chosen.append(int(i))
+            words += length
+            if words >= self.max_words:
+                break
+        return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def get_summarizer(name: str, llm=None):
+    """Builds a summarizer by name: "llm" (needs `llm`) or "extractive"."""
+    if name == "llm":
+        return LLMSummarizer(llm)
+    if name == "extractive":
+        return ExtractiveSummarizer()
+    raise ValueError(f"Unknown summarizer '{name}'. Use 'llm' or 'extractive'.")
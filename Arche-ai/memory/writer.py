@@ -0,0 +1,166 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Any
+
+FSYNC_POLICIES = ("none", "batch", "close")
+
+
+class BatchedWriter:
+    """Append-only file writer that queues records and group-commits them from a background thread.
+
+    Records for any number of files share one queue, so many `Memory` instances can write
+    through a single writer without opening and closing a file per message.
+    """
+
+    def __init__(self, flush_interval: float = 0.5, flush_size: int = 256, fsync: str = "none"):
+        """
+        Args:
+            flush_interval (float): Max seconds a record waits in the queue before being committed.
+            flush_size (int): Max number of records committed in a single batch.
+            fsync (str): "none" leaves durability to the OS, "batch" fsyncs every file touched by
+                         a batch, "close" fsyncs once when the writer shuts down.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got '{fsync}'.")
+        self.flush_interval = flush_interval
+        self.flush_size = max(1, flush_size)
+        self.fsync = fsync
+        self._queue: "queue.Queue[Tuple[str, Any, Any]]" = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._touched: set = set()
+        self._stats = {"records_written": 0, "batches_committed": 0, "bytes_written": 0, "errors": 0}
+
+        self._thread = threading.Thread(target=self._run, name="BatchedWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, path: str, content: str, mode: str = "a") -> None:
+        """Queues `content` for `path`. Mode "w" truncates the file before writing, in queue order."""
+        with self._lock:
+            if not self._closed:
+                self._queue.put(("write", path, (mode, content)))
+                return
+        # Writer already shut down (e.g. during interpreter exit): fall back to a direct write.
+        self._commit([(path, mode, content)])
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every record queued before this call is on disk. Returns False on timeout."""
+        with self._lock:
+            if self._closed:
+                return True
+            done = threading.Event()
+            self._queue.put(("flush", None, done))
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flushes pending records and stops the background thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(("close", None, None))
+        self._thread.join(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of records waiting to be committed."""
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns write counters and the current queue depth."""
+        return dict(self._stats, queue_depth=self.queue_depth)
+
+    def _run(self) -> None:
+        while True:
+            kind, path, payload = self._queue.get()
+            batch: List[Tuple[str, str, str]] = []
+            deadline = time.monotonic() + self.flush_interval
+            waiters: List[threading.Event] = []
+
+            # Group-commit: keep collecting until the batch is full, the interval elapses,
+            # or someone asks for a flush/close.
+            while True:
+                if kind == "write":
+                    batch.append((path, payload[0], payload[1]))
+                elif kind == "flush":
+                    waiters.append(payload)
+                    break
+                elif kind == "close":
+                    self._commit(batch)
+                    self._fsync_touched()
+                    return
+                if len(batch) >= self.flush_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    kind, path, payload = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            self._commit(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _commit(self, batch: List[Tuple[str, str, str]]) -> None:
+        """Writes a batch, opening each file once and honouring truncating writes in order."""
+        if not batch:
+            return
+        handles: Dict[str, Any] = {}
+        try:
+            for path, mode, content in batch:
+                fh = handles.get(path)
+                if fh is None or mode == "w":
+                    if fh is not None:
+                        fh.close()
+                    try:
+                        fh = handles[path] = open(path, mode, encoding="utf-8")
+                    except IOError as e:
+                        logging.error(f"Error opening '{path}' for writing: {e}")
+                        handles.pop(path, None)
+                        self._stats["errors"] += 1
+                        continue
+                fh.write(content)
+                self._stats["records_written"] += 1
+                self._stats["bytes_written"] += len(content)
+        finally:
+            for path, fh in handles.items():
+                try:
+                    fh.flush()
+                    if self.fsync == "batch":
+                        os.fsync(fh.fileno())
+                    fh.close()
+                except (IOError, OSError) as e:
+                    logging.error(f"Error committing writes to '{path}': {e}")
+                    self._stats["errors"] += 1
+                self._touched.add(path)
+            self._stats["batches_committed"] += 1
+
+    def _fsync_touched(self) -> None:
+        if self.fsync != "close":
+            return
+        for path in self._touched:
+            try:
+                with open(path, "a", encoding="utf-8") as fh:
+                    os.fsync(fh.fileno())
+            except (IOError, OSError) as e:
+                logging.error(f"Error syncing '{path}': {e}")
+
+
+_default_writer: Optional[BatchedWriter] = None
+_default_writer_lock = threading.Lock()
+
+
+def get_writer() -> BatchedWriter:
+    """Returns the process-wide writer shared by `Memory` instances that don't bring their own."""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None or _default_writer._closed:
+            _default_writer = BatchedWriter()
+        return _default_writer
@@ -0,0 +1,89 @@
+"""Compares HTMLContentScraper's cleaned-HTML path with its text/markdown extraction modes.
+
+Runs offline on a corpus of saved pages (a directory of .html files) or on generated pages, and
+reports parse time and output size in tokens.
+
+    python scraper_benchmark.py                       # generated pages
+    python scraper_benchmark.py --corpus saved_pages/ --parser html.parser
+"""
+import argparse
+import glob
+import os
+import random
+import time
+
+from memory import estimate_tokens
+from tools import HTMLContentScraper
+
+WORDS = ("market share price growth forecast analyst revenue quarter energy policy city weather "
+         "research model data team release update report season players final").split()
+
+
+def synthetic_page(seed: int, paragraphs: int = 40) -> str:
+    """A news-style page: scripts, styles, nav, ads and footer around an article."""
+    rng = random.Random(seed)
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+    nav = "".join(f'<li><a href="/s{i}">{rng.choice(WORDS).title()}</a></li>' for i in range(30))
+    body = "".join(
+        (f"<h2>{sentence(5)}</h2>" if i % 8 == 0 else "")
+        + f'<div class="story-body__inner" data-component="text-block" data-track-id="b{seed}-{i}">'
+        + f'<p class="ssrcss-1q0x1qg-Paragraph e1jhz7w10" style="line-height:1.5">{" ".join(sentence(12) for _ in range(2))}</p></div>'
+        + ('<div class="ad-slot"><script>loadAd()</script><span>Sponsored</span></div>' if i % 10 == 5 else "")
+        for i in range(paragraphs)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>News</title>"
+        + "".join(f"<style>.c{i}{{color:#{i:03d};margin:{i}px}}</style>" for i in range(20))
+        + "".join(f"<script>window.t{i}=function(){{return {i};}}</script>" for i in range(20))
+        + f'</head><body><header class="site-header"><nav><ul>{nav}</ul></nav></header>'
+        + f'<main><article><h1>{sentence(8)}</h1>{body}</article></main>'
+        + '<aside class="sidebar"><ul>' + "".join(f"<li>{sentence(6)}</li>" for _ in range(15)) + "</ul></aside>"
+        + '<div class="newsletter">Subscribe to our newsletter</div><!-- tracking -->'
+        + '<footer><p>Copyright. All rights reserved.</p></footer></body></html>'
+    )
+
+
+def load_corpus(directory: str):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            pages.append(fh.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of saved .html pages.")
+    parser.add_argument("--pages", type=int, default=20, help="Generated pages when no corpus is given.")
+    parser.add_argument("--parser", default="auto", choices=["auto", "lxml", "html.parser"], help="Parser of the fast modes.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus to average over.")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else [synthetic_page(seed) for seed in range(args.pages)]
+    if not pages:
+        parser.error(f"No .html files in {args.corpus}")
+    scraper = HTMLContentScraper(parser=args.parser)
+    print(f"Corpus: {len(pages)} pages, {sum(map(len, pages)) // 1024} KiB, ~{sum(map(estimate_tokens, pages))} tokens\n")
+
+    modes = {
+        "html (current)": scraper.clean_html,
+        "text": lambda html: scraper.extract_main_content(html),
+        "markdown": lambda html: scraper.extract_main_content(html, markdown=True),
+    }
+    baseline = None
+    for name, extract in modes.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            outputs = [extract(page) for page in pages]
+        per_page = (time.perf_counter() - start) / (args.repeat * len(pages))
+        tokens = sum(map(estimate_tokens, outputs))
+        baseline = baseline or (per_page, tokens)
+        print(f"{name:15s} {per_page * 1000:8.2f} ms/page ({baseline[0] / per_page:4.1f}x)  "
+              f"output: ~{tokens:7d} tokens ({tokens / baseline[1]:6.1%} of current)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compares the extractive and LLM memory summarizers on latency and LLM tokens spent.
+
+    python summarizer_benchmark.py                       # extractive only, synthetic chat
+    python summarizer_benchmark.py --chat memories/ChatBot_chat.txt --llm groq
+"""
+import argparse
+import random
+import time
+
+from memory import ExtractiveSummarizer, LLMSummarizer, estimate_tokens
+
+TOPICS = ["weather in Kolkata", "the TSLA share price", "a bubble sort in Python", "flight options to Delhi",
+          "the T20 World Cup final", "a birthday gift for my sister", "GCD of two numbers", "today's news"]
+
+
+def synthetic_chat(turns: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(turns):
+        topic = rng.choice(TOPICS)
+        lines.append(f"User: Can you help me with {topic}? I prefer short answers. Please keep it simple.")
+        lines.append(f"Agent: Sure. Here is what I found about {topic}. Let me know if you want more detail.")
+    return "\n".join(lines)
+
+
+def time_it(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chat", help="Chat file to summarize instead of a synthetic one.")
+    parser.add_argument("--turns", type=int, default=200, help="Synthetic chat length (user/agent pairs).")
+    parser.add_argument("--repeat", type=int, default=20, help="Extractive runs to average over.")
+    parser.add_argument("--llm", choices=["groq", "gemini", "cohere"], help="Also time the LLM summarizer.")
+    args = parser.parse_args()
+
+    if args.chat:
+        with open(args.chat, encoding="utf-8") as fh:
+            chat = fh.read()
+    else:
+        chat = synthetic_chat(args.turns)
+    print(f"Input: {len(chat)} chars, ~{estimate_tokens(chat)} tokens\n")
+
+    seconds, summary = time_it(lambda: ExtractiveSummarizer().summarize(chat), args.repeat)
+    print(f"extractive: {seconds * 1000:8.1f} ms  LLM tokens: {0:6d}  summary tokens: ~{estimate_tokens(summary)}")
+
+    if args.llm:
+        from llms import GroqLLM, Gemini, Cohere
+        llm = {"groq": GroqLLM, "gemini": Gemini, "cohere": Cohere}[args.llm](messages=[])
+        seconds, summary = time_it(lambda: LLMSummarizer(llm).summarize(chat), 1)
+        # The prompt wrapper adds ~70 tokens on top of the chat itself
+        spent = estimate_tokens(chat) + 70 + estimate_tokens(summary)
+        print(f"llm:        {seconds * 1000:8.1f} ms  LLM tokens: {spent:6d}  summary tokens: ~{estimate_tokens(summary)}")
+
+
+if __name__ == "__main__":
+    main()
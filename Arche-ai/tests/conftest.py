@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The packages import each other as top-level modules (`from memory import ...`), as when the
+# scripts are run from the project root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
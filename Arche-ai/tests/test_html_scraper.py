@@ -0,0 +1,90 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools.HTMLScraper import HTMLContentScraper, _clean_page
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as fh:
+        return fh.read()
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_wrapper_with_hint_word_in_a_longer_class_keeps_the_article(parser):
+    text = _clean_page(load("wrapper_header_class.html"), "text", parser)
+    assert "Life in tide pools" in text
+    assert "Visitors should step only on bare rock" in text
+    for chrome in ("Home", "Popular posts", "Copyright"):
+        assert chrome not in text
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_layout_classes_mentioning_hints_keep_the_content(parser):
+    markdown = _clean_page(load("layout_with_hint_words.html"), "markdown", parser)
+    assert "## A simple sourdough loaf" in markdown
+    assert "- Bake at 250 C for 40 minutes." in markdown
+    assert "cookies" not in markdown and "Great recipe" not in markdown
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+def test_article_header_keeps_the_title_but_page_header_is_dropped(parser):
+    html = (
+        "<html><body><header><a href='/'>Site logo</a> Subscribe</header>"
+        "<article><header><h1>Tide pool survey results</h1><p>By the field team</p></header>"
+        "<p>" + "Anemones were counted along every transect this spring. " * 5 + "</p></article></body></html>"
+    )
+    markdown = _clean_page(html, "markdown", parser)
+    assert markdown.startswith("# Tide pool survey results")
+    assert "By the field team" in markdown
+    assert "Site logo" not in markdown
+
+
+@pytest.mark.parametrize("parser", ["lxml", "html.parser"])
+@pytest.mark.parametrize("html", ["", "  \n", "<html></html>"])
+def test_empty_documents_have_no_content(parser, html):
+    assert _clean_page(html, "text", parser) == ""
+
+
+@pytest.fixture
+def page_server():
+    article = load("wrapper_header_class.html").encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            page = b"" if self.path == "/empty" else article
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_scrape_many_reuses_one_process_pool_until_closed(page_server):
+    with HTMLContentScraper() as scraper:
+        first = list(scraper.scrape_many([f"{page_server}/a", f"{page_server}/b"], mode="text", parse_workers=2))
+        pool = scraper._parse_pool
+        second = list(scraper.scrape_many([f"{page_server}/c"], mode="text", parse_workers=2))
+
+        assert pool is not None and scraper._parse_pool is pool
+        assert all(result["error"] is None and "Life in tide pools" in result["content"] for result in first + second)
+    assert scraper._parse_pool is None
+
+
+def test_empty_page_scrapes_to_empty_content(page_server):
+    with HTMLContentScraper(parser="lxml") as scraper:
+        [result] = scraper.scrape_many([f"{page_server}/empty"], mode="text", parse_workers=0)
+    assert result == {"url": f"{page_server}/empty", "content": "", "error": None}
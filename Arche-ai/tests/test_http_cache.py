@@ -0,0 +1,85 @@
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools.http_cache import HTTPCache
+from tools.http_client import HTTPClient
+
+LAST_MODIFIED = formatdate(0, usegmt=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []  # (path, If-None-Match, If-Modified-Since) of every request served
+    revalidations = {}  # path -> headers the next 304s carry, in order
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        if self.path == "/etag":
+            validators, matched = {"ETag": '"v1"'}, self.headers.get("If-None-Match") == '"v1"'
+        else:
+            validators, matched = {"Last-Modified": LAST_MODIFIED}, self.headers.get("If-Modified-Since") == LAST_MODIFIED
+        if matched:
+            self.send_response(304)
+            headers = self.revalidations.get(self.path) or [{}]
+            for name, value in (headers.pop(0) if len(headers) > 1 else headers[0]).items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        body = f"body of {self.path}".encode()
+        self.send_response(200)
+        for name, value in dict(validators, **{"Cache-Control": "no-cache", "Content-Length": str(len(body))}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests, Handler.revalidations = [], {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client(tmp_path):
+    return HTTPClient(cache=HTTPCache(directory=str(tmp_path), max_bytes=1024 * 1024), retries=0)
+
+
+def test_etag_revalidation_serves_the_stored_body_on_304(server, client):
+    first = client.get(server + "/etag")
+    second = client.get(server + "/etag")
+
+    assert first.text == second.text == "body of /etag"
+    assert not first.from_cache and second.from_cache
+    assert Handler.requests == [("/etag", None, None), ("/etag", '"v1"', None)]
+    assert client.cache.stats()["revalidated"] == 1
+
+
+def test_last_modified_revalidation_uses_if_modified_since(server, client):
+    client.get(server + "/lastmod")
+    second = client.get(server + "/lastmod")
+
+    assert second.from_cache and second.text == "body of /lastmod"
+    assert Handler.requests[1] == ("/lastmod", None, LAST_MODIFIED)
+
+
+def test_304_headers_replace_stored_ones_whatever_their_case(server, client):
+    # The first 304 repeats no-cache in lowercase; the second makes the entry fresh for a minute
+    Handler.revalidations["/etag"] = [{"cache-control": "no-cache"}, {"Cache-Control": "max-age=60"}]
+    for _ in range(3):
+        client.get(server + "/etag")
+    fresh = client.get(server + "/etag")
+
+    assert fresh.from_cache and fresh.headers["Cache-Control"] == "max-age=60"
+    assert len(Handler.requests) == 3  # The last read was a hit, not another revalidation
+    stored = client.cache._load(server + "/etag")["headers"]
+    assert stored["cache-control"] == "max-age=60" and all(name == name.lower() for name in stored)
@@ -0,0 +1,151 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from memory import FileStorage, Memory
+from memory.scheduler import MaintenanceScheduler
+from memory.writer import BatchedWriter
+
+
+class FakeLLM:
+    def __init__(self):
+        self.messages = []
+        self.system_prompt = None
+
+
+class FakeSummarizer:
+    """Summarizes by counting the turns it was given, so tests can tell summaries apart."""
+
+    def __init__(self):
+        self.calls = []
+
+    def summarize(self, text, kind="conversation"):
+        self.calls.append((kind, text))
+        return f"summary {len(self.calls)} of {kind}"
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = MaintenanceScheduler(workers=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+@pytest.fixture
+def writer():
+    writer = BatchedWriter(flush_interval=0.01)
+    yield writer
+    writer.close()
+
+
+def make_memory(tmp_path, scheduler, writer, summarizer=None, **kwargs):
+    storage = FileStorage(str(tmp_path / "memory.txt"), str(tmp_path / "chat.txt"), writer=writer)
+    kwargs.setdefault("summarize_threshold", 10_000)
+    return Memory(FakeLLM(), storage=storage, scheduler=scheduler, summarizer=summarizer or FakeSummarizer(),
+                  idle_summarize_after=None, compact_interval=None, system_prompt="SYSTEM", **kwargs)
+
+
+def test_restart_without_resume_starts_a_fresh_chat(tmp_path, monkeypatch, scheduler, writer):
+    monkeypatch.chdir(tmp_path)
+    for session in range(3):
+        memory = make_memory(tmp_path, scheduler, writer)
+        memory.add_message("User", f"question {session}")
+        memory.add_message("Assistant", f"answer {session}")
+        memory.close()
+
+    turns = memory.storage.load_turns()
+    assert turns == [(None, "SYSTEM"), ("User", "question 2"), ("Assistant", "answer 2")]
+
+
+def test_restart_with_resume_carries_the_live_turns_over(tmp_path, monkeypatch, scheduler, writer):
+    monkeypatch.chdir(tmp_path)
+    memory = make_memory(tmp_path, scheduler, writer)
+    memory.add_message("User", "question")
+    memory.close()
+
+    resumed = make_memory(tmp_path, scheduler, writer, resume_chat=True)
+    assert resumed.chat_buffer == [("User", "question")]
+    resumed.summarize_now()
+    resumed.close()
+    assert resumed.storage.load_turns() == [(None, "SYSTEM")]
+    assert resumed.storage.load_summaries() == ["summary 1 of conversation"]
+
+
+class FlakySummarizer(FakeSummarizer):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def summarize(self, text, kind="conversation"):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("summarizer unavailable")
+        return super().summarize(text, kind)
+
+
+def test_failed_summary_puts_the_chunk_back(tmp_path, monkeypatch, scheduler, writer):
+    monkeypatch.chdir(tmp_path)
+    memory = make_memory(tmp_path, scheduler, writer, summarizer=FlakySummarizer(failures=1))
+    memory.add_message("User", "first")
+    memory.add_message("Assistant", "reply")
+    memory.summarize_now()
+    scheduler.unregister(memory, wait=True)
+
+    assert memory.chat_buffer == [("User", "first"), ("Assistant", "reply")]
+    assert "first" in memory.chat_history and memory.stats()["live_tokens"] > 0
+    assert memory.storage.load_summaries() == []
+    assert len(memory.storage.load_turns()) == 3
+
+    memory.summarize_now()  # The retry summarizes the same turns, then truncates them
+    memory.close()
+    assert memory.storage.load_summaries() == ["summary 1 of conversation"]
+    assert memory.storage.load_turns() == [(None, "SYSTEM")]
+
+
+def test_tools_importing_memory_helpers_do_not_load_the_llm_sdks():
+    code = (
+        "import sys\n"
+        "import tools.http_cache, tools.summary_cache, tools.passages\n"
+        "print(sorted(name for name in sys.modules if name.split('.')[0] in ('llms', 'groq', 'cohere', 'google')))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root] + sys.path))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+def test_chunks_are_summarized_then_folded_and_folded_summaries_leave_the_index(tmp_path, monkeypatch, scheduler, writer):
+    monkeypatch.chdir(tmp_path)
+    summarizer = FakeSummarizer()
+    memory = make_memory(tmp_path, scheduler, writer, summarizer=summarizer, summarize_threshold=50,
+                         summary_chunk_tokens=50, fold_fanout=2, retrieval_top_k=10)
+    for turn in range(8):  # ~35 tokens each: every second turn crosses the threshold and is cut with the first
+        memory.add_message("User", f"question {turn} about the weather " + "word " * 20)
+    memory.close()
+
+    kinds = [kind for kind, _ in summarizer.calls]
+    assert kinds.count("conversation") == 4
+    assert "series of conversation summaries" in kinds
+    stored = memory.storage.load_leveled_summaries()
+    assert [level for level, _ in stored] == [2]  # 4 chunk summaries -> 2 folds -> 1 fold of folds
+    assert memory.memory == stored[0][1]
+    assert memory.storage.load_turns() == [(None, "SYSTEM")]
+
+    selected = memory.retriever.select("summary of conversation question weather", top_k=20, token_budget=10_000)
+    summaries = [text for text in selected if text.startswith("summary")]
+    assert summaries == [stored[0][1]]  # Superseded summaries are no longer retrieved
+    assert any("question 0" in text for text in selected)  # Summarized turns stay retrievable
+
+
+def test_chunk_that_cannot_be_queued_frees_its_slot(tmp_path, monkeypatch, scheduler, writer):
+    monkeypatch.chdir(tmp_path)
+    memory = make_memory(tmp_path, scheduler, writer, max_pending_chunks=1)
+    scheduler.shutdown()
+    for turn in range(3):
+        memory.add_message("User", f"question {turn}")
+        memory.summarize_now()  # Would block forever on the second call if the slot leaked
+
+    assert memory.chat_buffer == [("User", f"question {turn}") for turn in range(3)]
+    assert memory._chunk_slots.acquire(blocking=False)
@@ -0,0 +1,253 @@
+import json
+import asyncio
+import threading
+
+from agents.Network import MessageBroker, SharedWorkspace, TaskForce
+from memory import CheckpointStore
+
+
+class ScriptedLLM:
+    """Planner stand-in that answers by the kind of prompt it gets."""
+
+    def __init__(self, replies):
+        self.replies = replies  # [(marker in prompt, reply or callable)], first match wins
+        self.prompts = []
+        self.messages = []
+        self.system_prompt = None
+
+    def run(self, prompt):
+        self.prompts.append(prompt)
+        for marker, reply in self.replies:
+            if marker in prompt:
+                return reply() if callable(reply) else reply
+        return "FINAL"
+
+    def reset(self):
+        self.messages = []
+
+
+class FakeAgent:
+    def __init__(self, name, respond):
+        self.name = name
+        self.description = f"{name} agent"
+        self.skills = ""
+        self.tools = []
+        self.llm = ScriptedLLM([])
+        self.task = ""
+        self.respond = respond
+        self.tasks = []
+
+    def rollout(self):
+        self.tasks.append(self.task)
+        return self.respond(self)
+
+
+def test_failed_step_dependents_are_replanned_without_rerunning_in_flight_steps():
+    replanning = threading.Event()
+    plan = {"subtasks": [
+        {"id": "s1", "agent": "A", "task": "fetch data", "depends_on": []},
+        {"id": "s2", "agent": "B", "task": "analyse data", "depends_on": ["s1"]},
+        {"id": "s3", "agent": "C", "task": "slow background step", "depends_on": []},
+    ]}
+    replan = {"subtasks": [
+        # s1 failed and s2 is being replaced, so only s3 (still running) is a valid dependency
+        {"id": "r1-1", "agent": "A", "task": "fetch data again", "depends_on": ["s1", "s2", "s3"]},
+        {"id": "r1-2", "agent": "B", "task": "analyse the new data", "depends_on": ["r1-1"]},
+    ]}
+
+    def replan_reply():
+        replanning.set()
+        return json.dumps(replan)
+
+    llm = ScriptedLLM([("A step of the plan failed", replan_reply), ("Break the task into subtasks", json.dumps(plan))])
+    a = FakeAgent("A", lambda agent: "Error: source offline" if len(agent.tasks) == 1 else "data")
+    b = FakeAgent("B", lambda agent: "analysis")
+    # C is still running when s1 fails and only finishes once the re-plan has been requested
+    c = FakeAgent("C", lambda agent: "background done" if replanning.wait(5) else "Error: no re-plan")
+
+    force = TaskForce([a, b, c], llm, "team", "test team", route_margin=None)
+    force.rollout("build a report", max_iterations=2, mode="dag")
+
+    replan_prompt = next(prompt for prompt in llm.prompts if "A step of the plan failed" in prompt)
+    running = replan_prompt.split("Running steps")[1].split("Steps not started yet")[0]
+    not_started = replan_prompt.split("Steps not started yet")[1].split("Failed step")[0]
+    assert "s3" in running and "s3" not in not_started
+    assert "s2" in not_started and "s1" not in not_started
+
+    assert len(c.tasks) == 1  # The in-flight step was not scheduled a second time
+    assert len(a.tasks) == 2 and b.tasks and "analyse the new data" in b.tasks[0]
+    assert "background done" in a.tasks[1]  # r1-1 kept its dependency on the running step
+    assert [agent for agent, _, _ in force.task_history].count("B") == 1  # s2 was dropped, not run
+
+
+def test_final_workspace_keeps_newest_results_in_full():
+    workspace = SharedWorkspace()
+    for i in range(6):
+        workspace.add(f"agent{i}", "task", f"result {i} " + "word " * 400)  # ~500 tokens each
+
+    text, digested, omitted = workspace.recent(token_budget=1200, digest_budget=200)
+
+    assert "[w6] agent5: result 5" in text and "[w5] agent4: result 4" in text
+    assert "[w4] agent3 (~" in text  # Older entries are only digested
+    assert digested + omitted == 4 and omitted > 0
+    assert text.index("[w4]") < text.index("[w5]") < text.index("[w6]")  # Still oldest first
+
+
+def test_cancelled_aget_propagates_and_leaves_no_waiter():
+    broker = MessageBroker()
+    broker.subscribe("A")
+
+    async def scenario():
+        waiter = asyncio.ensure_future(broker.aget("A"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        done, _ = await asyncio.wait({waiter}, timeout=1)
+        assert waiter in done and waiter.cancelled()
+        assert not broker._waiters.get("A")
+        # A message published after the cancellation still reaches the next reader
+        broker.publish("A", "B", "hello")
+        message = await broker.aget("A", timeout=1)
+        assert message["message"] == "hello"
+
+        pending = asyncio.ensure_future(broker.aget("A"))
+        await asyncio.sleep(0.01)
+        broker.unsubscribe("A")
+        assert await asyncio.wait_for(pending, 1) is None
+
+    asyncio.run(scenario())
+
+
+def test_routing_is_opt_in_and_planning_continues_after_a_routed_step():
+    def make_force(**kwargs):
+        complete = json.dumps({"assignments": [{"agent": "Stocks", "task": "TASK COMPLETE"}], "communication_plan": {}})
+        llm = ScriptedLLM([("assign tasks to agents", complete)])
+        stocks = FakeAgent("Stocks", lambda agent: "AAPL trades at 190")
+        stocks.description = "stock market prices quotes tickers"
+        poet = FakeAgent("Poet", lambda agent: "a poem")
+        poet.description = "writes poems and verses"
+        return TaskForce([stocks, poet], llm, "team", "test team", **kwargs), llm, stocks
+
+    force, llm, stocks = make_force()
+    force.rollout("stock market price quotes for the AAPL ticker", max_iterations=3)
+    assert force.route_margin is None
+    assert "assign tasks to agents" in llm.prompts[0]  # The planner was asked before any agent ran
+    assert not any("AAPL" in task for task in stocks.tasks)
+
+    force, llm, stocks = make_force(route_margin=1.5)
+    force.rollout("stock market price quotes for the AAPL ticker", max_iterations=3)
+    assert "AAPL" in stocks.tasks[0]  # Routed without a planner call...
+    assert sum("assign tasks to agents" in prompt for prompt in llm.prompts) == 1  # ...then planning resumed
+
+
+def test_unparseable_replan_keeps_the_pending_steps():
+    plan = {"subtasks": [
+        {"id": "s1", "agent": "A", "task": "fetch data", "depends_on": []},
+        {"id": "s2", "agent": "B", "task": "analyse data", "depends_on": ["s1"]},
+        {"id": "s3", "agent": "A", "task": "write the introduction", "depends_on": []},
+    ]}
+    llm = ScriptedLLM([("A step of the plan failed", "not json"), ("Break the task into subtasks", json.dumps(plan))])
+    a = FakeAgent("A", lambda agent: "Error: source offline" if "fetch" in agent.task else "introduction")
+    b = FakeAgent("B", lambda agent: "analysis")
+
+    force = TaskForce([a, b], llm, "team", "test team", route_margin=None)
+    force.rollout("build a report", max_iterations=2, mode="dag")
+
+    assert any("A step of the plan failed" in prompt for prompt in llm.prompts)
+    assert len(a.tasks) == 2 and "write the introduction" in a.tasks[1]  # s3 still ran
+    assert not b.tasks  # s2 depends on the failed step, so it never ran
+    assert [content for agent, _, content in force.task_history if agent == "A"][-1] == "introduction"
+
+
+def test_messages_left_from_a_rollout_do_not_reach_the_next_one():
+    def plan(agent, messages):
+        return json.dumps({"assignments": [{"agent": agent, "task": "TASK COMPLETE"}], "communication_plan": messages})
+
+    replies = iter([
+        plan("A", {"B": {"message": "stale note", "source_agent": "A"}}),  # B never runs in this rollout
+        plan("B", {}),
+    ])
+    llm = ScriptedLLM([("assign tasks to agents", lambda: next(replies))])
+    a = FakeAgent("A", lambda agent: "done")
+    b = FakeAgent("B", lambda agent: "done")
+    force = TaskForce([a, b], llm, "team", "test team", route_margin=None)
+
+    force.rollout("first task", max_iterations=1)
+    assert force.message_broker.stats()["queues"]["B"] == 1
+    force.rollout("second task", max_iterations=1)
+
+    assert b.tasks and all("stale note" not in task for task in b.tasks)
+    assert force.message_broker.stats()["queues"] == {"A": 0, "B": 0}
+
+
+class Crash(BaseException):
+    """Kills a rollout the way a process crash would: nothing in TaskForce catches it."""
+
+
+def test_rollout_resumes_after_a_crash_without_rerunning_finished_steps(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    plan = json.dumps({"assignments": [{"agent": "A", "task": "collect figures"}, {"agent": "B", "task": "draft text"}],
+                       "communication_plan": {}})
+    crashed = []
+
+    def b_respond(agent):
+        if not crashed:
+            crashed.append(True)
+            raise Crash()
+        return "draft"
+
+    def make_force():
+        llm = ScriptedLLM([("assign tasks to agents", plan)])
+        a = FakeAgent("A", lambda agent: "figures " + "x" * 5000)
+        b = FakeAgent("B", b_respond)
+        return TaskForce([a, b], llm, "team", "test team", route_margin=None, checkpoints=store), a, b
+
+    force, a, b = make_force()
+    try:
+        force.rollout("write the report", max_iterations=1, resume_id="run-1")
+    except Crash:
+        pass
+    else:
+        raise AssertionError("the crash should have stopped the rollout")
+    steps = store.begin("run-1", owner="team")["steps"]
+    assert sorted(steps) == ["state", "step:w1"]
+    assert "x" * 5000 not in json.dumps(steps["state"])  # Results live in their own rows, not the state
+
+    force, a, b = make_force()
+    answer = force.rollout("write the report", max_iterations=1, resume_id="run-1")
+    assert a.tasks == [] and b.tasks == ["draft text"]  # A finished before the crash
+    assert [agent for agent, _, _ in force.task_history] == ["A", "B"]
+    assert force.task_history[0][2].startswith("figures")
+    assert force.rollout("write the report", max_iterations=1, resume_id="run-1") == answer
+
+
+def test_graph_rollout_resumes_with_the_finished_step_results(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    plan = json.dumps({"subtasks": [
+        {"id": "s1", "agent": "A", "task": "fetch data", "depends_on": []},
+        {"id": "s2", "agent": "B", "task": "analyse data", "depends_on": ["s1"]},
+    ]})
+    crashed = []
+
+    def b_respond(agent):
+        if not crashed:
+            crashed.append(True)
+            raise Crash()
+        return "analysis"
+
+    def make_force():
+        llm = ScriptedLLM([("Break the task into subtasks", plan)])
+        a = FakeAgent("A", lambda agent: "the data")
+        b = FakeAgent("B", b_respond)
+        return TaskForce([a, b], llm, "team", "test team", route_margin=None, checkpoints=store), llm, a, b
+
+    force, llm, a, b = make_force()
+    try:
+        force.rollout("build a report", max_iterations=1, mode="dag", resume_id="run-2")
+    except Crash:
+        pass
+
+    force, llm, a, b = make_force()
+    force.rollout("build a report", max_iterations=1, mode="dag", resume_id="run-2")
+    assert a.tasks == [] and len(b.tasks) == 1
+    assert "the data" in b.tasks[0]  # s2 still gets s1's result after the restart
+    assert not any("Break the task into subtasks" in prompt for prompt in llm.prompts)  # No re-planning
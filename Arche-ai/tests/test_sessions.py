@@ -0,0 +1,105 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from memory import SessionMemoryPool
+
+
+class FakeMemory:
+    def __init__(self, session_id, close_delay=0.0):
+        self.session_id = session_id
+        self.close_delay = close_delay
+        self.closed = threading.Event()
+
+    def close(self):
+        time.sleep(self.close_delay)
+        self.closed.set()
+
+    def stats(self):
+        return {}
+
+
+def test_cold_load_does_not_block_other_sessions():
+    release = threading.Event()
+
+    def factory(session_id):
+        if session_id == "cold":
+            release.wait(5)
+        return FakeMemory(session_id)
+
+    pool = SessionMemoryPool(factory, capacity=4)
+    warm = pool.get("warm")
+    with ThreadPoolExecutor(1) as executor:
+        cold = executor.submit(pool.get, "cold")
+        time.sleep(0.05)
+        assert pool.get("warm") is warm  # Served while "cold" is still loading
+        assert pool.get("other").session_id == "other"
+        assert not cold.done()
+        release.set()
+        assert cold.result(5).session_id == "cold"
+
+
+def test_concurrent_gets_of_one_session_share_a_single_load():
+    loads = []
+
+    def factory(session_id):
+        loads.append(session_id)
+        time.sleep(0.05)
+        return FakeMemory(session_id)
+
+    pool = SessionMemoryPool(factory, capacity=4)
+    with ThreadPoolExecutor(8) as executor:
+        memories = list(executor.map(lambda _: pool.get("s"), range(8)))
+    assert loads == ["s"]
+    assert all(memory is memories[0] for memory in memories)
+
+
+def test_evicted_session_reloads_only_after_its_close_finishes():
+    built = {}
+    reloaded_after_close = []
+
+    def factory(session_id):
+        previous = built.get(session_id)
+        if previous is not None:
+            reloaded_after_close.append(previous.closed.is_set())
+        memory = built[session_id] = FakeMemory(session_id, close_delay=0.1)
+        return memory
+
+    pool = SessionMemoryPool(factory, capacity=1)
+    pool.get("a")
+    with ThreadPoolExecutor(2) as executor:
+        evicting = executor.submit(pool.get, "b")  # Evicts "a" and closes it slowly
+        time.sleep(0.02)
+        reloaded = executor.submit(pool.get, "a")
+        evicting.result(5)
+        reloaded.result(5)
+    assert reloaded_after_close == [True]
+
+
+def test_eviction_under_concurrency_keeps_capacity_and_closes_every_evicted_memory():
+    built = []
+    lock = threading.Lock()
+
+    def factory(session_id):
+        memory = FakeMemory(session_id, close_delay=0.001)
+        with lock:
+            built.append(memory)
+        return memory
+
+    pool = SessionMemoryPool(factory, capacity=3)
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: pool.get(f"s{i % 10}"), range(200)))
+    assert len(pool) == 3
+    open_memories = [memory for memory in built if not memory.closed.is_set()]
+    assert sorted(memory.session_id for memory in open_memories) == sorted(pool._sessions)
+    pool.close()
+    assert all(memory.closed.is_set() for memory in built)
+
+
+def test_session_stats_are_bounded():
+    pool = SessionMemoryPool(FakeMemory, capacity=2)
+    for i in range(100):
+        pool.get(f"user-{i}")
+    assert len(pool._session_stats) == 8
+    assert pool.stats("user-99")["loads"] == 1
+    assert pool.stats("user-0") == {"loaded": False}
@@ -0,0 +1,71 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from agents.StockAnalyst import StockAnalyst
+from tools import BarStore
+from tools.StockMarket import StockMarketInfo, TTLCache
+
+
+class HistoryTicker:
+    """Stands in for `yf.Ticker` with daily bars rising steadily from 100 over the last three years."""
+
+    def __init__(self, ticker):
+        self.info = {"currentPrice": 150.0, "longName": f"{ticker} Inc.", "longBusinessSummary": "Makes widgets."}
+        self.news = [{"title": f"{ticker} opens a new plant", "link": "https://example.com/news"}]
+
+    def history(self, period=None, start=None, end=None):
+        today = pd.Timestamp.now(tz="America/New_York").normalize()
+        first = today - pd.DateOffset(years=3)
+        index = pd.bdate_range(first, today, tz="America/New_York")
+        index = index[np.arange(len(index)) % 26 != 25]  # ~10 market holidays a year: ~251 bars per year
+        close = np.linspace(100.0, 150.0, len(index))
+        frame = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1e6}, index=index)
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start, tz="America/New_York")]
+        if period is not None and period.endswith("y"):
+            return frame[frame.index >= today - pd.DateOffset(years=int(period[:-1]))]
+        return frame
+
+
+class ScriptedLLM:
+    def __init__(self, system_prompt=None):
+        self.system_prompt = system_prompt
+        self.messages = []
+        self.prompts = []
+
+    def add_message(self, role, content):
+        self.messages.append((role, content))
+
+    def run(self, prompt):
+        self.prompts.append(prompt)
+        if prompt.startswith("should I buy"):  # The data agent asking for the ticker
+            return json.dumps({"calling": {"ticker": "acme"}})
+        return "summary"
+
+
+def test_default_indicators_include_the_one_year_return():
+    market = StockMarketInfo(cache=TTLCache(), source=HistoryTicker)
+    indicators = market.get_indicators(["ACME"])["ACME"]
+    assert not math.isnan(indicators["return_1y"]) and indicators["return_1y"] > 0
+    assert not math.isnan(indicators["sma_200"])
+
+
+def test_analyst_summarizes_compact_details_with_indicators(tmp_path):
+    llm = ScriptedLLM()
+    analyst = StockAnalyst(llm)
+    analyst.data_agent.market = StockMarketInfo(cache=TTLCache(), source=HistoryTicker, bar_store=BarStore(str(tmp_path)))
+
+    analyst.run("should I buy acme?")
+
+    _, sent = llm.messages[-1]
+    assert sent.startswith("### ACME - ACME Inc.")
+    assert "Indicators: Price 150.00" in sent and "1y n/a" not in sent
+    assert "Current Price:" not in sent  # The full details text is not sent alongside the block
+
+    raw = StockAnalyst(ScriptedLLM(), indicators=False)
+    raw.data_agent.market = StockMarketInfo(cache=TTLCache(), source=HistoryTicker)
+    raw.run("should I buy acme?")
+    assert "Current Price:" in raw.llm.messages[-1][1] and "Indicators:" not in raw.llm.messages[-1][1]
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from tools.StockMarket import StockMarketInfo, TTLCache
+
+
+class FakeTicker:
+    """Stands in for `yf.Ticker`, counting how often each symbol is fetched."""
+
+    calls = {}
+    lock = threading.Lock()
+    delay = 0.0
+
+    def __init__(self, ticker):
+        with self.lock:
+            self.calls[ticker] = self.calls.get(ticker, 0) + 1
+        time.sleep(self.delay)
+        self.info = {"currentPrice": 100.0 + len(ticker), "longName": f"{ticker} Inc."}
+        self.news = [{"title": f"{ticker} news"}]
+
+
+def make_market(ttl=300.0, delay=0.0):
+    FakeTicker.calls, FakeTicker.delay = {}, delay
+    return StockMarketInfo(cache=TTLCache(ttl=ttl), source=FakeTicker)
+
+
+def test_batched_tickers_are_deduplicated():
+    market = make_market(delay=0.05)
+    details = market.get_many_details(["aapl", "AAPL ", " msft", "MSFT", "aapl", ""], formatted=False)
+
+    assert list(details) == ["AAPL", "MSFT"]
+    assert FakeTicker.calls == {"AAPL": 1, "MSFT": 1}
+    # Price, company info and news of a fetched ticker come from the same cached lookup
+    assert market.get_stock_price("aapl") == 104.0 and market.get_news("AAPL")[0]["title"] == "AAPL news"
+    assert FakeTicker.calls == {"AAPL": 1, "MSFT": 1}
+
+
+def test_concurrent_lookups_share_one_fetch():
+    market = make_market(delay=0.1)
+    threads = [threading.Thread(target=market.get_stock_price, args=("NVDA",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeTicker.calls == {"NVDA": 1}
+
+
+def test_entries_expire_after_the_ttl():
+    market = make_market(ttl=0.2)
+    market.get_stock_price("AAPL")
+    market.get_stock_price("AAPL")
+    assert FakeTicker.calls == {"AAPL": 1}
+
+    time.sleep(0.25)
+    market.get_stock_price("AAPL")
+    assert FakeTicker.calls == {"AAPL": 2}
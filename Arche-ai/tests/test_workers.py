@@ -0,0 +1,103 @@
+import functools
+import os
+import threading
+import time
+
+import pytest
+
+from agents.distributed import WorkerPool
+
+
+class Echo:
+    name = "echo"
+
+    def __init__(self, crash=None):
+        self.crash = crash
+        self.task = None
+
+    def rollout(self):
+        if self.crash is not None:
+            self.crash(self.task)
+        return f"{os.getpid()}:{threading.current_thread().name}:{self.task}"
+
+
+def exit_once(marker, task):
+    """Kills the worker process the first time any worker runs "boom"."""
+    if task == "boom" and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+
+
+def exit_always(task):
+    os._exit(1)
+
+
+class WorkerDied(BaseException):
+    pass
+
+
+def make_agents(crash=None):
+    return [Echo(crash)]
+
+
+def test_dead_worker_process_is_replaced_and_its_assignment_reassigned(tmp_path):
+    marker = str(tmp_path / "crashed")
+    factory = functools.partial(make_agents, functools.partial(exit_once, marker))
+    with WorkerPool(factory, workers=2, heartbeat_interval=0.1, start_method="fork") as pool:
+        assert pool.run("echo", "boom", timeout=30).endswith(":boom")
+        stats = pool.stats()
+        assert os.path.exists(marker)
+        assert stats["workers_lost"] == 1
+        assert stats["reassigned"] == 1
+        assert stats["completed"] == 1
+        assert stats["workers"] == 2  # The dead worker was respawned
+
+        # The pool keeps serving on the replacement worker
+        assert pool.run("echo", "after", timeout=30).endswith(":after")
+
+
+def test_assignment_fails_after_max_attempts():
+    factory = functools.partial(make_agents, exit_always)
+    with WorkerPool(factory, workers=1, heartbeat_interval=0.1, max_attempts=2, start_method="fork") as pool:
+        with pytest.raises(RuntimeError, match="gave up after 2 attempts"):
+            pool.run("echo", "boom", timeout=30)
+        assert pool.stats()["workers_lost"] == 2
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_worker_thread_is_replaced_and_its_assignment_reassigned():
+    crashed = threading.Event()
+
+    def die_once(task):
+        if not crashed.is_set():
+            crashed.set()
+            raise WorkerDied()
+
+    factory = functools.partial(make_agents, die_once)
+    with WorkerPool(factory, workers=1, backend="thread", heartbeat_interval=0.1) as pool:
+        response = pool.run("echo", "task", timeout=10)
+        assert response.endswith(":task")
+        assert "TaskForceWorker-2" in response  # Answered by the replacement worker
+        assert pool.stats()["reassigned"] == 1
+
+
+def test_hung_worker_is_replaced_after_assignment_timeout():
+    release = threading.Event()
+    hung = threading.Event()
+
+    def hang_once(task):
+        if not hung.is_set():
+            hung.set()
+            release.wait(10)
+
+    factory = functools.partial(make_agents, hang_once)
+    started = time.monotonic()
+    with WorkerPool(factory, workers=1, backend="thread", heartbeat_interval=0.1, assignment_timeout=0.5) as pool:
+        try:
+            response = pool.run("echo", "task", timeout=10)
+        finally:
+            release.set()
+        assert "TaskForceWorker-2" in response
+        assert pool.stats()["workers_lost"] == 1
+    # The replaced thread was told to exit, so stopping the pool doesn't wait on it
+    assert time.monotonic() - started < 5
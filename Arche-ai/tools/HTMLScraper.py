@@ -1,58 +1,381 @@
+import os
+import re
+import codecs
+import threading
+import concurrent.futures
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
 import requests
 from bs4 import BeautifulSoup
 from bs4.element import Comment
+from tools.http_client import charset_of, get_client
+
+# Elements that never hold readable content
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "head", "button", "select", "form"}
+# Page chrome around the main content. A <header> only counts at page level: inside <main> or
+# <article> it usually holds the title.
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "menu", "dialog"}
+# A class/id token naming page chrome, e.g. "sidebar" or "site-footer" (but not "header-wrap"). Tokens
+# must match as a whole, so wrappers that merely mention a hint ("site-content header-wrap") stay.
+BOILERPLATE_HINT = re.compile(
+    r"(?:[a-z0-9]+[_-])*(nav|navbar|menu|footer|header|sidebar|banner|breadcrumbs?|cookies?|consent|ads?|advert\w*|"
+    r"sponsor\w*|promo\w*|social|share|related|newsletter|subscribe|popup|modal|comments?)",
+    re.I,
+)
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "tr", "table", "blockquote",
+    "pre", "figure", "figcaption", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6", "summary", "details", "address",
+}
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "track", "wbr", "param"}
+_SPACES = re.compile(r"\s+")
+
+
+class _ContentExtractor:
+    """Single-pass text/markdown extractor driven by parser events (start, end, data, close).
+
+    It builds no tree: readable text is collected into blocks as the document streams in, and
+    content inside skipped or boilerplate elements is dropped on the fly. The same handler works
+    as an lxml parser target and behind the stdlib `HTMLParser`.
+    """
+
+    def __init__(self, markdown: bool = False, min_main_chars: int = 200):
+        self.markdown = markdown
+        self.min_main_chars = min_main_chars
+        self.blocks: List[List] = []  # [text, inside <main>/<article>]
+        self._line: List[str] = []
+        self._prefix = ""
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._pre_depth = 0
+
+    def start(self, tag: str, attrs) -> None:
+        tag = tag.lower()
+        if self._skip_tag is not None:
+            if tag == self._skip_tag and tag not in VOID_TAGS:
+                self._skip_depth += 1
+            return
+        attrs = dict(attrs or {})
+        hint = f"{attrs.get('class') or ''} {attrs.get('id') or ''} {attrs.get('role') or ''}"
+        boilerplate = tag not in ("body", "html", "main", "article") and any(BOILERPLATE_HINT.fullmatch(token) for token in hint.split())
+        chrome = tag in BOILERPLATE_TAGS and not (tag == "header" and self._main_depth)
+        if tag in SKIP_TAGS or chrome or boilerplate or attrs.get("aria-hidden") == "true" or "hidden" in attrs:
+            if tag not in VOID_TAGS:
+                self._skip_tag, self._skip_depth = tag, 1
+            return
+        if tag in ("main", "article") or attrs.get("role") == "main":
+            self._main_depth += 1
+        if tag == "pre":
+            self._pre_depth += 1
+        if tag in BLOCK_TAGS:
+            self._flush()
+            if self.markdown:
+                if tag[0] == "h" and tag[1:].isdigit():
+                    self._prefix = "#" * int(tag[1:]) + " "
+                elif tag == "li":
+                    self._prefix = "- "
+                elif tag == "blockquote":
+                    self._prefix = "> "
+                elif tag == "pre":
+                    self._prefix = "```\n"
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag in BLOCK_TAGS:
+            if tag == "pre" and self.markdown and self._line:
+                self._line.append("\n```")
+            self._flush()
+        if tag == "pre":
+            self._pre_depth = max(0, self._pre_depth - 1)
+        if tag in ("main", "article") and self._main_depth:
+            self._main_depth -= 1
+
+    def data(self, text: str) -> None:
+        if self._skip_tag is None and text:
+            self._line.append(text if self._pre_depth else _SPACES.sub(" ", text))
+
+    def close(self) -> str:
+        self._flush()
+        main = [text for text, in_main in self.blocks if in_main]
+        # Prefer <main>/<article> when it holds real content; otherwise keep all non-boilerplate text
+        blocks = main if sum(map(len, main)) >= self.min_main_chars else [text for text, _ in self.blocks]
+        output, previous = [], None
+        for text in blocks:
+            if text == previous:  # Repeated lines are usually widgets rendered twice
+                continue
+            if output:
+                # Markdown paragraphs need a blank line between them; list items don't
+                list_item = text.startswith("- ") and previous.startswith("- ")
+                output.append("\n\n" if self.markdown and not list_item else "\n")
+            output.append(text)
+            previous = text
+        return "".join(output)
+
+    def _flush(self) -> None:
+        text = "".join(self._line)
+        text = text.strip("\n") if self._pre_depth else text.strip()
+        if text and text.strip("`\n"):
+            self.blocks.append([self._prefix + text, self._main_depth > 0])
+        self._line, self._prefix = [], ""
+
+
+class _StdlibFeeder(HTMLParser):
+    """Adapts the stdlib `HTMLParser` callbacks to an lxml-style parser target."""
+
+    def __init__(self, target: _ContentExtractor):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, attrs)
+        if tag in VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, attrs)
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+    def close(self) -> str:
+        super().close()
+        return self.target.close()
+
+
+def _incremental_parser(target: _ContentExtractor, parser: str):
+    """A feed()/close() parser for `target`: lxml's C parser when available, else the stdlib one."""
+    if parser in ("auto", "lxml"):
+        try:
+            from lxml import etree
+            return etree.HTMLParser(target=target, remove_comments=True, remove_pis=True, no_network=True)
+        except ImportError:
+            if parser == "lxml":
+                raise ImportError("The 'lxml' parser requires lxml (`pip install lxml`).")
+    return _StdlibFeeder(target)
+
+
+def _decoder(charset: Optional[str]):
+    try:
+        return codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+    except LookupError:  # Unknown charset label
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def _clean_page(html: str, mode: str, parser: str) -> str:
+    """Cleans one fetched page; module-level so worker processes can run it."""
+    if mode == "html":
+        return HTMLContentScraper.clean_html(html)
+    return HTMLContentScraper(parser=parser).extract_main_content(html, markdown=mode == "markdown")
+
 
 class HTMLContentScraper:
     """
     Scrapes a webpage and removes all CSS and JavaScript content.
+
+    `scrape_many` cleans pages in a process pool that is created on first use and kept for later
+    calls; release it with `close()` or by using the scraper as a context manager.
     """
 
-    def __init__(self, headers=None):
+    def __init__(self, headers=None, parser: str = "auto", max_bytes: int = 2 * 1024 * 1024):
         """
         Initializes the scraper with optional custom headers.
 
         Args:
             headers (dict, optional): Custom headers for HTTP requests.
+            parser (str): Parser of the "text"/"markdown" modes: "auto" (lxml if installed), "lxml"
+                          or "html.parser".
+            max_bytes (int): Bytes read per page in the "text"/"markdown" modes; longer pages are cut.
         """
 
         self.headers = headers or {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
         }
+        self.parser = parser
+        self.max_bytes = max_bytes
+        self._parse_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def __enter__(self) -> "HTMLContentScraper":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
-    def scrape_and_clean_html(self,url):
+    def close(self) -> None:
+        """Shuts down the page-cleaning processes, if `scrape_many` started them."""
+        with self._pool_lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_parse_pool(self, workers: int) -> concurrent.futures.ProcessPoolExecutor:
+        """The scraper's process pool, started with `workers` processes by the first call that needs it."""
+        with self._pool_lock:
+            if self._parse_pool is None:
+                self._parse_pool = concurrent.futures.ProcessPoolExecutor(workers)
+            return self._parse_pool
+
+    def scrape_and_clean_html(self, url, mode: str = "html"):
         """
-        Fetches the HTML content, removes CSS/JS, and returns the cleaned HTML.
+        Fetches the page and returns its cleaned content.
 
         Args:
             url (str): The URL of the webpage to scrape.
+            mode (str): "html" returns the page's HTML without CSS/JS. "text" and "markdown" stream
+                        the page and return only its main readable content (navigation, footers,
+                        ads and similar boilerplate removed), as plain text or compact markdown.
 
         Returns:
-            str: The cleaned HTML content, or None if an error occurs.
+            str: The cleaned content, or None if an error occurs.
         """
+        if mode not in ("html", "text", "markdown"):
+            raise ValueError(f"Unknown scrape mode '{mode}'. Use 'html', 'text' or 'markdown'.")
 
         try:
-            response = requests.get(url, headers=self.headers)
+            client = get_client()
+            if mode != "html" and client.cache is not None:
+                # Cached pages are already on disk; parsing the stored body beats streaming it again
+                response = client.get(url, headers=self.headers, max_bytes=self.max_bytes, truncate=True)
+                response.raise_for_status()
+                return self.extract_main_content(response.text, markdown=mode == "markdown")
+            if mode != "html":
+                return self._stream_main_content(url, markdown=mode == "markdown")
+
+            response = client.get(url, headers=self.headers)
             response.raise_for_status()
+            return self.clean_html(response.text)
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+        except requests.exceptions.RequestException as e:
+            print(f"Error during scraping: {e}")
+            return None
 
-            # Remove <script> tags (for JavaScript)
-            for script in soup(["script", "style"]): 
-                script.decompose()
+    @staticmethod
+    def clean_html(html: str) -> str:
+        """Removes scripts, styles and comments from an HTML document."""
+        soup = BeautifulSoup(html, 'html.parser')
 
-            # Remove CSS from inline <style> tags
-            for style in soup.find_all('style'):
-                style.decompose()
+        # Remove <script> tags (for JavaScript)
+        for script in soup(["script", "style"]):
+            script.decompose()
 
-            # Remove HTML comments (often contain CSS or JS)
-            for element in soup(text=lambda text: isinstance(text, Comment)):
-                element.extract()
+        # Remove CSS from inline <style> tags
+        for style in soup.find_all('style'):
+            style.decompose()
 
-            return str(soup)  
+        # Remove HTML comments (often contain CSS or JS)
+        for element in soup(text=lambda text: isinstance(text, Comment)):
+            element.extract()
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error during scraping: {e}")
-            return None
+        return str(soup)
+
+    def scrape_many(self, urls: Iterable[str], mode: str = "markdown", concurrency: int = 8, per_host: int = 2,
+                    parse_workers: Optional[int] = None, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Scrapes many pages concurrently, yielding each result as soon as it is ready.
+
+        Args:
+            urls (Iterable[str]): Pages to scrape; duplicates are scraped once.
+            mode (str): "html", "text" or "markdown", as in `scrape_and_clean_html`.
+            concurrency (int): Max pages downloading at once.
+            per_host (int): Max pages downloading at once from the same host.
+            parse_workers (int, optional): Processes that clean the pages (defaults to the CPU
+                                           count); 0 cleans them in the download threads instead.
+                                           The pool is kept for later calls, so only the first
+                                           call's value sizes it.
+            timeout (float, optional): Seconds for the whole batch; pages not done by then are
+                                       yielded with a timeout error.
+
+        Yields:
+            dict: `url`, `content` (the cleaned page, or None) and `error` (None on success), in
+                  completion order.
+        """
+        if mode not in ("html", "text", "markdown"):
+            raise ValueError(f"Unknown scrape mode '{mode}'. Use 'html', 'text' or 'markdown'.")
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        client = get_client()
+        host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        slots_lock = threading.Lock()
+        workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        parse_pool = self._get_parse_pool(workers) if workers > 0 else None
+
+        def slot(url: str) -> threading.BoundedSemaphore:
+            host = urlsplit(url).netloc.lower()
+            with slots_lock:
+                if host not in host_slots:
+                    host_slots[host] = threading.BoundedSemaphore(max(1, per_host))
+                return host_slots[host]
+
+        def scrape(url: str) -> Dict[str, Any]:
+            try:
+                with slot(url):
+                    if mode == "html":
+                        response = client.get(url, headers=self.headers)
+                    else:
+                        response = client.get(url, headers=self.headers, max_bytes=self.max_bytes, truncate=True)
+                response.raise_for_status()
+                # The download slot is free again while the page is being cleaned
+                if parse_pool is not None:
+                    content = parse_pool.submit(_clean_page, response.text, mode, self.parser).result()
+                else:
+                    content = _clean_page(response.text, mode, self.parser)
+                return {"url": url, "content": content, "error": None}
+            except Exception as e:
+                return {"url": url, "content": None, "error": f"{type(e).__name__}: {e}"}
+
+        fetch_pool = concurrent.futures.ThreadPoolExecutor(max(1, min(concurrency, len(urls))), thread_name_prefix="scrape_many")
+        futures = {fetch_pool.submit(scrape, url): url for url in urls}
+        pending = set(futures)
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=timeout):
+                pending.discard(future)
+                yield future.result()
+        except concurrent.futures.TimeoutError:
+            for future in pending:
+                yield {"url": futures[future], "content": None, "error": f"TimeoutError: not done within {timeout}s"}
+        finally:
+            # Stopping early (or timing out) drops the pages that haven't started; running downloads
+            # finish in the background. The parse pool stays up for the next call.
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract_main_content(self, html: str, markdown: bool = False, chunk_size: int = 64 * 1024) -> str:
+        """Returns the main readable content of an HTML string as text or markdown ("" if it has none)."""
+        if not html or not html.strip():
+            return ""
+        extractor = _ContentExtractor(markdown=markdown)
+        parser = _incremental_parser(extractor, self.parser)
+        try:
+            for start in range(0, len(html), chunk_size):
+                parser.feed(html[start: start + chunk_size])
+            return parser.close()
+        except SyntaxError:  # lxml's XMLSyntaxError on a document it can't parse; keep what was read
+            return extractor.close()
+
+    def _stream_main_content(self, url: str, markdown: bool) -> str:
+        """Parses the page while it downloads, reading at most `max_bytes`."""
+        client = get_client()
+        with client.stream(url, headers=self.headers) as response:
+            response.raise_for_status()
+            decoder = _decoder(charset_of(response.headers.get("Content-Type", "")))
+            parser = _incremental_parser(_ContentExtractor(markdown=markdown), self.parser)
+            for chunk in client.iter_body(response, self.max_bytes):
+                parser.feed(decoder.decode(chunk))
+            parser.feed(decoder.decode(b"", final=True))
+            return parser.close()
 
 # Example Usage
 if __name__ == "__main__":
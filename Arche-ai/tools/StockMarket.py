@@ -1,13 +1,123 @@
 import yfinance as yf
 import datetime
+import re
+import time
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+from tools.bar_store import BarStore, columns_from_frame, frame_from_columns
+from tools.indicators import indicators_by_ticker
+
+_PERIOD = re.compile(r"(\d+)(d|wk|mo|y)")
+_PERIOD_UNITS = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+
+class TTLCache:
+    """Thread-safe in-memory cache whose entries expire `ttl` seconds after they are stored.
+
+    Concurrent `get_or_load` calls for the same key share one load instead of each fetching it.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1024):
+        """
+        Args:
+            ttl (float): Seconds an entry stays valid.
+            max_entries (int): Max entries kept; the least recently used are dropped beyond it.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Returns the cached value, or loads and caches it. Exceptions from `loader` are not cached."""
+        missing = object()
+        while True:
+            value = self.get(key, missing)
+            if value is not missing:
+                return value
+            with self._lock:
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = threading.Event()
+                    break
+            pending.wait()  # Another thread is loading this key; use its result (or retry if it failed)
+        try:
+            value = loader()
+            self.set(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+            pending.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_shared_cache = TTLCache()
+
 
 class StockMarketInfo:
     """
     Provides stock market information using the yfinance library. 
     """
 
-    def __init__(self):
-        pass  
+    def __init__(self, cache: Optional[TTLCache] = None, source: Optional[Callable[[str], Any]] = None, max_workers: int = 8,
+                 bar_store: Optional[BarStore] = None, refresh_interval: float = 3600.0):
+        """
+        Args:
+            cache (TTLCache, optional): Cache of per-ticker info and news; defaults to one shared by
+                                        all instances (5 minute TTL).
+            source (Callable[[str], Any], optional): Builds the data object of a ticker (with `info`,
+                                                     `news` and `history`); defaults to `yf.Ticker`.
+            max_workers (int): Tickers fetched at once by `get_many_details`.
+            bar_store (BarStore, optional): On-disk store of daily bars for `get_historical_data`;
+                                            later calls only download the bars after the last stored one.
+            refresh_interval (float): Seconds before stored bars are checked for newer ones.
+        """
+        self.cache = cache if cache is not None else _shared_cache
+        self.source = source or yf.Ticker
+        self.max_workers = max_workers
+        self.bar_store = bar_store
+        self.refresh_interval = refresh_interval
+        self._history_locks: Dict[str, threading.Lock] = {}
+        self._history_locks_guard = threading.Lock()
+
+    def _load(self, ticker: str) -> Dict[str, Any]:
+        """Fetches a ticker's info and news once."""
+        stock = self.source(ticker)
+        info = stock.info or {}
+        try:
+            news = list(stock.news or [])
+        except Exception as e:  # Info without news is still useful
+            print(f"Error fetching news: {e}")
+            news = []
+        return {"ticker": ticker, "price": info.get('currentPrice', None), "info": info, "news": news}
+
+    def _details(self, ticker: str) -> Dict[str, Any]:
+        ticker = ticker.strip().upper()
+        return self.cache.get_or_load(ticker, lambda: self._load(ticker))
 
     def get_stock_price(self, ticker: str) -> float:
         """
@@ -20,13 +130,12 @@ class StockMarketInfo:
             float: The current stock price, or None if an error occurs.
         """
         try:
-            stock = yf.Ticker(ticker)
-            return stock.info.get('currentPrice', None)
+            return self._details(ticker)["price"]
         except Exception as e:
             print(f"Error fetching stock price: {e}")
             return None
 
-    def get_historical_data(self, ticker: str, period: str = "1y") -> yf.Ticker:
+    def get_historical_data(self, ticker: str, period: str = "1y", start=None, end=None) -> yf.Ticker:
         """
         Retrieves historical stock data for a given period.
 
@@ -34,17 +143,86 @@ class StockMarketInfo:
             ticker (str): The stock symbol.
             period (str, optional): The data period (e.g., "1d", "5d", "1mo", "1y", "5y", "max"). 
                                    Defaults to "1y".
+            start (str | datetime, optional): First date of the range (overrides `period`).
+            end (str | datetime, optional): Date the range stops before; defaults to today.
 
         Returns:
             pandas.DataFrame: A DataFrame containing historical data (Open, High, Low, Close, Volume)
         """
         try:
-            stock = yf.Ticker(ticker)
+            if self.bar_store is not None:
+                return self._stored_history(ticker.strip().upper(), period, start, end)
+            stock = self.source(ticker)
+            if start is not None or end is not None:
+                return stock.history(start=start, end=end)
             return stock.history(period=period)
         except Exception as e:
             print(f"Error fetching historical data: {e}")
             return None
 
+    def _history_lock(self, ticker: str) -> threading.Lock:
+        with self._history_locks_guard:
+            if ticker not in self._history_locks:
+                self._history_locks[ticker] = threading.Lock()
+            return self._history_locks[ticker]
+
+    def _stored_history(self, ticker: str, period: str, start, end):
+        """Serves daily bars from the bar store, downloading only what it doesn't hold yet."""
+        import pandas as pd
+
+        def utc(value):
+            stamp = pd.Timestamp(value)
+            return stamp.tz_localize("UTC") if stamp.tz is None else stamp.tz_convert("UTC")
+
+        now = pd.Timestamp.now(tz="UTC")
+        last_bars = None
+        if start is not None:
+            range_start = utc(start)
+        elif period == "max":
+            range_start = None
+        elif period == "ytd":
+            range_start = pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+        else:
+            match = _PERIOD.fullmatch(period)
+            if match is None:
+                raise ValueError(f"Invalid period '{period}'.")
+            count, unit = int(match.group(1)), match.group(2)
+            if unit == "d":
+                # "5d" means the last 5 trading days, so cover weekends and holidays and trim after
+                last_bars, range_start = count, now - pd.DateOffset(days=2 * count + 7)
+            else:
+                range_start = now - pd.DateOffset(**{_PERIOD_UNITS[unit]: count})
+        range_end = utc(end) if end is not None else None
+
+        with self._history_lock(ticker):
+            stock = None
+            meta = self.bar_store.meta(ticker)
+            covered = meta is not None and (meta["covered_from"] is None or (range_start is not None and range_start.value >= meta["covered_from"]))
+            if not covered:
+                stock = self.source(ticker)
+                frame = stock.history(period="max") if range_start is None else stock.history(start=range_start.strftime("%Y-%m-%d"))
+                if frame is None or frame.empty:
+                    return frame
+                self.bar_store.write(ticker, columns_from_frame(frame), tz=str(frame.index.tz) if frame.index.tz else None,
+                                     covered_from=None if range_start is None else range_start.value)
+            elif time.time() - meta["fetched_at"] > self.refresh_interval and (range_end is None or range_end.value > meta["last"]):
+                # Refetch from the last stored day: it may have been a still-forming bar
+                last_day = pd.Timestamp(meta["last"], tz="UTC").tz_convert(meta["tz"] or "UTC").strftime("%Y-%m-%d")
+                stock = self.source(ticker)
+                frame = stock.history(start=last_day)
+                if frame is not None and not frame.empty:
+                    self.bar_store.append(ticker, columns_from_frame(frame), tz=str(frame.index.tz) if frame.index.tz else None)
+                else:
+                    self.bar_store.append(ticker, {"Date": np.empty(0, dtype=np.int64)})
+            meta = self.bar_store.meta(ticker)
+            columns = self.bar_store.read(
+                ticker,
+                start=None if range_start is None else range_start.value,
+                end=None if range_end is None else range_end.value,
+            )
+        frame = frame_from_columns(columns, meta["tz"])
+        return frame.tail(last_bars) if last_bars is not None else frame
+
     def get_company_info(self, ticker: str) -> dict:
         """
         Returns basic company information.
@@ -57,8 +235,7 @@ class StockMarketInfo:
                   or None if an error occurs.
         """
         try:
-            stock = yf.Ticker(ticker)
-            return stock.info
+            return self._details(ticker)["info"]
         except Exception as e:
             print(f"Error fetching company information: {e}")
             return None
@@ -75,8 +252,7 @@ class StockMarketInfo:
             list: A list of dictionaries, where each dictionary represents a news article
                   and contains 'title', 'link', and 'published_at' keys.
         """
-        stock = yf.Ticker(ticker)
-        news = stock.news
+        news = self._details(ticker)["news"]
         return news[:count]
 
     def get_stock_details(self, ticker: str) -> str:
@@ -91,37 +267,91 @@ class StockMarketInfo:
                  or an error message if something goes wrong.
         """
         try:
-            ticker = ticker.upper()
-            stock = yf.Ticker(ticker)
+            return self.format_details(self._details(ticker))
+        except Exception as e:
+            return f"Error fetching stock details: {e}"
+
+    def get_many_details(self, tickers: Iterable[str], formatted: bool = True) -> Dict[str, Any]:
+        """
+        Fetches many tickers concurrently, each once (info, price and news share one lookup).
 
-            # Price Information
-            price = self.get_stock_price(ticker)
-            price_info = f"Current Price: ${price:.2f}" if price else "Price information not available."
+        Args:
+            tickers (Iterable[str]): The stock symbols; duplicates are fetched once.
+            formatted (bool): Return `get_stock_details`-style strings instead of raw dictionaries
+                              (`ticker`, `price`, `info`, `news`, or `error`).
+
+        Returns:
+            dict: Upper-cased ticker -> details, in input order.
+        """
+        tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker and ticker.strip()))
 
-            # Company Information
-            info = self.get_company_info(ticker)
-            if info:
-                company_info = f"""
+        def fetch(ticker: str) -> Any:
+            try:
+                details = self._details(ticker)
+            except Exception as e:
+                details = {"ticker": ticker, "error": f"{type(e).__name__}: {e}"}
+            if not formatted:
+                return details
+            if "error" in details:
+                return f"Error fetching stock details: {details['error']}"
+            return self.format_details(details)
+
+        if not tickers:
+            return {}
+        with concurrent.futures.ThreadPoolExecutor(max(1, min(self.max_workers, len(tickers)))) as executor:
+            return dict(zip(tickers, executor.map(fetch, tickers)))
+
+    def get_indicators(self, tickers: Iterable[str], period: str = "2y") -> Dict[str, Dict[str, float]]:
+        """
+        Computes technical indicators (moving averages, EMA, RSI, MACD, volatility, drawdown and
+        returns) for many tickers: histories are fetched concurrently, then computed in one batch.
+
+        Args:
+            tickers (Iterable[str]): The stock symbols.
+            period (str, optional): History the indicators are computed over. Defaults to "2y": a
+                                    1-year return needs more than a year (252 bars) of history.
+
+        Returns:
+            dict: Upper-cased ticker -> {indicator: latest value}; tickers without history are left out.
+        """
+        tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker and ticker.strip()))
+        if not tickers:
+            return {}
+        with concurrent.futures.ThreadPoolExecutor(max(1, min(self.max_workers, len(tickers)))) as executor:
+            frames = dict(zip(tickers, executor.map(lambda ticker: self.get_historical_data(ticker, period), tickers)))
+        return indicators_by_ticker(frames)
+
+    @staticmethod
+    def format_details(details: Dict[str, Any], news_count: int = 5) -> str:
+        """Formats fetched details as the `get_stock_details` text."""
+        # Price Information
+        price = details["price"]
+        price_info = f"Current Price: ${price:.2f}" if price else "Price information not available."
+
+        # Company Information
+        info = details["info"]
+        if info:
+            company_info = f"""
                 Company: {info.get('longName', 'N/A')}
                 Sector: {info.get('sector', 'N/A')}
                 Industry: {info.get('industry', 'N/A')}
                 Website: {info.get('website', 'N/A')}
                 Business Summary: {info.get('longBusinessSummary', 'N/A')}
                 """
-            else:
-                company_info = "Company information not available."
-
-            # Recent News
-            news = self.get_news(ticker)
-            if news:
-                news_section = "\n--- Recent News ---\n" + "\n".join(
-                    [f"- {article['title']} ({article['link']})" for article in news]
-                )
-            else:
-                news_section = "No recent news found."
+        else:
+            company_info = "Company information not available."
+
+        # Recent News
+        news = details["news"][:news_count]
+        if news:
+            news_section = "\n--- Recent News ---\n" + "\n".join(
+                [f"- {article['title']} ({article['link']})" for article in news]
+            )
+        else:
+            news_section = "No recent news found."
 
-            # Combine all sections
-            stock_details = f"""
+        # Combine all sections
+        stock_details = f"""
             --- Stock Information ---
             {price_info}
 
@@ -130,10 +360,7 @@ class StockMarketInfo:
             {news_section}
             ------------------------------
             """
-            return stock_details
-
-        except Exception as e:
-            return f"Error fetching stock details: {e}"
+        return stock_details
 
 # Example Usage (Modified)
 if __name__ == "__main__":
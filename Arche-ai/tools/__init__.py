@@ -1,6 +1,12 @@
 from tools.weather import get_weather
-from tools.web_search import web_search
+from tools.web_search import web_search, search_results
 from tools.current_time import get_current_time
 from tools.own_tool import Tool
 from tools.HTMLScraper import HTMLContentScraper
-from tools.StockMarket import StockMarketInfo
\ No newline at end of file
+from tools.StockMarket import StockMarketInfo, TTLCache
+from tools.http_client import HTTPClient, HTTPResponse, ResponseTooLarge, get_client
+from tools.http_cache import HTTPCache, enable_http_cache
+from tools.bar_store import BarStore
+from tools.indicators import compute_indicators, indicators_by_ticker, format_indicators
+from tools.passages import PassagePool, split_passages
+from tools.summary_cache import SummaryCache, get_summary_cache
\ No newline at end of file
@@ -0,0 +1,186 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+Columns = Dict[str, np.ndarray]  # "Date" (int64 ns since the epoch, UTC) plus one float64 array per field
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def columns_from_frame(frame) -> Columns:
+    """Splits a yfinance history DataFrame into NumPy columns."""
+    index = frame.index.tz_convert("UTC") if frame.index.tz is not None else frame.index
+    columns = {"Date": index.as_unit("ns").asi8.astype(np.int64)}
+    for name in frame.columns:
+        columns[str(name)] = frame[name].to_numpy(dtype=np.float64)
+    return columns
+
+
+def frame_from_columns(columns: Columns, tz: Optional[str] = None):
+    """Builds a yfinance-style history DataFrame (indexed by Date) from NumPy columns."""
+    import pandas as pd
+
+    index = pd.to_datetime(np.asarray(columns["Date"]), unit="ns", utc=True)
+    index = index.tz_convert(tz) if tz else index.tz_localize(None)
+    index.name = "Date"
+    return pd.DataFrame({name: np.asarray(values) for name, values in columns.items() if name != "Date"}, index=index)
+
+
+class BarStore:
+    """On-disk columnar cache of daily price bars: one `.npy` file per column and ticker.
+
+    Reads memory-map the columns and slice them by date, so a range query touches only the rows
+    it returns. Updates write a new version of the ticker's columns next to the old one and then
+    switch the ticker's metadata to it, so readers never see a half-written set. When the store
+    outgrows `max_bytes`, the least recently used tickers are evicted.
+
+    Because of that copy-on-write switch, `append` rewrites all of a ticker's columns rather than
+    extending the files in place: an update costs O(stored bars), not O(new bars). For daily bars
+    that is ~2 KB per column and year (a decade of a ticker's columns is under 200 KB), and updates are
+    rate-limited by `StockMarketInfo.refresh_interval`, so the copy is cheap next to the download.
+    """
+
+    def __init__(self, directory: str = os.path.join("cache", "bars"), max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            directory (str): Directory of the store, created if missing.
+            max_bytes (int): Max total size of the stored columns.
+        """
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+
+    def _meta_path(self, ticker: str) -> str:
+        return os.path.join(self.directory, _SAFE_NAME.sub("_", ticker.upper()) + ".json")
+
+    def meta(self, ticker: str) -> Optional[Dict]:
+        """The ticker's metadata (`version`, `columns`, `tz`, `rows`, `first`, `last`, `covered_from`,
+        `fetched_at`, `bytes`), or None if it isn't stored."""
+        try:
+            with open(self._meta_path(ticker), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read(self, ticker: str, start: Optional[int] = None, end: Optional[int] = None) -> Optional[Columns]:
+        """Memory-mapped columns of the bars with `start <= Date < end` (ns since the epoch, UTC)."""
+        with self._lock:
+            meta = self.meta(ticker)
+            if meta is None:
+                return None
+            version_dir = os.path.join(self.directory, meta["version"])
+            try:
+                columns = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r") for name in meta["columns"]}
+            except (OSError, ValueError):
+                return None  # Evicted or replaced under us
+            os.utime(self._meta_path(ticker))  # Marks the ticker as recently used
+        dates = columns["Date"]
+        lo = 0 if start is None else int(np.searchsorted(dates, start, side="left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, end, side="left"))
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    def write(self, ticker: str, columns: Columns, tz: Optional[str] = None, covered_from: Optional[int] = None) -> Dict:
+        """Replaces the ticker's bars.
+
+        Args:
+            covered_from (int, optional): Earliest date the bars are known to be complete from (the
+                                          start of the requested range); None means the full history.
+        """
+        order = np.argsort(columns["Date"], kind="stable")
+        columns = {name: np.ascontiguousarray(np.asarray(values)[order]) for name, values in columns.items()}
+        with self._lock:
+            previous = self.meta(ticker)
+            version = f"{_SAFE_NAME.sub('_', ticker.upper())}.{time.time_ns()}"
+            version_dir = os.path.join(self.directory, version)
+            os.makedirs(version_dir)
+            size = 0
+            for name, values in columns.items():
+                path = os.path.join(version_dir, f"{name}.npy")
+                np.save(path, values)
+                size += os.path.getsize(path)
+            dates = columns["Date"]
+            meta = {
+                "ticker": ticker.upper(),
+                "version": version,
+                "columns": list(columns),
+                "tz": tz,
+                "rows": int(len(dates)),
+                "first": int(dates[0]) if len(dates) else None,
+                "last": int(dates[-1]) if len(dates) else None,
+                "covered_from": covered_from,
+                "fetched_at": time.time(),
+                "bytes": size,
+            }
+            temp_path = self._meta_path(ticker) + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(temp_path, self._meta_path(ticker))
+            if previous is not None:
+                shutil.rmtree(os.path.join(self.directory, previous["version"]), ignore_errors=True)
+            self._enforce_budget(keep=ticker)
+        return meta
+
+    def append(self, ticker: str, columns: Columns, tz: Optional[str] = None) -> Dict:
+        """Adds newer bars to the ticker. Stored bars from the first new date on are replaced, so a
+        still-forming last bar is overwritten by its final version.
+
+        The merged columns are written out as a new version (see the class docstring), so the cost
+        grows with the ticker's stored history.
+        """
+        with self._lock:
+            meta = self.meta(ticker)
+            stored = self.read(ticker)
+            if meta is None or stored is None:
+                return self.write(ticker, columns, tz=tz)
+            new_dates = columns["Date"]
+            keep = int(np.searchsorted(stored["Date"], new_dates.min(), side="left")) if len(new_dates) else len(stored["Date"])
+            merged = {}
+            for name in dict.fromkeys(list(meta["columns"]) + list(columns)):
+                old = np.asarray(stored[name][:keep]) if name in stored else np.full(keep, np.nan)
+                new = np.asarray(columns[name]) if name in columns else np.full(len(new_dates), np.nan)
+                merged[name] = np.concatenate([old, new.astype(old.dtype, copy=False)])
+            return self.write(ticker, merged, tz=tz or meta["tz"], covered_from=meta["covered_from"])
+
+    def delete(self, ticker: str) -> None:
+        with self._lock:
+            meta = self.meta(ticker)
+            if meta is None:
+                return
+            os.remove(self._meta_path(ticker))
+            shutil.rmtree(os.path.join(self.directory, meta["version"]), ignore_errors=True)
+
+    def size(self) -> int:
+        """Total bytes of the stored columns."""
+        return sum(meta["bytes"] for _, meta, _ in self._entries())
+
+    def _entries(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                yield path, meta, os.path.getmtime(path)
+            except (OSError, ValueError):
+                continue
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        """Evicts the least recently used tickers until the store fits `max_bytes`."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(meta["bytes"] for _, meta, _ in entries)
+        for _, meta, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and meta["ticker"] == keep.upper():
+                continue
+            self.delete(meta["ticker"])
+            total -= meta["bytes"]
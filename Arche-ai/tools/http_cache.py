@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import zlib
+import threading
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
+
+from requests.structures import CaseInsensitiveDict
+from memory.connections import ThreadLocalConnection
+from tools.http_client import HTTPResponse, get_client
+
+if TYPE_CHECKING:
+    from tools.http_client import HTTPClient
+
+CACHEABLE_STATUS = {200, 203, 300, 301, 308, 404, 410}
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def normalize_headers(headers) -> Dict[str, str]:
+    """Header dict with lowercase names, so updates from a 304 replace the stored values."""
+    return {name.lower(): value for name, value in headers.items()}
+
+
+def cache_directives(headers) -> Dict[str, Optional[str]]:
+    """Parses a Cache-Control header into `{directive: value or None}`."""
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers, now: float, heuristic_fraction: float = 0.1, max_heuristic: float = 86400.0) -> float:
+    """Seconds a response stays fresh, per Cache-Control / Expires, or the usual heuristic of a
+    fraction of its age since Last-Modified when neither is given."""
+    directives = cache_directives(headers)
+    if "no-cache" in directives or "no-store" in directives:
+        return 0.0
+    age = headers.get("Age") or ""
+    age = float(age) if age.isdigit() else 0.0
+    max_age = directives.get("max-age") or ""
+    if max_age.isdigit():
+        return max(0.0, int(max_age) - age)
+    date = _http_date(headers.get("Date")) or now
+    expires = _http_date(headers.get("Expires"))
+    if headers.get("Expires") is not None:
+        return max(0.0, (expires or 0.0) - date - age)  # Invalid Expires means already expired
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        return min(max_heuristic, max(0.0, (date - last_modified) * heuristic_fraction))
+    return 0.0
+
+
+class HTTPCache:
+    """Private on-disk HTTP cache: zlib-compressed bodies in a SQLite file, evicted LRU by size.
+
+    Fresh entries (Cache-Control max-age, Expires, or the Last-Modified heuristic) are served
+    without a request. Stale entries with an ETag or Last-Modified are revalidated with a
+    conditional GET; a 304 refreshes the entry and serves the stored body. `no-store` responses,
+    cut-off bodies and non-cacheable statuses are never stored. Entries are keyed by URL only
+    (`Vary` is not tracked), which suits the built-in tools' fixed request headers.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        url TEXT PRIMARY KEY,
+        status INTEGER NOT NULL,
+        headers TEXT NOT NULL,
+        encoding TEXT,
+        body BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at);
+    """
+
+    def __init__(self, directory: str = os.path.join("cache", "http"), max_bytes: int = 256 * 1024 * 1024,
+                 compression_level: int = 6, timeout: float = 30.0):
+        """
+        Args:
+            directory (str): Directory of the cache database, created if missing.
+            max_bytes (int): Max total size of stored (compressed) bodies; least recently used
+                             entries are evicted beyond it.
+            compression_level (int): zlib level for stored bodies.
+            timeout (float): Seconds to wait on a lock held by another process.
+        """
+        self.db_path = os.path.join(directory, "http_cache.db")
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._connect = ThreadLocalConnection(self.db_path, timeout)
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._stats_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def fetch(self, client: "HTTPClient", url: str, headers: Optional[Dict[str, str]] = None,
+              timeout: Union[float, Tuple[float, float], None] = None, max_bytes: Optional[int] = None,
+              truncate: bool = False) -> HTTPResponse:
+        """Serves `url` from the cache, revalidating or fetching it through `client` as needed."""
+        now = time.time()
+        entry = self._load(url)
+        if entry is not None and entry["expires_at"] > now:
+            self._count("hits")
+            self._touch(url, now)
+            return self._response(url, entry)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry["etag"]:
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = client.fetch(url, headers=request_headers, timeout=timeout, max_bytes=max_bytes, truncate=truncate)
+        now = time.time()
+        if response.status_code == 304 and entry is not None:
+            self._count("revalidated")
+            # 304 carries updated caching headers; keep the stored ones it doesn't repeat
+            merged = dict(entry["headers"])
+            merged.update((name, value) for name, value in normalize_headers(response.headers).items() if name != "content-length")
+            self._refresh(url, merged, now)
+            entry["headers"] = merged
+            return self._response(url, entry)
+
+        self._count("misses")
+        self.store(url, response, now)
+        return response
+
+    def store(self, url: str, response: HTTPResponse, now: Optional[float] = None) -> bool:
+        """Stores a response if it may be cached. Returns False if it was not stored."""
+        now = time.time() if now is None else now
+        directives = cache_directives(response.headers)
+        if response.status_code not in CACHEABLE_STATUS or response.truncated or "no-store" in directives:
+            return False
+        lifetime = freshness_lifetime(response.headers, now)
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if lifetime <= 0 and not etag and not last_modified:
+            return False  # Could never be served without a full refetch
+        body = zlib.compress(response.content, self.compression_level)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (url, status, headers, encoding, body, size, etag, last_modified, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status_code, json.dumps(normalize_headers(response.headers)), response.encoding, body, len(body),
+                 etag, last_modified, now + lifetime, now),
+            )
+        self._count("stored")
+        self._evict()
+        return True
+
+    def _load(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT status, headers, encoding, body, etag, last_modified, expires_at FROM entries WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, encoding, body, etag, last_modified, expires_at = row
+        return {"status": status, "headers": normalize_headers(json.loads(headers)), "encoding": encoding, "body": body,
+                "etag": etag, "last_modified": last_modified, "expires_at": expires_at}
+
+    def _response(self, url: str, entry: Dict[str, Any]) -> HTTPResponse:
+        return HTTPResponse(url=url, status_code=entry["status"], headers=entry["headers"],
+                            content=zlib.decompress(entry["body"]), encoding=entry["encoding"], from_cache=True)
+
+    def _touch(self, url: str, now: float) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (now, url))
+
+    def _refresh(self, url: str, headers: Dict[str, str], now: float) -> None:
+        """Stores the merged (lowercase-named) headers of a revalidated entry and its new expiry."""
+        lookup = CaseInsensitiveDict(headers)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE entries SET headers = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "expires_at = ?, accessed_at = ? WHERE url = ?",
+                (json.dumps(headers), lookup.get("ETag"), lookup.get("Last-Modified"),
+                 now + freshness_lifetime(lookup, now), now, url),
+            )
+
+    def _evict(self) -> None:
+        """Drops least recently used entries until the stored bodies fit `max_bytes`."""
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for url, size in conn.execute("SELECT url, size FROM entries ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                victims.append((url,))
+                total -= size
+            conn.executemany("DELETE FROM entries WHERE url = ?", victims)
+        with self._stats_lock:
+            self._stats["evicted"] += len(victims)
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        row = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._stats_lock:
+            return dict(self._stats, entries=row[0], bytes=row[1])
+
+
+def enable_http_cache(directory: str = os.path.join("cache", "http"), max_bytes: int = 256 * 1024 * 1024) -> HTTPCache:
+    """Puts an on-disk `HTTPCache` in front of the shared client used by the built-in tools."""
+    cache = HTTPCache(directory=directory, max_bytes=max_bytes)
+    get_client().cache = cache
+    return cache
@@ -0,0 +1,221 @@
+import re
+import json
+import asyncio
+import functools
+import threading
+import concurrent.futures
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+}
+
+_CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+
+
+def charset_of(content_type: str) -> Optional[str]:
+    """Charset declared in a Content-Type header.
+
+    Undeclared text is decoded as UTF-8 rather than requests' ISO-8859-1 default, which garbles
+    most modern pages.
+    """
+    match = _CHARSET.search(content_type)
+    return match.group(1) if match else None
+
+
+class ResponseTooLarge(requests.RequestException):
+    """The response body exceeded the client's `max_bytes`."""
+
+
+class HTTPResponse:
+    """A fully read response: status, headers and body bytes (capped at the client's size limit)."""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes,
+                 encoding: Optional[str] = None, truncated: bool = False, from_cache: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.truncated = truncated  # Body was cut at max_bytes
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HTTPClient:
+    """Shared HTTP client for the built-in tools.
+
+    One `requests.Session` keeps connections alive across tool calls (no repeated DNS/TCP/TLS
+    setup); idempotent requests are retried with exponential backoff on connection errors and
+    429/5xx; every request has a timeout, at most `per_host_limit` requests run against one host
+    at a time, and bodies are read up to `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        timeout: Union[float, Tuple[float, float]] = (5.0, 20.0),
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_maxsize: int = 32,
+        per_host_limit: int = 8,
+        max_bytes: int = 10 * 1024 * 1024,
+        headers: Optional[Dict[str, str]] = None,
+        cache=None,
+    ):
+        """
+        Args:
+            timeout (float | tuple): Default (connect, read) timeout in seconds.
+            retries (int): Retries for connection errors and 429/5xx responses.
+            backoff_factor (float): Backoff between retries: factor * 2 ** (retry - 1) seconds.
+            pool_maxsize (int): Keep-alive connections kept per host.
+            per_host_limit (int): Max concurrent requests to one host.
+            max_bytes (int): Max response body size read.
+            headers (dict, optional): Default headers, e.g. a User-Agent.
+            cache (HTTPCache, optional): On-disk cache consulted by `get` (see `enable_http_cache`).
+        """
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.per_host_limit = max(1, per_host_limit)
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._pool_size = pool_maxsize
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slot
+
+    @contextmanager
+    def stream(self, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None,
+               timeout: Union[float, Tuple[float, float], None] = None) -> Iterator[requests.Response]:
+        """Opens a streamed GET, holding a per-host slot until the block exits.
+
+        The body is not read up front; use `iter_body` to read it in chunks under a byte cap.
+        """
+        with self._slot(url):
+            response = self.session.get(url, headers=headers, params=params, timeout=timeout or self.timeout, stream=True)
+            try:
+                yield response
+            finally:
+                response.close()
+
+    def iter_body(self, response: requests.Response, max_bytes: Optional[int] = None, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yields decoded body chunks, stopping once `max_bytes` have been read."""
+        remaining = self.max_bytes if max_bytes is None else max_bytes
+        for chunk in response.iter_content(chunk_size):
+            if len(chunk) >= remaining:
+                yield chunk[:remaining]
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None,
+            timeout: Union[float, Tuple[float, float], None] = None, max_bytes: Optional[int] = None,
+            truncate: bool = False, use_cache: bool = True) -> HTTPResponse:
+        """GETs a URL and reads its body, through the client's cache if it has one.
+
+        Args:
+            max_bytes (int, optional): Overrides the client's body size cap.
+            truncate (bool): Cut an oversized body at the cap (`response.truncated`) instead of raising
+                             `ResponseTooLarge`.
+            use_cache (bool): Set to False to bypass the cache for this request.
+        """
+        if params:
+            url = requests.Request("GET", url, params=params).prepare().url
+        if self.cache is not None and use_cache:
+            return self.cache.fetch(self, url, headers=headers, timeout=timeout, max_bytes=max_bytes, truncate=truncate)
+        return self.fetch(url, headers=headers, timeout=timeout, max_bytes=max_bytes, truncate=truncate)
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Union[float, Tuple[float, float], None] = None,
+              max_bytes: Optional[int] = None, truncate: bool = False) -> HTTPResponse:
+        """GETs a URL from the network (never the cache) and reads its body."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self.stream(url, headers=headers, timeout=timeout) as response:
+            declared = response.headers.get("Content-Length")
+            if not truncate and declared and declared.isdigit() and int(declared) > limit:
+                raise ResponseTooLarge(f"{url} is {declared} bytes (limit {limit}).")
+            body = bytearray()
+            # Read one byte past the cap to tell "exactly at the limit" from "over it"
+            for chunk in self.iter_body(response, limit + 1):
+                body += chunk
+            truncated = len(body) > limit
+            if truncated and not truncate:
+                raise ResponseTooLarge(f"{url} exceeded {limit} bytes.")
+            return HTTPResponse(
+                url=response.url,
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                content=bytes(body[:limit]),
+                encoding=charset_of(response.headers.get("Content-Type", "")),
+                truncated=truncated,
+            )
+
+    async def aget(self, url: str, **kwargs) -> HTTPResponse:
+        """Async `get`: runs on the client's thread pool so event loops share the same connection pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(self.get, url, **kwargs))
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._pool_size, thread_name_prefix="HTTPClient")
+            return self._executor
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self.session.close()
+
+
+_default_client: Optional[HTTPClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> HTTPClient:
+    """Returns the process-wide client shared by the built-in tools."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HTTPClient()
+        return _default_client
@@ -0,0 +1,183 @@
+import math
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+TRADING_DAYS = 252
+RETURN_PERIODS = {"1d": 1, "1w": 5, "1m": 21, "3m": 63, "1y": 252}
+
+
+def _rows(values) -> np.ndarray:
+    """A float 2-D view with one row per ticker (1-D input is a single ticker)."""
+    array = np.asarray(values, dtype=np.float64)
+    return array[None, :] if array.ndim == 1 else array
+
+
+def close_matrix(frames: Dict[str, object], column: str = "Close") -> Tuple[List[str], np.ndarray]:
+    """Stacks each ticker's `column` into a tickers x bars matrix.
+
+    Series are aligned on their latest bar; shorter histories are padded with NaN at the start,
+    which every indicator here treats as missing data.
+    """
+    tickers, series = [], []
+    for ticker, frame in frames.items():
+        if frame is None or len(frame) == 0 or column not in frame:
+            continue
+        tickers.append(ticker)
+        series.append(np.asarray(frame[column], dtype=np.float64))
+    width = max((len(values) for values in series), default=0)
+    matrix = np.full((len(series), width), np.nan)
+    for row, values in enumerate(series):
+        matrix[row, width - len(values):] = values
+    return tickers, matrix
+
+
+def _window_sums(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling sums of the valid values in each trailing window, and how many were valid."""
+    valid = ~np.isnan(x)
+    total = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    count = np.cumsum(valid, axis=1)
+    sums, counts = total.copy(), count.copy()
+    sums[:, window:] -= total[:, :-window]
+    counts[:, window:] -= count[:, :-window]
+    return sums, counts
+
+
+def sma(values, window: int) -> np.ndarray:
+    """Simple moving average; NaN until a full window of data is available."""
+    x = _rows(values)
+    sums, counts = _window_sums(x, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts >= window, sums / window, np.nan)
+
+
+def ema(values, span: int = None, alpha: float = None) -> np.ndarray:
+    """Exponential moving average (recursive, seeded with each ticker's first value).
+
+    The recursion runs over time, but each step updates every ticker at once.
+    """
+    x = _rows(values)
+    alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+    out = np.empty_like(x)
+    previous = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        current = x[:, t]
+        updated = previous + alpha * (current - previous)
+        previous = np.where(np.isnan(previous), current, np.where(np.isnan(current), previous, updated))
+        out[:, t] = previous
+    return out
+
+
+def rsi(values, period: int = 14) -> np.ndarray:
+    """Wilder's relative strength index (0-100)."""
+    x = _rows(values)
+    delta = np.diff(x, axis=1, prepend=np.nan)
+    gains = ema(np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0)), alpha=1.0 / period)
+    losses = ema(np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0)), alpha=1.0 / period)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(losses == 0, 100.0, 100.0 - 100.0 / (1.0 + gains / losses))
+    enough = np.cumsum(~np.isnan(delta), axis=1) >= period
+    return np.where(enough, out, np.nan)
+
+
+def macd(values, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram."""
+    x = _rows(values)
+    line = ema(x, fast) - ema(x, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def log_returns(values) -> np.ndarray:
+    x = _rows(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.diff(np.log(x), axis=1, prepend=np.nan)
+
+
+def rolling_volatility(values, window: int = 20, annualize: bool = True) -> np.ndarray:
+    """Rolling standard deviation of daily log returns, annualized by default."""
+    r = log_returns(values)
+    sums, counts = _window_sums(r, window)
+    squares, _ = _window_sums(r * r, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (squares - sums * sums / counts) / (counts - 1)
+    out = np.sqrt(np.clip(variance, 0.0, None))
+    out = np.where(counts >= window, out, np.nan)
+    return out * math.sqrt(TRADING_DAYS) if annualize else out
+
+
+def drawdown(values) -> np.ndarray:
+    """Fall from the running peak, as a fraction (0 at a new high, -0.2 for 20% below it)."""
+    x = _rows(values)
+    peak = np.fmax.accumulate(x, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return x / peak - 1.0
+
+
+def returns(values, period: int = 1) -> np.ndarray:
+    """Simple returns over `period` bars."""
+    x = _rows(values)
+    out = np.full_like(x, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[:, period:] = x[:, period:] / x[:, :-period] - 1.0
+    return out
+
+
+def compute_indicators(closes) -> Dict[str, np.ndarray]:
+    """Latest value of every indicator for each row (ticker) of a close-price matrix."""
+    x = _rows(closes)
+    if x.shape[1] == 0:
+        return {}
+    line, signal_line, histogram = macd(x)
+    dd = drawdown(x)
+    results = {
+        "price": x[:, -1],
+        "sma_20": sma(x, 20)[:, -1],
+        "sma_50": sma(x, 50)[:, -1],
+        "sma_200": sma(x, 200)[:, -1],
+        "ema_12": ema(x, 12)[:, -1],
+        "ema_26": ema(x, 26)[:, -1],
+        "rsi_14": rsi(x, 14)[:, -1],
+        "macd": line[:, -1],
+        "macd_signal": signal_line[:, -1],
+        "macd_hist": histogram[:, -1],
+        "volatility_20": rolling_volatility(x, 20)[:, -1],
+        "drawdown": dd[:, -1],
+        "max_drawdown": np.fmin.reduce(dd, axis=1),
+    }
+    for name, period in RETURN_PERIODS.items():
+        results[f"return_{name}"] = returns(x, period)[:, -1] if x.shape[1] > period else np.full(x.shape[0], np.nan)
+    return results
+
+
+def indicators_by_ticker(frames: Dict[str, object], column: str = "Close") -> Dict[str, Dict[str, float]]:
+    """Computes the indicators of many tickers in one batch and returns them per ticker."""
+    tickers, matrix = close_matrix(frames, column)
+    results = compute_indicators(matrix)
+    return {ticker: {name: float(values[row]) for name, values in results.items()} for row, ticker in enumerate(tickers)}
+
+
+def format_indicators(values: Dict[str, float]) -> str:
+    """One compact line of indicators for an LLM prompt."""
+
+    def number(name: str) -> str:
+        value = values.get(name, math.nan)
+        return "n/a" if math.isnan(value) else f"{value:.2f}"
+
+    def percent(name: str, signed: bool = True) -> str:
+        value = values.get(name, math.nan)
+        return "n/a" if math.isnan(value) else f"{value * 100:{'+' if signed else ''}.1f}%"
+
+    return (
+        f"Price {number('price')} | SMA20 {number('sma_20')} SMA50 {number('sma_50')} SMA200 {number('sma_200')} | "
+        f"RSI14 {number('rsi_14')} | MACD {number('macd')} signal {number('macd_signal')} hist {number('macd_hist')} | "
+        f"Volatility20 {percent('volatility_20', signed=False)} | "
+        f"Returns " + " ".join(f"{name} {percent('return_' + name)}" for name in RETURN_PERIODS) + " | "
+        f"Drawdown {percent('drawdown')} (max {percent('max_drawdown')})"
+    )
+
+
+def format_indicator_table(indicators: Dict[str, Dict[str, float]], tickers: Iterable[str] = None) -> str:
+    """`format_indicators` lines for several tickers."""
+    tickers = list(indicators) if tickers is None else tickers
+    return "\n".join(f"{ticker}: {format_indicators(indicators[ticker])}" for ticker in tickers if ticker in indicators)
@@ -0,0 +1,99 @@
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+from memory.retrieval import BM25Index, estimate_tokens, tokenize
+
+_BLOCKS = re.compile(r"\n\s*\n")
+_HEADING = re.compile(r"#{1,6} ")
+
+
+def split_passages(text: str, max_tokens: int = 200) -> List[str]:
+    """Splits extracted page text into passages of at most ~`max_tokens`.
+
+    Paragraphs (blank-line separated blocks) are packed together up to the limit; a markdown
+    heading always starts a new passage, and oversized paragraphs are cut at word boundaries.
+    """
+    max_chars = max_tokens * 4
+    passages: List[str] = []
+    current: List[str] = []
+    size = 0
+    for block in _BLOCKS.split(text):
+        block = block.strip()
+        if not block:
+            continue
+        if current and (size + len(block) > max_chars or _HEADING.match(block)):
+            passages.append("\n\n".join(current))
+            current, size = [], 0
+        while len(block) > max_chars:
+            cut = block.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                passages.append("\n\n".join(current))
+                current, size = [], 0
+            passages.append(block[:cut].strip())
+            block = block[cut:].strip()
+        if block:
+            current.append(block)
+            size += len(block) + 2
+    if current:
+        passages.append("\n\n".join(current))
+    return passages
+
+
+class PassagePool:
+    """Collects passages from many sources, drops near-duplicates and picks the most relevant.
+
+    Two passages are duplicates when their word shingles overlap by at least `threshold`
+    (Jaccard), which catches the same paragraph syndicated across pages with small edits.
+    """
+
+    def __init__(self, threshold: float = 0.8, shingle_size: int = 5):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.index = BM25Index()
+        self.sources: List[str] = []
+        self._shingles: List[frozenset] = []
+        self._by_shingle: Dict[int, List[int]] = {}  # shingle hash -> passages containing it
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _shingle(self, text: str) -> frozenset:
+        terms = tokenize(text)
+        n = min(self.shingle_size, len(terms)) or 1
+        return frozenset(hash(tuple(terms[i:i + n])) for i in range(max(1, len(terms) - n + 1)))
+
+    def add(self, text: str, source: str = "") -> bool:
+        """Adds a passage; returns False if it duplicates one already in the pool."""
+        text = text.strip()
+        if not text:
+            return False
+        shingles = self._shingle(text)
+        overlaps: Counter = Counter(doc for shingle in shingles for doc in self._by_shingle.get(shingle, ()))
+        for doc_id, shared in overlaps.items():
+            if shared / len(shingles | self._shingles[doc_id]) >= self.threshold:
+                return False
+        doc_id = self.index.add(text)
+        self.sources.append(source)
+        self._shingles.append(shingles)
+        for shingle in shingles:
+            self._by_shingle.setdefault(shingle, []).append(doc_id)
+        return True
+
+    def select(self, query: str, token_budget: int = 2000) -> List[Tuple[str, str]]:
+        """Returns the `(source, passage)` pairs most relevant to `query` fitting `token_budget`,
+        grouped by source in the order sources were added. Passages sharing no terms with the
+        query only fill what budget is left."""
+        ranked = [doc_id for doc_id, _ in self.index.search(query, len(self.index))]
+        scored = set(ranked)
+        ranked += [doc_id for doc_id in range(len(self.index)) if doc_id not in scored]
+        chosen, used = [], 0
+        for doc_id in ranked:
+            cost = estimate_tokens(self.index.documents[doc_id])
+            if used + cost > token_budget:
+                continue
+            chosen.append(doc_id)
+            used += cost
+        first_seen = {source: i for i, source in reversed(list(enumerate(self.sources)))}
+        chosen.sort(key=lambda doc_id: (first_seen[self.sources[doc_id]], doc_id))
+        return [(self.sources[doc_id], self.index.documents[doc_id]) for doc_id in chosen]
@@ -0,0 +1,79 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Optional
+
+from memory.connections import ThreadLocalConnection
+
+
+class SummaryCache:
+    """Summaries of text chunks keyed by a hash of their content, in a local SQLite database.
+
+    Re-summarizing a page only calls the LLM for chunks whose text (or prompt/model) changed.
+    Beyond `max_entries`, the least recently used summaries are dropped.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS summaries (
+        key TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_summaries_accessed ON summaries (accessed_at);
+    """
+
+    def __init__(self, db_path: str = os.path.join("cache", "summaries.db"), max_entries: int = 50000, timeout: float = 30.0):
+        """
+        Args:
+            db_path (str): Path of the SQLite database file, created if missing.
+            max_entries (int): Max summaries kept.
+            timeout (float): Seconds to wait on a lock held by another process.
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._connect = ThreadLocalConnection(self.db_path, timeout)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def key(text: str, namespace: str = "") -> str:
+        """Content hash of a chunk; `namespace` separates prompts/models that summarize differently."""
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+
+    def set(self, key: str, summary: str) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO summaries (key, summary, accessed_at) VALUES (?, ?, ?)", (key, summary, time.time()))
+            count = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM summaries WHERE key IN (SELECT key FROM summaries ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM summaries")
+
+    def close(self) -> None:
+        self._connect.close()
+
+
+_default_cache: Optional[SummaryCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    """Returns the process-wide summary cache used when an agent doesn't bring its own."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SummaryCache()
+        return _default_cache
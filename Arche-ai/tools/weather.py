@@ -1,4 +1,4 @@
-import requests
+from tools.http_client import get_client
 
 def get_weather(location):
   """Fetches and prints weather data including the next day's forecast for the given location.
@@ -7,7 +7,7 @@ def get_weather(location):
       location (str): The location for which to fetch weather data.
   """
   url = f"https://wttr.in/{location}?format=j1"
-  response = requests.get(url)
+  response = get_client().get(url)
 
   if response.status_code == 200:
     data = response.json()
@@ -1,11 +1,18 @@
 from googlesearch import search
 
-def web_search(query:str):
+def search_results(query: str, num_results: int = 3) -> list:
+    """Returns the search results as dictionaries with 'title', 'description' and 'url' keys."""
+    return [
+        {"title": result.title, "description": result.description, "url": result.url}
+        for result in search(query, advanced=True, num_results=num_results)
+    ]
+
+def web_search(query:str, num_results: int = 3):
     try:
-        results = list(search(query, advanced=True, num_results=3))
+        results = search_results(query, num_results)
         output = f"The search results for {query} are as follows: \n\n"
         for i, result in enumerate(results):
-            output += f"{i+1}. \nTitle: {result.title}\nDescription: {result.description}\nSource: {result.url}\n\n"
+            output += f"{i+1}. \nTitle: {result['title']}\nDescription: {result['description']}\nSource: {result['url']}\n\n"
         output += "[END]Search Results[END]"
         return output
     except Exception as e: